@@ -2,9 +2,15 @@ import math
 import operator
 import numpy as np
 from ctypes import *
-from OpenGL.GL import *
-from OpenGL.GLU import *
-from OpenGL.GLUT import *
+
+# -- only drawing needs PyOpenGL, stepping a Simulation headless does not
+try:
+    from OpenGL.GL import *
+    from OpenGL.GLU import *
+    from OpenGL.GLUT import *
+    HAS_GL = True
+except ImportError:
+    HAS_GL = False
 
 ## PHYSICS CONSTANTS ##
 DAMPING = 0.01
@@ -74,294 +80,736 @@ class Vec3:
             self.x*other.y - self.y*other.x
         )
 
-class Particle:
-# array = np.array(
-#   [0, 0, 0] -- pos
-#   [0, 0, 0] -- oldpos
-#   [0, 0, 0] -- acceleration
-# )
-
-    def __init__(self, position):
-        self.pos = position
-        self.old_pos = position
-
-        self.mass= 1.0 
-        self.movable = True
-        self.acceleration = Vec3.zero()
-        self.accumulated_normal = Vec3.zero()
-
-    def add_force(self, f):
-        self.acceleration += f/self.mass
-
-    def time_step(self):
-        if self.movable:
-            tmp = self.pos 
-            self.pos = (
-                self.pos 
-                + (self.pos-self.old_pos)*(1.0-DAMPING)
-                + self.acceleration*TIME_STEP)
-
-            self.old_pos = tmp
-            self.acceleration = Vec3.zero()
-
-    def get_pos(self):
-        return self.pos 
-
-    def reset_acceleration(self):
-        self.acceleration = Vec3.zero()
-
-    def offset_pos(self, v):
-        if self.movable:
-            self.pos += v 
-
-    def make_unmovable(self):
-        self.movable = False
-
-    def add_to_normal(self, n):
-        self.accumulated_normal += n.normalized()
-
-    def get_normal(self):
-        return self.accumulated_normal
-
-    def reset_normal(self):
-        self.accumulated_normal = Vec3.zero()
-
-class Constraint:
-
-    def __init__(self, _p1, _p2):
-        self.p1 = _p1 
-        self.p2 = _p2 
-
-        v = _p1.get_pos() - _p2.get_pos()
-        self._rest_distance = v.length()
-
-
-    def satisfy_constraint(self):
-
-        p1_to_p2 = self.p2.get_pos() - self.p1.get_pos()
-        current_distance = p1_to_p2.length()
-
-        correction_vector = p1_to_p2*(1 - self._rest_distance/current_distance)
-        correction_vector_half = correction_vector*0.5
-
-        self.p1.offset_pos(correction_vector_half)
-        self.p2.offset_pos(-correction_vector_half)
-
 class Cloth:
-
-    def __init__(self, width, height, 
+    """A grid of Verlet particles held together by distance constraints.
+
+    All particle state lives in the rows of one array, self._data, and the
+    constraints are index pairs into it, so stepping, forces and collisions
+    are whole array updates instead of loops over particle objects.
+    """
+
+    # -- per particle columns of _data
+    POSITION = slice(0, 3)
+    NORMAL = slice(3, 6)
+    ACCELERATION = slice(6, 9)
+    MASS = 9
+    OLD_POSITION = slice(10, 13)
+
+    # -- constraint families as the grid offsets of the two particles they
+    # -- join from (x, y): structural and shear between neighbours, bend
+    # -- between secondary neighbours
+    STRUCTURAL = (((0, 0), (1, 0)), ((0, 0), (0, 1)))
+    SHEAR = (((0, 0), (1, 1)), ((1, 0), (0, 1)))
+    BEND = (((0, 0), (2, 0)), ((0, 0), (0, 2)), ((0, 0), (2, 2)), ((2, 0), (0, 2)))
+
+    # -- least grid distance within which particles never collide with each
+    # -- other, every constraint joins particles at most this far apart
+    SELF_COLLISION_SKIP = 2
+
+    # -- cells after a cell in key order, half of the 26 around it
+    NEIGHBOUR_CELLS = tuple(
+        (dx, dy, dz)
+        for dx in (0, 1) for dy in (-1, 0, 1) for dz in (-1, 0, 1)
+        if (dx, dy, dz) > (0, 0, 0))
+
+    def __init__(self, width, height,
                     num_particles_width,
-                    num_particles_height):
-
-        self._particles = []
-        self._constraints = []
+                    num_particles_height,
+                    thickness=0.0):
 
         self._num_particles_width = num_particles_width
         self._num_particles_height = num_particles_height
+        count = num_particles_width * num_particles_height
+
+        #-- particle y*num_particles_width + x is row [y, x] of the grid
+        self._data = np.zeros((num_particles_height, num_particles_width, 13))
+        rows = self._data.reshape(count, 13)
+        self.position = rows[:, self.POSITION]
+        self.normal = rows[:, self.NORMAL]
+        self.acceleration = rows[:, self.ACCELERATION]
+        self.mass = rows[:, self.MASS]
+        self.old_position = rows[:, self.OLD_POSITION]
+        self.movable = np.ones(count, dtype=bool)
 
         #-- create particles in a grid (0, 0, 0) to (width, -height, 0)
-        self._data = np.ones((num_particles_width, num_particles_height, 10))
-        for x in range(num_particles_width):
-            for y in range(num_particles_height):
-
-                pos = Vec3(width * (x/num_particles_width),
-                            -height * (y/num_particles_height),
-                            0)
-                self._data[x, y, :] = np.array([
-                    width * (x/num_particles_width),
-                    -height * (y/num_particles_height),
-                    0,
-                    0, 0, 0, # Normal
-                    0, 0, 0, # Acceleration
-                    1        # Mass
-                ])
-                self._particles.append(Particle(pos))
-
-        #-- connecting immediate neighbour particles with constaints
-        for x in range(num_particles_width):
-            for y in range(num_particles_height):
-                if x < num_particles_width-1:
-                    p1, p2 = self._get_particle(x,y), self._get_particle(x+1, y)
-                    self._make_constraint(p1, p2)
-
-
-                if y < num_particles_height-1:
-                    p1, p2 = self._get_particle(x,y), self._get_particle(x, y+1)
-                    self._make_constraint(p1, p2)
-
-                if x < num_particles_width-1 and y < num_particles_height-1:
-                    p1, p2 = self._get_particle(x,y), self._get_particle(x+1, y+1)
-                    self._make_constraint(p1, p2)
-
-                if x < num_particles_width-1 and y < num_particles_height-1:
-                    p1, p2 = self._get_particle(x+1,y), self._get_particle(x, y+1)
-                    self._make_constraint(p1, p2)
-
-        #-- connecting secondary neighbour particles with constaints
-        for x in range(num_particles_width):
-            for y in range(num_particles_height):
-                if x < num_particles_width-2:
-                    p1, p2 = self._get_particle(x,y), self._get_particle(x+2, y)
-                    self._make_constraint(p1, p2)
-
-                if y < num_particles_height-2:
-                    p1, p2 = self._get_particle(x,y), self._get_particle(x, y+2)
-                    self._make_constraint(p1, p2)
-
-                if x < num_particles_width-2 and y < num_particles_height-2:
-                    p1, p2 = self._get_particle(x,y), self._get_particle(x+2, y+2)
-                    self._make_constraint(p1, p2)
-
-                if x < num_particles_width-2 and y < num_particles_height-2:
-                    p1, p2 = self._get_particle(x+2,y), self._get_particle(x, y+2)
-                    self._make_constraint(p1, p2)
-
-        # -- making upper left most three and right most three unmovable
-        for i in range(3):
-            self._get_particle(0+i, 0).offset_pos(Vec3(0.5, 0, 0))
-            self._get_particle(0+i, 0).make_unmovable()
-
-            self._get_particle(0+i, 0).offset_pos(Vec3(-0.5, 0, 0))
-            self._get_particle(self._num_particles_width-1-i, 0).make_unmovable()
-
+        self._data[:, :, 0] = width * (np.arange(num_particles_width) / num_particles_width)
+        self._data[:, :, 1] = -height * (np.arange(num_particles_height) / num_particles_height)[:, None]
+        self.mass[:] = 1.0
+        self.old_position[:] = self.position
+
+        #-- connecting immediate and secondary neighbour particles with
+        #-- constraints, one index pair array per color
+        self._colors = []
+        for family in self.STRUCTURAL + self.SHEAR + self.BEND:
+            self._colors.extend(self._make_constraints(*family))
+
+        self.i = np.concatenate([i for i, _ in self._colors])
+        self.j = np.concatenate([j for _, j in self._colors])
+        self.rest = np.linalg.norm(self.position[self.j] - self.position[self.i], axis=1)
+        self._batches = None
+
+        #-- two triangles per grid cell, column by column as they are drawn,
+        #-- with every other column colored
+        x, y = np.meshgrid(
+            np.arange(num_particles_width - 1),
+            np.arange(num_particles_height - 1), indexing='ij')
+        x, y = x.ravel(), y.ravel()
+        corner = self._get_particle
+        self.triangles = np.stack((
+            np.stack((corner(x+1, y), corner(x, y), corner(x, y+1)), axis=1),
+            np.stack((corner(x+1, y+1), corner(x+1, y), corner(x, y+1)), axis=1),
+        ), axis=1).reshape(-1, 3)
+        self.triangle_colors = np.where(
+            (np.repeat(x, 2) % 2)[:, None], (.6, .2, .2), (1.0, 1.0, 1.0))
+
+        # -- corner columns and the flat _data indices of the corners' x, y
+        # -- and z, one row per corner coordinate
+        self._corners = np.ascontiguousarray(self.triangles.T)
+        self._triangle_index = np.ascontiguousarray(
+            (self.triangles[:, :, None]*self._data.shape[-1] + np.arange(3)).reshape(-1, 9).T)
+        self.renderer = None
+
+        # -- particles closer than thickness push apart unless they are
+        # -- within self_collision_skip rows and columns on the grid, 0
+        # -- turns self collision off. The skip grows with the thickness so
+        # -- particles of a flat cloth at rest never push each other apart
+        self.thickness = thickness
+        self.self_collision_skip = max(
+            self.SELF_COLLISION_SKIP, int(np.ceil(thickness / self.rest.min())) - 1)
+
+        # -- making upper left most three and right most three unmovable,
+        # -- the left ones nudged half a unit right first
+        left = self._get_particle(np.arange(3), 0)
+        self.position[left, 0] += 0.5
+        self.make_unmovable(left)
+        self.make_unmovable(self._get_particle(num_particles_width - 1 - np.arange(3), 0))
+
+    @property
+    def count(self):
+        return len(self.movable)
 
     def _get_particle(self, x, y):
-        return self._particles[y*self._num_particles_width + x]
+        return y*self._num_particles_width + x
+
+    def _make_constraints(self, a, b):
+        # -- every (x, y) where both ends fit on the grid, split in two colors
+        # -- by which run of span columns (or rows) the constraint starts in,
+        # -- so no particle appears twice in a color
+        span_x = max(a[0], b[0])
+        span_y = max(a[1], b[1])
+        x, y = np.meshgrid(
+            np.arange(self._num_particles_width - span_x),
+            np.arange(self._num_particles_height - span_y))
+        x, y = x.ravel(), y.ravel()
+
+        i = self._get_particle(x + a[0], y + a[1])
+        j = self._get_particle(x + b[0], y + b[1])
+        parity = (x // span_x) % 2 if span_x else (y // span_y) % 2
+        return [(i[parity == p], j[parity == p]) for p in (0, 1)]
+
+    def make_unmovable(self, index):
+        self.movable[index] = False
+        self._batches = None
+
+    def _build_batches(self):
+        # -- share of the correction each end takes, pinned ends take none
+        weight = self.movable.astype(float)
+        columns = self._data.shape[-1]
+        batches = []
+        start = 0
+        for i, j in self._colors:
+            rest = self.rest[start:start + len(i)]
+            start += len(i)
+
+            wi, wj = weight[i], weight[j]
+            w = wi + wj
+            w[w == 0.0] = 1.0
+
+            # -- flat indices of both ends' x, y and z in _data, gathering
+            # -- and scattering those is much cheaper than whole rows
+            ends = np.concatenate((i, j))
+            index = (ends[:, None]*columns + np.arange(3)).ravel()
+            batches.append((index, len(i), rest, (wi / w)[:, None], (wj / w)[:, None]))
+        self._batches = batches
+
+    def satisfy_constraints(self):
+        if self._batches is None:
+            self._build_batches()
+
+        data = self._data.reshape(-1)
+        for index, n, rest, wi, wj in self._batches:
+            p = data.take(index).reshape(-1, 3)
+            delta = p[n:] - p[:n]
+            distance = np.sqrt(np.einsum('ij,ij->i', delta, delta))
+            distance[distance == 0.0] = 1.0
+
+            delta *= (1.0 - rest / distance)[:, None]
+            p[:n] += delta * wi
+            p[n:] -= delta * wj
+            data[index] = p.reshape(-1)
+
+    def _scatter(self, values):
+        # -- sum a (3, triangles) array of x, y and z per triangle onto each
+        # -- triangle's three corners
+        result = np.empty((self.count, 3))
+        for k in range(3):
+            result[:, k] = sum(np.bincount(corner, values[k], self.count) for corner in self._corners)
+        return result
+
+    def calc_tri_normals(self):
+        # -- unnormalized, their length is twice the triangle's area, as x, y
+        # -- and z rows
+        p = self._data.reshape(-1).take(self._triangle_index)
+        ax, ay, az = p[3] - p[0], p[4] - p[1], p[5] - p[2]
+        bx, by, bz = p[6] - p[0], p[7] - p[1], p[8] - p[2]
+        return np.array((ay*bz - az*by, az*bx - ax*bz, ax*by - ay*bx))
+
+    def calc_normals(self):
+        # -- smooth per particle normals, the unit face normals around each
+        # -- particle summed and normalized
+        normals = self.calc_tri_normals()
+        length = np.sqrt(np.einsum('ij,ij->j', normals, normals))
+        length[length == 0.0] = 1.0
+        self.normal[:] = self._scatter(normals / length)
+
+        length = np.sqrt(np.einsum('ij,ij->i', self.normal, self.normal))
+        length[length == 0.0] = 1.0
+        self.normal /= length[:, None]
 
-    def _make_constraint(self, p1, p2):
-        self._constraints.append(Constraint(p1, p2))
+    def draw_shaded(self):
+        if self.renderer is None:
+            self.renderer = ClothRenderer(self)
+        self.renderer.draw()
 
-    def calc_tri_normal(self, p1, p2, p3):
-        pos1, pos2, pos3 = (
-            p1.get_pos(),
-            p2.get_pos(),
-            p3.get_pos()
-        )
+    def time_step(self):
 
-        v1 = pos2-pos1
-        v2 = pos3-pos1 
-        return v1.cross(v2)
+        for _ in range(CONSTRAINT_ITERATIONS):
+            self.satisfy_constraints()
+
+        moving = self.movable
+        position = self.position[moving]
+        self.position[moving] = (
+            position
+            + (position - self.old_position[moving])*(1.0-DAMPING)
+            + self.acceleration[moving]*TIME_STEP)
+
+        self.old_position[moving] = position
+        self.acceleration[moving] = 0.0
+
+        if self.thickness > 0.0:
+            self.self_collision()
+
+    def _close_pairs(self):
+        """Index pairs of particles whose cells touch, each pair once.
+
+        Particles are binned into cubes of thickness rebuilt from scratch
+        each call and sorted by cell, each one then looks up its own cell
+        and the 13 cells after it, so the cost grows with the number of
+        particles, not their square.
+        """
+        cell = np.floor(self.position / self.thickness).astype(np.int64)
+        cell -= cell.min(axis=0)
+
+        # -- room past the highest cell on every axis so -1 and +1 never
+        # -- wrap into a cell that is in use
+        _, ny, nz = cell.max(axis=0) + 3
+        key = (cell[:, 0]*ny + cell[:, 1])*nz + cell[:, 2]
+        order = np.argsort(key, kind='stable')
+        key = key[order]
+        rank = np.arange(len(key))
+
+        first, second = [], []
+        for dx, dy, dz in ((0, 0, 0),) + self.NEIGHBOUR_CELLS:
+            target = key + (dx*ny + dy)*nz + dz
+            end = np.searchsorted(key, target, 'right')
+            if dx == dy == dz == 0:
+                # -- same cell, only the particles sorted after this one
+                start = rank + 1
+            else:
+                start = np.searchsorted(key, target, 'left')
+
+            count = np.maximum(end - start, 0)
+            total = int(count.sum())
+            if not total:
+                continue
+
+            # -- every particle against the run [start, end) of the target cell
+            run = np.repeat(np.cumsum(count) - count, count)
+            first.append(np.repeat(rank, count))
+            second.append(np.repeat(start, count) + np.arange(total) - run)
+
+        if not first:
+            return np.zeros(0, dtype=int), np.zeros(0, dtype=int)
+        return order[np.concatenate(first)], order[np.concatenate(second)]
+
+    def self_collision(self):
+        """Push apart particles closer than the thickness that are not
+        neighbours on the grid, returns how many pairs were touching."""
+        a, b = self._close_pairs()
+
+        width = self._num_particles_width
+        skip = self.self_collision_skip
+        far = ((np.abs(a % width - b % width) > skip) |
+               (np.abs(a // width - b // width) > skip))
+        a, b = a[far], b[far]
+
+        position = self.position
+        delta = position[b] - position[a]
+        distance = np.sqrt(np.einsum('ij,ij->i', delta, delta))
+        wa, wb = self.movable[a].astype(float), self.movable[b].astype(float)
+        touching = (distance < self.thickness) & (distance > 0.0) & (wa + wb > 0.0)
+        if not touching.any():
+            return 0
+
+        a, b, delta, distance = a[touching], b[touching], delta[touching], distance[touching]
+        wa, wb = wa[touching], wb[touching]
+
+        # -- by inverse mass along the line between them, each particle's
+        # -- pushes averaged over its contacts so a crowd does not overshoot
+        correction = delta * ((self.thickness - distance) / (distance * (wa + wb)))[:, None]
+        count = self.count
+        contacts = np.maximum(np.bincount(np.concatenate((a, b)), minlength=count), 1)
+        for k in range(3):
+            position[:, k] += (np.bincount(b, correction[:, k] * wb, count) -
+                               np.bincount(a, correction[:, k] * wa, count)) / contacts
+        return len(a)
 
-    def add_wind_forces_for_tri(self, p1, p2, p3, direction):
+    def add_force(self, direction):
+        # use to add gravity and other forces to all particles
+        self.acceleration += np.array(tuple(direction)) / self.mass[:, None]
 
-        normal = self.calc_tri_normal(p1, p2, p3)
-        d = normal.normalized()
-        force = normal * (d.dot(direction))
-        p1.add_force(force)
-        p2.add_force(force)
-        p3.add_force(force)
 
-    def draw_tri(self, p1, p2, p3, color):
-        arr = c_float * 3
-        varr = lambda vec: arr(*tuple(vec))
+    def wind_force(self, direction):
+        # add wind force to all particles, each triangle pushes its corners
+        # along its normal by how much it faces the wind
+        normals = self.calc_tri_normals()
+        length = np.sqrt(np.einsum('ij,ij->j', normals, normals))
+        length[length == 0.0] = 1.0
+        facing = np.array(tuple(direction), dtype=float) @ normals / length
+        self.acceleration += self._scatter(normals * facing) / self.mass[:, None]
 
-        glColor3fv(varr(color))
+    def collide(self, colliders):
+        return colliders.collide(self.position, self.movable)
 
-        glNormal3fv(varr((p1.get_normal().normalized())))
-        glVertex3fv(varr(p1.get_pos()))
+    def ball_collision(self, center, radius):
+        v = self.position - np.array(tuple(center))
+        l = np.sqrt(np.einsum('ij,ij->i', v, v))
+        inside = (l < radius) & (l > 0.0) & self.movable
+        self.position[inside] += v[inside] * ((radius - l[inside]) / l[inside])[:, None]
+
+
+def _dot(a, b):
+    return np.einsum('ij,ij->i', a, b)
+
+
+def _closest_on_segments(p, a, b):
+    # -- closest point to each p on the segment from a to b, row by row
+    ab = b - a
+    length_sqr = _dot(ab, ab)
+    length_sqr[length_sqr == 0.0] = 1.0
+    t = np.clip(_dot(p - a, ab) / length_sqr, 0.0, 1.0)
+    return a + ab * t[:, None]
+
+
+def _closest_on_triangles(p, a, b, c, normal):
+    # -- the projection onto the plane when it lands inside the triangle,
+    # -- the nearest of the three edges otherwise, and which it was
+    q = p - normal * _dot(p - a, normal)[:, None]
+    inside = (
+        (_dot(np.cross(b - a, q - a), normal) >= 0.0) &
+        (_dot(np.cross(c - b, q - b), normal) >= 0.0) &
+        (_dot(np.cross(a - c, q - c), normal) >= 0.0))
+
+    edges = np.stack([_closest_on_segments(p, u, v) for u, v in ((a, b), (b, c), (c, a))])
+    offset = edges - p
+    nearest = np.argmin(np.einsum('eij,eij->ei', offset, offset), axis=0)
+    edge = edges[nearest, np.arange(len(p))]
+    return np.where(inside[:, None], q, edge), inside
+
+
+def _runs(start, count):
+    # -- the concatenated ranges [start, start + count) and which range each
+    # -- element came from
+    total = int(count.sum())
+    owner = np.repeat(np.arange(len(count)), count)
+    return np.repeat(start, count) + np.arange(total) - np.repeat(np.cumsum(count) - count, count), owner
+
+
+class MeshCollider:
+    """A triangle mesh particles are kept thickness in front of, the side
+    its counter clockwise triangles face.
+
+    Triangles sit in a bounding volume hierarchy built once, median split on
+    the longest axis, and all particles walk it together a level at a time.
+    """
+
+    # -- most triangles in a leaf
+    LEAF_SIZE = 4
+
+    def __init__(self, vertices, triangles, thickness=0.1):
+        self.vertices = np.asarray(vertices, dtype=float).reshape(-1, 3)
+        self.triangles = np.asarray(triangles, dtype=int).reshape(-1, 3)
+        self.thickness = thickness
+
+        # -- triangles without area have no side to keep particles on
+        corners = self.vertices[self.triangles]
+        normal = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+        length = np.sqrt(_dot(normal, normal))
+        keep = length > 0.0
+        self.triangles, corners = self.triangles[keep], corners[keep]
+        self.normals = normal[keep] / length[keep, None]
+
+        # -- triangle boxes padded by the thickness
+        self.lower = corners.min(axis=1) - thickness
+        self.upper = corners.max(axis=1) + thickness
+        self._build(self.lower, self.upper)
+
+    def _build(self, lower, upper):
+        # -- per node its box, children (-1 on leaves) and the run of
+        # -- self.order holding a leaf's triangles, no nodes without triangles
+        if not len(lower):
+            self.node_lower = self.node_upper = np.zeros((0, 3))
+            self.node_children = self.node_leaf = np.zeros((0, 2), dtype=int)
+            self.order = np.zeros(0, dtype=int)
+            return
+
+        center = (lower + upper) * 0.5
+        nodes = []
+        order = []
+        stack = [(np.arange(len(lower)), -1, 0)]
+        while stack:
+            members, parent, side = stack.pop()
+            node = len(nodes)
+            nodes.append([lower[members].min(axis=0), upper[members].max(axis=0), -1, -1, 0, 0])
+            if parent >= 0:
+                nodes[parent][2 + side] = node
+
+            if len(members) <= self.LEAF_SIZE:
+                nodes[node][4:] = len(order), len(members)
+                order.extend(members.tolist())
+                continue
+
+            points = center[members]
+            axis = np.argmax(points.max(axis=0) - points.min(axis=0))
+            split = np.argsort(points[:, axis], kind='stable')
+            half = len(members) // 2
+            stack.append((members[split[half:]], node, 1))
+            stack.append((members[split[:half]], node, 0))
+
+        self.node_lower = np.array([n[0] for n in nodes]).reshape(-1, 3)
+        self.node_upper = np.array([n[1] for n in nodes]).reshape(-1, 3)
+        self.node_children = np.array([n[2:4] for n in nodes], dtype=int).reshape(-1, 2)
+        self.node_leaf = np.array([n[4:6] for n in nodes], dtype=int).reshape(-1, 2)
+        self.order = np.array(order, dtype=int)
+
+    def query(self, points):
+        """(point, triangle) index pairs whose padded triangle boxes hold the
+        point, every point descending the tree at once."""
+        points = np.asarray(points, dtype=float)
+        if not len(self.order):
+            return np.zeros(0, dtype=int), np.zeros(0, dtype=int)
+
+        point = np.arange(len(points))
+        node = np.zeros(len(points), dtype=int)
+        found_point, found_triangle = [], []
+        while len(point):
+            p = points[point]
+            hit = (np.all(p >= self.node_lower[node], axis=1) &
+                   np.all(p <= self.node_upper[node], axis=1))
+            point, node = point[hit], node[hit]
+
+            left = self.node_children[node, 0]
+            leaf = left < 0
+            if leaf.any():
+                start, count = self.node_leaf[node[leaf]].T
+                run, owner = _runs(start, count)
+                p, t = point[leaf][owner], self.order[run]
+                q = points[p]
+                keep = np.all(q >= self.lower[t], axis=1) & np.all(q <= self.upper[t], axis=1)
+                found_point.append(p[keep])
+                found_triangle.append(t[keep])
+
+            inner = ~leaf
+            point = np.concatenate((point[inner], point[inner]))
+            node = np.concatenate((left[inner], self.node_children[node[inner], 1]))
+
+        if not found_point:
+            return np.zeros(0, dtype=int), np.zeros(0, dtype=int)
+        return np.concatenate(found_point), np.concatenate(found_triangle)
+
+    def push(self, position):
+        """Per particle offset out of the mesh, zero for particles clear of it.
+
+        Particles over a triangle are pushed along its normal to thickness in
+        front of it, ones nearest an edge or corner straight away from that
+        point, so particles beside an open edge are not lifted onto the face.
+        """
+        offset = np.zeros_like(position)
+        point, triangle = self.query(position)
+        if not len(point):
+            return offset
+
+        p = position[point]
+        a, b, c = (self.vertices[self.triangles[triangle, k]] for k in range(3))
+        normal = self.normals[triangle]
+        closest, over = _closest_on_triangles(p, a, b, c, normal)
+        away = p - closest
+        distance = _dot(away, away)
+
+        # -- each particle answers to its nearest triangle only
+        nearest = np.lexsort((distance, point))
+        first = np.ones(len(nearest), dtype=bool)
+        first[1:] = point[nearest][1:] != point[nearest][:-1]
+        nearest = nearest[first]
+        away, distance = away[nearest], np.sqrt(distance[nearest])
+
+        # -- signed distance along the normal over the face, plain distance
+        # -- from the edge or corner beside it
+        edge = ~over[nearest] & (distance > 0.0)
+        direction = normal[nearest]
+        direction[edge] = away[edge] / distance[edge, None]
+        depth = self.thickness - _dot(away, direction)
+
+        inside = depth > 0.0
+        offset[point[nearest[inside]]] = direction[inside] * depth[inside][:, None]
+        return offset
+
+
+class Colliders:
+    """Spheres, capsules, planes and meshes the cloth is pushed out of.
+
+    Each kind is kept in its own array and every particle is tested against
+    all of a kind at once. Spheres and capsules are only tested against the
+    particles in grid cells their boxes cover, so obstacles away from the
+    cloth cost next to nothing.
+    """
+
+    def __init__(self):
+        # -- center and radius
+        self.spheres = np.zeros((0, 4))
+        # -- the two segment ends and radius
+        self.capsules = np.zeros((0, 7))
+        # -- unit normal and offset, particles are kept where n.p >= offset
+        self.planes = np.zeros((0, 4))
+        self.meshes = []
+
+    def add_sphere(self, center, radius):
+        self.spheres = np.vstack((self.spheres, tuple(center) + (radius,)))
+        return len(self.spheres) - 1
+
+    def add_capsule(self, start, end, radius):
+        self.capsules = np.vstack((self.capsules, tuple(start) + tuple(end) + (radius,)))
+        return len(self.capsules) - 1
+
+    def add_plane(self, normal, point):
+        normal = np.array(tuple(normal), dtype=float)
+        normal /= np.sqrt(normal.dot(normal))
+        self.planes = np.vstack((self.planes, tuple(normal) + (normal.dot(tuple(point)),)))
+        return len(self.planes) - 1
+
+    def add_mesh(self, vertices, triangles, thickness=0.1):
+        self.meshes.append(MeshCollider(vertices, triangles, thickness))
+        return self.meshes[-1]
+
+    def _candidates(self, position, lower, upper):
+        """(particle, obstacle) pairs with the particle inside the obstacle's
+        box [lower, upper] on the two axes the particles spread furthest on.
+
+        Particles are binned on a grid over those axes, cells about half an
+        obstacle wide, and sorted by column then row, so every column an
+        obstacle spans holds its particles in one run of the sorted keys.
+        """
+        if not len(position):
+            return np.zeros(0, dtype=int), np.zeros(0, dtype=int)
+
+        u, v = np.argsort(position.max(axis=0) - position.min(axis=0))[1:]
+        extent = np.maximum(upper[:, u] - lower[:, u], upper[:, v] - lower[:, v])
+        size = max(float(np.median(extent)) * 0.5, 1e-6)
+
+        origin = position.min(axis=0)
+        column = np.floor((position[:, u] - origin[u]) / size).astype(np.int64)
+        row = np.floor((position[:, v] - origin[v]) / size).astype(np.int64)
+        columns, rows = int(column.max()) + 1, int(row.max()) + 1
+        key = column * rows + row
+        order = np.argsort(key, kind='stable')
+        key = key[order]
+
+        # -- the cells each obstacle covers, clipped to the grid
+        first = np.floor((lower[:, [u, v]] - origin[[u, v]]) / size).astype(np.int64)
+        last = np.floor((upper[:, [u, v]] - origin[[u, v]]) / size).astype(np.int64)
+        clear = ((last[:, 0] < 0) | (first[:, 0] >= columns) |
+                 (last[:, 1] < 0) | (first[:, 1] >= rows))
+        first = np.maximum(first, 0)
+        last = np.minimum(last, (columns - 1, rows - 1))
+        spans = np.where(clear, 0, last[:, 0] - first[:, 0] + 1)
+
+        # -- one run of keys per obstacle and column
+        column, obstacle = _runs(first[:, 0], spans)
+        start = np.searchsorted(key, column * rows + first[obstacle, 1], 'left')
+        end = np.searchsorted(key, column * rows + last[obstacle, 1], 'right')
+        run, owner = _runs(start, end - start)
+        return order[run], obstacle[owner]
+
+    def collide(self, position, movable):
+        """Move the movable particles out of every collider, returns how many
+        particles were pushed."""
+        pushed = np.zeros(len(position), dtype=bool)
+
+        # -- spheres as capsules with both ends at the center, every push
+        # -- on a particle summed
+        segments = np.vstack((self.spheres[:, [0, 1, 2, 0, 1, 2, 3]], self.capsules))
+        if len(segments):
+            radius = segments[:, 6, None]
+            lower = np.minimum(segments[:, :3], segments[:, 3:6]) - radius
+            upper = np.maximum(segments[:, :3], segments[:, 3:6]) + radius
+
+            particle, obstacle = self._candidates(np.ascontiguousarray(position), lower, upper)
+            p = position[particle]
+            v = p - _closest_on_segments(p, segments[obstacle, :3], segments[obstacle, 3:6])
+            l = np.sqrt(_dot(v, v))
+            radius = segments[obstacle, 6]
+
+            inside = (l < radius) & (l > 0.0) & movable[particle]
+            push = v[inside] * ((radius[inside] - l[inside]) / l[inside])[:, None]
+            particle = particle[inside]
+            for k in range(3):
+                position[:, k] += np.bincount(particle, push[:, k], len(position))
+            pushed[particle] = True
+
+        # -- half spaces, few enough to test every particle against each
+        if len(self.planes):
+            depth = self.planes[:, 3] - position @ self.planes[:, :3].T
+            depth = np.where(movable[:, None], np.maximum(depth, 0.0), 0.0)
+            position += depth @ self.planes[:, :3]
+            pushed |= depth.any(axis=1)
+
+        for mesh in self.meshes:
+            offset = mesh.push(position)
+            offset[~movable] = 0.0
+            position += offset
+            pushed |= offset.any(axis=1)
+
+        return int(pushed.sum())
+
+
+def _require_gl():
+    if not HAS_GL:
+        raise ImportError('drawing clothsim needs PyOpenGL with GLU and GLUT')
+
+
+class ClothRenderer:
+    """Draws a cloth from three buffers: a static index buffer of its
+    triangles, a static buffer of vertex colors and a persistent buffer
+    that positions and normals are streamed into once per frame.
+
+    Triangles of different colors cannot share a vertex, so each particle
+    gets one vertex per color of the triangles around it.
+    """
+
+    # -- bytes per streamed vertex, position then normal as floats
+    STRIDE = 24
+
+    def __init__(self, cloth):
+        self.cloth = cloth
+
+        palette, color_id = np.unique(cloth.triangle_colors, axis=0, return_inverse=True)
+        color_id = color_id.reshape(-1)
+        key = cloth.triangles * len(palette) + color_id[:, None]
+        key, indices = np.unique(key, return_inverse=True)
+
+        # -- the particle each vertex copies, its color and the triangles
+        # -- as vertex indices
+        self.source = key // len(palette)
+        self.colors = palette[key % len(palette)].astype(np.float32)
+        self.indices = indices.reshape(-1, 3).astype(np.uint32)
+
+        self.vertices = np.zeros((len(self.source), 6), dtype=np.float32)
+        self.buffers = None
+
+    def build(self):
+        """Interleaved positions and normals of every vertex for this frame."""
+        cloth = self.cloth
+        cloth.calc_normals()
+        self.vertices[:, :3] = cloth.position[self.source]
+        self.vertices[:, 3:] = cloth.normal[self.source]
+        return self.vertices
+
+    def create(self):
+        _require_gl()
+        vertices, colors, indices = self.buffers = glGenBuffers(3)
+
+        glBindBuffer(GL_ARRAY_BUFFER, vertices)
+        glBufferData(GL_ARRAY_BUFFER, self.vertices.nbytes, None, GL_STREAM_DRAW)
+
+        glBindBuffer(GL_ARRAY_BUFFER, colors)
+        glBufferData(GL_ARRAY_BUFFER, self.colors.nbytes, self.colors, GL_STATIC_DRAW)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, indices)
+        glBufferData(GL_ELEMENT_ARRAY_BUFFER, self.indices.nbytes, self.indices, GL_STATIC_DRAW)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0)
+
+    def draw(self):
+        if self.buffers is None:
+            self.create()
+        vertices, colors, indices = self.buffers
+        data = self.build()
+
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glEnableClientState(GL_NORMAL_ARRAY)
+        glEnableClientState(GL_COLOR_ARRAY)
+
+        glBindBuffer(GL_ARRAY_BUFFER, vertices)
+        glBufferSubData(GL_ARRAY_BUFFER, 0, data.nbytes, data)
+        glVertexPointer(3, GL_FLOAT, self.STRIDE, c_void_p(0))
+        glNormalPointer(GL_FLOAT, self.STRIDE, c_void_p(12))
+
+        glBindBuffer(GL_ARRAY_BUFFER, colors)
+        glColorPointer(3, GL_FLOAT, 0, c_void_p(0))
 
-        glNormal3fv(varr(p2.get_normal().normalized() ))
-        glVertex3fv(varr(p2.get_pos() ))
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, indices)
+        glDrawElements(GL_TRIANGLES, self.indices.size, GL_UNSIGNED_INT, c_void_p(0))
 
-        glNormal3fv(varr(p3.get_normal().normalized() ))
-        glVertex3fv(varr(p3.get_pos() ))
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        glDisableClientState(GL_COLOR_ARRAY)
+        glDisableClientState(GL_NORMAL_ARRAY)
+        glDisableClientState(GL_VERTEX_ARRAY)
 
-    def draw_shaded(self):
-        # reset normals 
-        for p in self._particles:
-            p.reset_normal()
-
-        # make smooth per particle normals
-        for x in range(self._num_particles_width-1):
-            for y in range(self._num_particles_height-1):
-                p1, p2, p3 = (
-                    self._get_particle(x+1, y),
-                    self._get_particle(x, y),
-                    self._get_particle(x, y+1)
-                )
-
-                n = self.calc_tri_normal(p1, p2, p3)
-                p1.add_to_normal(n)
-                p2.add_to_normal(n)
-                p3.add_to_normal(n)
-
-                p1, p2, p3 = (
-                    self._get_particle(x+1, y+1),
-                    self._get_particle(x+1, y),
-                    self._get_particle(x, y+1)
-                )
-
-                n = self.calc_tri_normal(p1, p2, p3)
-                p1.add_to_normal(n)
-                p2.add_to_normal(n)
-                p3.add_to_normal(n)
-
-        glBegin(GL_TRIANGLES)
-        for x in range(self._num_particles_width-1):
-            for y in range(self._num_particles_height-1):
-
-                color = Vec3(.6, .2, .2) if x%2 else Vec3.one()
-                self.draw_tri(
-                    self._get_particle(x+1, y),
-                    self._get_particle(x, y),
-                    self._get_particle(x, y+1),
-                    color
-                )
-
-                self.draw_tri(
-                    self._get_particle(x+1, y+1),
-                    self._get_particle(x+1, y),
-                    self._get_particle(x, y+1),
-                    color
-                )
-        glEnd()
 
-    def time_step(self):
+class Simulation:
+    """The cloth under gravity and wind with a ball swinging through it.
 
-        for _ in range(CONSTRAINT_ITERATIONS):
-            for c in self._constraints:
-                c.satisfy_constraint()
+    Stepping needs no GL, display only draws what step left behind, so the
+    simulation also runs headless. More obstacles go in self.colliders.
+    """
 
-        for p in self._particles:
-            p.time_step()
+    def __init__(self, cloth=None, ball_radius=2):
+        self.cloth = cloth or Cloth(10, 10, 10, 10, thickness=0.75)
+        self.ball_pos = Vec3(7, -5, 0)
+        self.ball_radius = ball_radius
+        self.ball_time = 0
 
-    def add_force(self, direction):
-        # use to add gravity and other forces to all particles
-        for p in self._particles:
-            p.add_force(direction)
+        self.colliders = Colliders()
+        self.ball = self.colliders.add_sphere(self.ball_pos, ball_radius)
 
+    def step(self):
+        self.ball_time += 1
+        self.ball_pos.z = math.cos(self.ball_time/50)*7
+        self.colliders.spheres[self.ball, :3] = tuple(self.ball_pos)
 
-    def wind_force(self, direction):
-        # add wind force to all particles
-        for x in range(self._num_particles_width-1):
-            for y in range(self._num_particles_height-1):
-                self.add_wind_forces_for_tri(
-                    self._get_particle(x+1, y),
-                    self._get_particle(x,y),
-                    self._get_particle(x, y+1),
-                    direction
-                )
-
-                self.add_wind_forces_for_tri(
-                    self._get_particle(x+1, y+1),
-                    self._get_particle(x+1,y),
-                    self._get_particle(x, y+1),
-                    direction
-                )
+        cloth = self.cloth
+        cloth.add_force(Vec3(0, -0.2, 0) * TIME_STEP)
+        cloth.wind_force(Vec3(0.5, 0, 0.2) * TIME_STEP)
+        cloth.time_step()
+        cloth.collide(self.colliders)
 
-    def ball_collision(self, center, radius):
-        for p in self._particles:
-            v = p.get_pos() - center 
-            l = v.length()
-            if l < radius:
-                p.offset_pos(v.normalized()*(radius-l))
-    
+    def run(self, steps):
+        for _ in range(steps):
+            self.step()
 
-cloth = Cloth(10, 10, 10, 10)
-ball_pos = Vec3(7, -5, 0)
-ball_radius = 2
 
-ball_time = 0
+simulation = None
 
 def init():
     glShadeModel(GL_SMOOTH)
@@ -393,16 +841,8 @@ def init():
 
 
 def display():
-    global ball_time
-
-    ball_time += 1
-    ball_pos.z = math.cos(ball_time/50)*7
-
-
-    cloth.add_force(Vec3(0, -0.2, 0) * TIME_STEP)
-    cloth.wind_force(Vec3(0.5, 0, 0.2) * TIME_STEP)
-    cloth.time_step()
-    cloth.ball_collision(ball_pos, ball_radius)
+    simulation.step()
+    cloth, ball_pos, ball_radius = simulation.cloth, simulation.ball_pos, simulation.ball_radius
 
 
     # -- drawing
@@ -448,7 +888,12 @@ def reshape(w, h):
 
 
 
-if __name__ == '__main__':
+def main():
+    global simulation
+
+    _require_gl()
+    simulation = Simulation()
+
     glutInit()
     glutInitDisplayMode(GLUT_RGB | GLUT_DOUBLE | GLUT_DEPTH)
     glutInitWindowSize(1000, 600)
@@ -459,3 +904,7 @@ if __name__ == '__main__':
     glutReshapeFunc(reshape)
 
     glutMainLoop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,834 @@
+import gc
+import os
+import json
+import tracemalloc
+import sys
+import copy
+import math
+import time
+import argparse
+
+from random import seed
+from physics2d import batch, harness
+from physics2d.backend import create_scene
+from physics2d.shape import PolygonPrototype
+from physics2d.solver import SequentialSolver, ColoredSolver
+from physics2d.utils import random
+from physics2d.scene import IntegrateForces, IntegrateVelocity
+from physics2d.constants import GRAVITY
+from physics2d.replay import state_digest
+from physics2d import (
+    Scene, Circle, Polygon, Vector2, BodyArray, StepProfiler,
+    BruteForce, SweepAndPrune, SpatialHash, DynamicTree
+)
+
+
+BROADPHASES = {
+    'brute': BruteForce,
+    'sap': SweepAndPrune,
+    'hash': SpatialHash,
+    'tree': DynamicTree,
+}
+
+# -- brute force is quadratic, beyond this it would run for minutes
+BRUTE_LIMIT = 1000
+
+
+def make_scene(count: int, broadphase=None, world=None) -> Scene:
+    scene = Scene(1.0 / 60.0, 10, broadphase, world)
+
+    # -- keep the body density constant so every size sees similar crowding
+    extent = math.sqrt(count) * 4.0
+    for _ in range(count):
+        scene.add(Circle(random(0.5, 1.5)), random(0, extent), random(0, extent))
+    return scene
+
+
+def bench_broadphase(counts, steps):
+    print('{:>6} {:>8} {:>14} {:>12}'.format('method', 'bodies', 'pairs/step', 'ms/step'))
+    for count in counts:
+        for name, cls in BROADPHASES.items():
+            if cls is BruteForce and count > BRUTE_LIMIT:
+                pairs = count * (count - 1) // 2
+                print('{:>6} {:>8} {:>14} {:>12}'.format(name, count, pairs, '-'))
+                continue
+
+            scene = make_scene(count, cls())
+
+            pairs = 0
+            elapsed = 0.0
+            for _ in range(steps):
+                pairs += sum(1 for _ in scene.broadphase.pairs(scene.bodies))
+
+                start = time.perf_counter()
+                scene.step()
+                elapsed += time.perf_counter() - start
+
+            print('{:>6} {:>8} {:>14} {:>12.2f}'.format(
+                name, count, pairs // steps, elapsed / steps * 1000.0))
+
+
+def bench_integrate(counts, steps):
+    print('{:>6} {:>8} {:>12}'.format('store', 'bodies', 'ms/step'))
+    for count in counts:
+        scene = make_scene(count)
+        dt = scene.dt
+
+        start = time.perf_counter()
+        for _ in range(steps):
+            for b in scene.bodies:
+                IntegrateForces(b, dt)
+            for b in scene.bodies:
+                IntegrateVelocity(b, dt)
+            for b in scene.bodies:
+                b.force = Vector2()
+                b.torque = 0.0
+        elapsed = time.perf_counter() - start
+        print('{:>6} {:>8} {:>12.3f}'.format('body', count, elapsed / steps * 1000.0))
+
+        world = make_scene(count, world=BodyArray()).world
+
+        start = time.perf_counter()
+        for _ in range(steps):
+            world.integrate_forces(dt)
+            world.integrate_velocity(dt)
+            world.clear_forces()
+        elapsed = time.perf_counter() - start
+        print('{:>6} {:>8} {:>12.3f}'.format('array', count, elapsed / steps * 1000.0))
+
+
+def bench_query(counts, steps):
+    print('{:>8} {:>10} {:>10} {:>10} {:>10} {:>10}'.format(
+        'bodies', 'update ms', 'point ms', 'scan ms', 'ray ms', 'scan ms'))
+    for count in counts:
+        scene = make_scene(count)
+        tree = scene.spatial_index()
+        extent = math.sqrt(count) * 4.0
+
+        update = 0.0
+        for _ in range(steps):
+            scene.step()
+            start = time.perf_counter()
+            tree.update(scene.bodies)
+            update += time.perf_counter() - start
+
+        points = [Vector2(random(0, extent), random(0, extent)) for _ in range(100)]
+        rays = [(p, Vector2(random(-1, 1), random(-1, 1))) for p in points]
+
+        start = time.perf_counter()
+        for p in points:
+            list(scene.query_point(p.x, p.y))
+        point = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for p in points:
+            [b for b in scene.bodies if b.shape.test_point(p)]
+        point_scan = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for p, d in rays:
+            scene.raycast(p, d, 20.0)
+        ray = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for p, d in rays:
+            end = p + Vector2(d.x, d.y).normalize() * 20.0
+            min((h[0] for h in (b.shape.raycast(p, end) for b in scene.bodies) if h), default=None)
+        ray_scan = time.perf_counter() - start
+
+        print('{:>8} {:>10.3f} {:>10.3f} {:>10.3f} {:>10.3f} {:>10.3f}'.format(
+            count, update / steps * 1000.0, point * 10.0, point_scan * 10.0,
+            ray * 10.0, ray_scan * 10.0))
+
+
+def bench_narrowphase(counts, steps):
+    print('{:>6} {:>8} {:>10} {:>12}'.format('batch', 'bodies', 'contacts', 'ms/collide'))
+    for count in counts:
+        for batching in (False, True):
+            scene = make_scene(count)
+            scene.batching = batching
+
+            # -- let the initial overlaps push apart into resting contacts
+            for _ in range(steps):
+                scene.step()
+
+            start = time.perf_counter()
+            for _ in range(steps):
+                scene.collide()
+            elapsed = time.perf_counter() - start
+            print('{:>6} {:>8} {:>10} {:>12.2f}'.format(
+                'on' if batching else 'off', count, len(scene.contacts),
+                elapsed / steps * 1000.0))
+
+
+def make_stack(height: int, iterations: int, warm_starting: bool) -> Scene:
+    scene = Scene(1.0 / 60.0, iterations, warm_starting=warm_starting)
+
+    ground = Polygon()
+    ground.set_box(30.0, 1.0)
+    b = scene.add(ground, 40, 55)
+    b.set_orient(0.0)
+    b.set_static()
+
+    for k in range(height):
+        box = Polygon()
+        box.set_box(1.5, 1.5)
+        b = scene.add(box, 40, 52.5 - k * 3.0)
+        b.set_orient(0.0)
+        b.restitution = 0.0
+    return scene
+
+
+def bench_stack(heights, steps):
+    print('{:>6} {:>6} {:>6} {:>10} {:>10} {:>10}'.format(
+        'height', 'iters', 'warm', 'drift', 'top drop', 'ms/step'))
+    for height in heights:
+        for iterations in (10, 3):
+            for warm_starting in (False, True):
+                scene = make_stack(height, iterations, warm_starting)
+                top = scene.bodies[-1]
+                start_y = top.position.y
+
+                start = time.perf_counter()
+                for _ in range(steps):
+                    scene.step()
+                elapsed = time.perf_counter() - start
+
+                # -- a standing stack keeps every box over the ground centre
+                drift = max(abs(b.position.x - 40.0) for b in scene.bodies[1:])
+                print('{:>6} {:>6} {:>6} {:>10.3f} {:>10.3f} {:>10.2f}'.format(
+                    height, iterations, 'on' if warm_starting else 'off', drift,
+                    top.position.y - start_y, elapsed / steps * 1000.0))
+
+
+class AllocationCounter:
+    # -- counts Vector2 constructions and generation 0 collections while active
+    def __init__(self):
+        self.vectors = 0
+        self.collections = 0
+
+    def __enter__(self):
+        init = self.init = Vector2.__init__
+
+        def counting_init(vec, x=0.0, y=0.0):
+            self.vectors += 1
+            init(vec, x, y)
+
+        Vector2.__init__ = counting_init
+        gc.callbacks.append(self.on_gc)
+        return self
+
+    def __exit__(self, *exc):
+        Vector2.__init__ = self.init
+        gc.callbacks.remove(self.on_gc)
+
+    def on_gc(self, phase, info):
+        if phase == 'start' and info['generation'] == 0:
+            self.collections += 1
+
+
+def bench_alloc(counts, steps):
+    print('{:>6} {:>8} {:>10} {:>14} {:>14} {:>14}'.format(
+        'scene', 'bodies', 'contacts', 'Vector2/step', 'Vector2/solve', 'gc0/1k steps'))
+    for count in counts:
+        for name, scene in (('stack', make_stack(count, 10, True)),
+                            ('pile', make_pile(count * 5, sleeping=False))):
+            for _ in range(steps):
+                scene.step()
+
+            with AllocationCounter() as counter:
+                for _ in range(steps):
+                    scene.step()
+
+            # -- the contact solver on its own, prepare and warm start plus
+            # -- every iteration
+            with AllocationCounter() as solver:
+                v = scene.gather_velocities()
+                for c in scene.contacts:
+                    c.prepare(v, scene.dt)
+                for c in scene.contacts:
+                    c.warm_start(v, scene.warm_starting)
+                for _ in range(scene.iterations):
+                    for c in scene.contacts:
+                        c.apply_impulse(v)
+
+            print('{:>6} {:>8} {:>10} {:>14.1f} {:>14} {:>14.1f}'.format(
+                name, len(scene.bodies), len(scene.contacts), counter.vectors / steps,
+                solver.vectors, counter.collections / steps * 1000.0))
+
+
+def bench_profile(counts, steps):
+    print('{:>8} {:>10} {:>10} {:>10}'.format('bodies', 'off ms', 'on ms', 'overhead'))
+    for count in counts:
+        times = list()
+        for prof in (None, StepProfiler(steps)):
+            # -- the same pile both times so only the profiler differs
+            seed(count)
+            scene = make_pile(count, sleeping=False)
+            scene.profiler = prof
+
+            start = time.perf_counter()
+            for _ in range(steps):
+                scene.step()
+            times.append((time.perf_counter() - start) / steps * 1000.0)
+
+        print('{:>8} {:>10.3f} {:>10.3f} {:>9.1f}%'.format(
+            count, times[0], times[1], (times[1] / times[0] - 1.0) * 100.0))
+        for name, stats in prof.summary().items():
+            print('{:>20} {:>10.3f} {:>10.3f}'.format(name, stats['mean'], stats['max']))
+
+
+def bench_solver(counts, steps):
+    print('{:>10} {:>8} {:>10} {:>8} {:>10} {:>10}'.format(
+        'solver', 'bodies', 'contacts', 'colors', 'solve ms', 'step ms'))
+    for count in counts:
+        for solver in (SequentialSolver(), ColoredSolver()):
+            seed(count)
+            scene = make_pile(count, sleeping=False)
+            scene.solver = solver
+
+            # -- time the settled pile, where the contact count is highest
+            for _ in range(steps):
+                scene.step()
+            scene.profiler = StepProfiler(steps)
+            for _ in range(steps):
+                scene.step()
+
+            summary = scene.profiler.summary()
+            print('{:>10} {:>8} {:>10.0f} {:>8} {:>10.3f} {:>10.3f}'.format(
+                type(solver).__name__[:-6].lower(), count, summary['contacts']['mean'],
+                getattr(solver, 'colors', '-'), summary['solve_ms']['mean'],
+                summary['total_ms']['mean']))
+
+
+def make_shooting_range(count: int, speed: float, ccd: bool) -> Scene:
+    scene = Scene(1.0 / 60.0, 10, ccd=ccd)
+
+    # -- a wall thinner than anything fired at it
+    wall = Polygon()
+    wall.set_box(0.2, count * 1.5 + 5.0)
+    b = scene.add(wall, 60, 30)
+    b.set_orient(0.0)
+    b.set_static()
+
+    for k in range(count):
+        if k % 2:
+            b = scene.add(Circle(0.4), 10, 30 + (k - count / 2) * 3.0)
+        else:
+            box = Polygon()
+            box.set_box(0.4, 0.4)
+            b = scene.add(box, 10, 30 + (k - count / 2) * 3.0)
+        b.velocity = Vector2(speed, -GRAVITY.y * 0.25)
+    return scene
+
+
+def bench_ccd(counts, steps):
+    print('{:>6} {:>8} {:>8} {:>10} {:>10}'.format('ccd', 'bodies', 'speed', 'tunneled', 'ms/step'))
+    for count in counts:
+        for speed in (100.0, 400.0, 1200.0):
+            for ccd in (False, True):
+                scene = make_shooting_range(count, speed, ccd)
+
+                start = time.perf_counter()
+                for _ in range(steps):
+                    scene.step()
+                elapsed = time.perf_counter() - start
+
+                tunneled = sum(1 for b in scene.bodies[1:] if b.position.x > 60)
+                print('{:>6} {:>8} {:>8.0f} {:>10} {:>10.3f}'.format(
+                    'on' if ccd else 'off', count, speed, tunneled,
+                    elapsed / steps * 1000.0))
+
+
+def make_pile(count: int, sleeping: bool, backend: str = 'python') -> Scene:
+    scene = create_scene(1.0 / 60.0, 10, backend, sleeping=sleeping)
+
+    # -- open box the pile settles in
+    rows = max(count // 20, 1)
+    for x, y, hw, hh in ((40, 55, 30, 1), (11, 50 - rows * 1.5, 1, rows * 1.5 + 4),
+                         (69, 50 - rows * 1.5, 1, rows * 1.5 + 4)):
+        wall = Polygon()
+        wall.set_box(hw, hh)
+        b = scene.add(wall, x, y)
+        b.set_orient(0.0)
+        b.set_static()
+
+    for k in range(count):
+        b = scene.add(Circle(random(0.8, 1.2)), 15 + (k % 20) * 2.5, 50 - (k // 20) * 2.5)
+        b.restitution = 0.0
+    return scene
+
+
+def bench_sleep(counts, steps):
+    print('{:>6} {:>8} {:>8} {:>12}'.format('sleep', 'bodies', 'awake', 'ms/step'))
+    for count in counts:
+        for sleeping in (False, True):
+            scene = make_pile(count, sleeping)
+
+            # -- let the pile settle before measuring
+            for _ in range(steps):
+                scene.step()
+
+            start = time.perf_counter()
+            for _ in range(50):
+                scene.step()
+            elapsed = time.perf_counter() - start
+
+            awake = sum(1 for b in scene.bodies if b.inv_mass and b.awake)
+            print('{:>6} {:>8} {:>8} {:>12.3f}'.format(
+                'on' if sleeping else 'off', count, awake, elapsed / 50 * 1000.0))
+
+
+def make_sweep(restitution: float, friction: float, iterations: int) -> Scene:
+    scene = make_pile(20, sleeping=True)
+    scene.iterations = iterations
+    for b in scene.bodies[3:]:
+        b.restitution = restitution
+        b.static_friction = friction
+        b.dynamic_friction = friction * 0.6
+    return scene
+
+
+def bench_batch(counts, steps):
+    print('{:>9} {:>8} {:>10} {:>14}'.format('processes', 'scenes', 'ms/scene', 'penetration'))
+    for count in counts:
+        params = list(batch.grid(
+            restitution=[0.0, 0.2, 0.5],
+            friction=[0.2, 0.5],
+            iterations=[5, 10]
+        ))
+        jobs = [batch.Job(make_sweep, params[k % len(params)]) for k in range(count)]
+
+        for processes in (0, None):
+            start = time.perf_counter()
+            penetration = 0.0
+            for result in batch.run(jobs, steps, processes, every=10, chunk=100):
+                if len(result.metrics):
+                    penetration = max(penetration, float(result.metrics[:, 3].max()))
+            elapsed = time.perf_counter() - start
+
+            print('{:>9} {:>8} {:>10.2f} {:>14.3f}'.format(
+                processes if processes is not None else 'pool', count,
+                elapsed / count * 1000.0, penetration))
+
+
+def bench_snapshot(counts, steps):
+    print('{:>8} {:>10} {:>12} {:>12} {:>12} {:>10}'.format(
+        'bodies', 'bytes', 'capture us', 'restore us', 'deepcopy us', 'rollback'))
+    for count in counts:
+        scene = make_pile(count, sleeping=True)
+        for _ in range(steps):
+            scene.step()
+
+        repeat = 50
+        start = time.perf_counter()
+        for _ in range(repeat):
+            data = scene.snapshot()
+        capture = (time.perf_counter() - start) / repeat
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            scene.restore(data)
+        restore = (time.perf_counter() - start) / repeat
+
+        start = time.perf_counter()
+        for _ in range(5):
+            copy.deepcopy(scene)
+        deepcopy = (time.perf_counter() - start) / 5
+
+        # -- rolled back and re-simulated frames must land on the same state
+        for _ in range(30):
+            scene.step()
+        expected = state_digest(scene)
+        scene.resimulate(data, 30)
+        same = state_digest(scene) == expected
+
+        print('{:>8} {:>10} {:>12.1f} {:>12.1f} {:>12.1f} {:>10}'.format(
+            count, len(data), capture * 1e6, restore * 1e6, deepcopy * 1e6,
+            'exact' if same else 'DIVERGED'))
+
+
+def bench_render(counts, steps):
+    from physics2d.render import BatchRenderer
+
+    # -- vertex building only, uploading and drawing needs a GL context
+    print('{:>8} {:>10} {:>10} {:>14} {:>10}'.format(
+        'bodies', 'vertices', 'contacts', 'immediate gl', 'build ms'))
+    for count in counts:
+        scene = make_pile(count, sleeping=True)
+        for _ in range(steps):
+            scene.step()
+
+        renderer = BatchRenderer()
+        renderer.build(scene)
+        start = time.perf_counter()
+        for _ in range(20):
+            shapes, contacts = renderer.build(scene)
+        elapsed = (time.perf_counter() - start) / 20
+
+        # -- calls the immediate mode path made for the same frame, color,
+        # -- begin and end around every outline plus one per vertex
+        immediate = sum(
+            27 if isinstance(b.shape, Circle) else 3 + b.shape.vertex_count
+            for b in scene.bodies
+        ) + len(contacts) + 8
+
+        print('{:>8} {:>10} {:>10} {:>14} {:>10.3f}'.format(
+            count, len(shapes), len(contacts) // 3, immediate, elapsed * 1000.0))
+
+
+def bench_backends(counts, steps):
+    print('{:>8} {:>8} {:>14} {:>12} {:>12} {:>10}'.format(
+        'backend', 'bodies', 'deterministic', 'divergence', 'penetration', 'ms/step'))
+    for count in counts:
+        def factory(backend, count=count):
+            seed(count)
+            return make_pile(count, False, backend)
+
+        for report in harness.check(factory, steps):
+            print('{:>8} {:>8} {:>14} {:>12.3f} {:>12.3f} {:>10.3f}'.format(
+                report.backend, count, 'yes' if report.deterministic else 'NO',
+                report.max_divergence, report.max_penetration, report.ms_per_step))
+
+
+def bench_spawn(counts, steps):
+    print('{:>8} {:>8} {:>12} {:>14}'.format('cache', 'bodies', 'us/body', 'bytes/body'))
+    box = Polygon()
+    box.set_box(1.0, 1.0)
+    for count in counts:
+        for cached in (False, True):
+            PolygonPrototype.clear_cache()
+            scene = Scene(1.0 / 60.0, 10)
+
+            tracemalloc.start()
+            start = time.perf_counter()
+            for k in range(count):
+                if not cached:
+                    PolygonPrototype.clear_cache()
+                scene.add(box, k % 100, k // 100)
+            elapsed = time.perf_counter() - start
+            size, _ = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            print('{:>8} {:>8} {:>12.2f} {:>14.0f}'.format(
+                'on' if cached else 'off', count, elapsed / count * 1e6, size / count))
+
+
+def make_sticks(count: int):
+    import stick_physics
+
+    # -- an eighth of the particles in boxes, circles falling on them from the
+    # -- rows above, the world grows so the crowding stays the same
+    spacing = 25.0
+    boxes = max(count // 8, 1)
+    circles = count - boxes * 4
+    per_row = int(math.sqrt(boxes + circles)) + 1
+    rows = (boxes + per_row - 1) // per_row + (circles + per_row - 1) // per_row
+    world = stick_physics.World(lower=0, upper=max(per_row, rows) * spacing + 20, capacity=count)
+
+    at = lambda k, dx, dy: stick_physics.Vec3((k % per_row) * spacing + dx, (k // per_row) * spacing + dy, 0)
+    for k in range(boxes):
+        stick_physics.Box(world, at(k, 10, 10), 10, 10, radius=2)
+    first = (boxes + per_row - 1) // per_row * per_row
+    for k in range(circles):
+        stick_physics.Circle(world, at(first + k, 15, 15), 4)
+    return world
+
+
+def bench_stacked(counts, steps):
+    import numpy as np
+    import stick_physics
+
+    # -- boxes dropped in a column, their corner particles must keep them
+    # -- apart, a gap below the allowed overlap fails the run
+    print('{:>8} {:>8} {:>10}'.format('boxes', 'radius', 'gap'))
+    radius, side = 3.0, 20.0
+    for count in counts:
+        world = stick_physics.World(lower=0, upper=(side + 4 * radius) * count + 20)
+        boxes = [
+            stick_physics.Box(world, stick_physics.Vec3(50, radius + k * (side + 4 * radius), 0),
+                              side, side, radius=radius)
+            for k in range(count)]
+        stick_physics.simulate(world, steps)
+
+        gap = float('inf')
+        for lower, upper in zip(boxes, boxes[1:]):
+            a, b = world.position[lower.index], world.position[upper.index]
+            distance = np.linalg.norm(a[:, None] - b[None], axis=2)
+            gap = min(gap, float(distance.min()) - 2 * radius)
+        print('{:>8} {:>8.1f} {:>10.3f}'.format(count, radius, gap))
+        if gap < -0.25 * radius:
+            sys.exit('stacked boxes overlap by {:.3f}'.format(-gap))
+
+
+def import_clothsim():
+    # -- clothsim lives next to this package
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if root not in sys.path:
+        sys.path.insert(0, root)
+    import clothsim
+    return clothsim
+
+
+def make_cloth(count: int):
+    clothsim = import_clothsim()
+
+    # -- particles a unit apart as in the demo, the pinned corners are nudged
+    # -- half a unit and would land on their neighbours in a denser cloth
+    side = max(int(math.sqrt(count)), 3)
+    return clothsim.Simulation(clothsim.Cloth(side, side, side, side, thickness=0.75))
+
+
+def traced(build):
+    # -- (result, bytes still allocated after build returns)
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size
+
+
+def measure(step, steps: int) -> tuple:
+    # -- (seconds for steps steps, peak bytes allocated by one more), tracing
+    # -- slows python code down so timing runs untraced
+    gc.collect()
+    start = time.perf_counter()
+    for _ in range(steps):
+        step()
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    step()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def report_verlet(command, rows):
+    print('{:>8} {:>10} {:>12} {:>12} {:>16} {:>10} {:>12}'.format(
+        'command', 'particles', 'constraints', 'steps/s', 'solves/s', 'state KB', 'step KB'))
+    for row in rows:
+        print('{:>8} {:>10} {:>12} {:>12.1f} {:>16.0f} {:>10.1f} {:>12.1f}'.format(
+            command, row['particles'], row['constraints'], row['steps_per_s'],
+            row['solves_per_s'], row['state_bytes'] / 1024.0, row['peak_bytes'] / 1024.0))
+    return rows
+
+
+def bench_sticks(counts, steps):
+    import stick_physics
+
+    rows = list()
+    for count in counts:
+        world, size = traced(lambda: make_sticks(count))
+        stick_physics.simulate(world, 1)
+
+        elapsed, peak = measure(lambda: stick_physics.simulate(world, 1), steps)
+        solves = len(world.i) * stick_physics.CONSTRAINT_ITERATIONS * steps
+        rows.append(dict(
+            command='sticks', particles=world.count, constraints=len(world.i),
+            steps_per_s=steps / elapsed, solves_per_s=solves / elapsed,
+            state_bytes=size, peak_bytes=peak))
+    return report_verlet('sticks', rows)
+
+
+def bench_cloth(counts, steps):
+    clothsim = import_clothsim()
+
+    rows = list()
+    for count in counts:
+        simulation, size = traced(lambda: make_cloth(count))
+
+        cloth = simulation.cloth
+        particles = cloth.count
+        constraints = len(cloth.i)
+
+        elapsed, peak = measure(simulation.step, steps)
+        solves = constraints * clothsim.CONSTRAINT_ITERATIONS * steps
+        rows.append(dict(
+            command='cloth', particles=particles, constraints=constraints,
+            steps_per_s=steps / elapsed, solves_per_s=solves / elapsed,
+            state_bytes=size, peak_bytes=peak))
+    return report_verlet('cloth', rows)
+
+
+def bench_colliders(counts, steps):
+    import numpy as np
+    clothsim = import_clothsim()
+
+    print('{:>10} {:>10} {:>12}'.format('particles', 'obstacles', 'ms/collide'))
+    for count in counts:
+        simulation = make_cloth(count)
+        cloth = simulation.cloth
+        lower, upper = cloth.position.min(axis=0), cloth.position.max(axis=0)
+        rng = np.random.default_rng(count)
+
+        # -- one ball against dozens of spheres and capsules scattered over
+        # -- the cloth plus a floor, each set tested in one batch
+        one = clothsim.Colliders()
+        one.add_sphere((lower + upper) / 2, 2)
+
+        many = clothsim.Colliders()
+        for _ in range(24):
+            many.add_sphere(rng.uniform(lower, upper), rng.uniform(0.5, 2.5))
+            start = rng.uniform(lower, upper)
+            many.add_capsule(start, start + rng.uniform(-4, 4, 3), rng.uniform(0.3, 1.0))
+        many.add_plane((0, 1, 0), (0, lower[1], 0))
+
+        for colliders in (one, many):
+            obstacles = len(colliders.spheres) + len(colliders.capsules) + len(colliders.planes)
+            start = time.perf_counter()
+            for _ in range(steps):
+                cloth.collide(colliders)
+            elapsed = time.perf_counter() - start
+            print('{:>10} {:>10} {:>12.3f}'.format(cloth.count, obstacles, elapsed / steps * 1000.0))
+
+
+def compare(rows, baseline, tolerance: float) -> list:
+    """Rows slower or hungrier than the baseline row for the same command and
+    particle count by more than tolerance, as messages."""
+    expected = {(row['command'], row['particles']): row for row in baseline}
+    failures = list()
+    for row in rows:
+        old = expected.get((row['command'], row['particles']))
+        if old is None:
+            continue
+        if row['steps_per_s'] < old['steps_per_s'] * (1.0 - tolerance):
+            failures.append('{command} {particles}: {:.1f} steps/s, baseline {:.1f}'.format(
+                row['steps_per_s'], old['steps_per_s'], **row))
+        for key in ('state_bytes', 'peak_bytes'):
+            if row[key] > old[key] * (1.0 + tolerance):
+                failures.append('{command} {particles}: {} {}, baseline {}'.format(
+                    row[key], key, old[key], **row))
+    return failures
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='physics2d benchmarks')
+    parser.add_argument('--json', help='write the results of sticks and cloth to this file')
+    parser.add_argument('--baseline', help='results written by --json to fail against')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='fraction slower or larger than the baseline that still passes')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    broadphase = commands.add_parser('broadphase', help='pairs tested and step time per broad phase')
+    broadphase.add_argument('--counts', type=int, nargs='+', default=[100, 1000, 10000])
+    broadphase.add_argument('--steps', type=int, default=5)
+    broadphase.set_defaults(run=bench_broadphase)
+
+    integrate = commands.add_parser('integrate', help='per-body integration against BodyArray')
+    integrate.add_argument('--counts', type=int, nargs='+', default=[1000, 10000])
+    integrate.add_argument('--steps', type=int, default=20)
+    integrate.set_defaults(run=bench_integrate)
+
+    query = commands.add_parser('query', help='dynamic tree queries against scanning every body')
+    query.add_argument('--counts', type=int, nargs='+', default=[1000, 5000])
+    query.add_argument('--steps', type=int, default=5)
+    query.set_defaults(run=bench_query)
+
+    narrowphase = commands.add_parser('narrowphase', help='circle contacts per pair against batched')
+    narrowphase.add_argument('--counts', type=int, nargs='+', default=[1000, 5000])
+    narrowphase.add_argument('--steps', type=int, default=10)
+    narrowphase.set_defaults(run=bench_narrowphase)
+
+    stack = commands.add_parser('stack', help='box stack stability with and without warm starting')
+    stack.add_argument('--counts', type=int, nargs='+', default=[4, 8])
+    stack.add_argument('--steps', type=int, default=600)
+    stack.set_defaults(run=bench_stack)
+
+    alloc = commands.add_parser('alloc', help='Vector2 allocations and gc collections per step')
+    alloc.add_argument('--counts', type=int, nargs='+', default=[4, 8])
+    alloc.add_argument('--steps', type=int, default=200)
+    alloc.set_defaults(run=bench_alloc)
+
+    profile = commands.add_parser('profile', help='per phase step profile and profiler overhead')
+    profile.add_argument('--counts', type=int, nargs='+', default=[40, 100])
+    profile.add_argument('--steps', type=int, default=300)
+    profile.set_defaults(run=bench_profile)
+
+    solver = commands.add_parser('solver', help='sequential against graph colored contact solver')
+    solver.add_argument('--counts', type=int, nargs='+', default=[400, 2000])
+    solver.add_argument('--steps', type=int, default=200)
+    solver.set_defaults(run=bench_solver)
+
+    ccd = commands.add_parser('ccd', help='bodies tunneling through a thin wall with and without ccd')
+    ccd.add_argument('--counts', type=int, nargs='+', default=[10])
+    ccd.add_argument('--steps', type=int, default=60)
+    ccd.set_defaults(run=bench_ccd)
+
+    sleep = commands.add_parser('sleep', help='settled pile cost with and without sleeping')
+    sleep.add_argument('--counts', type=int, nargs='+', default=[40, 100])
+    sleep.add_argument('--steps', type=int, default=600)
+    sleep.set_defaults(run=bench_sleep)
+
+    sweep = commands.add_parser('batch', help='parameter sweep inline against a process pool')
+    sweep.add_argument('--counts', type=int, nargs='+', default=[24, 96])
+    sweep.add_argument('--steps', type=int, default=300)
+    sweep.set_defaults(run=bench_batch)
+
+    snapshot = commands.add_parser('snapshot', help='snapshot and restore cost against deepcopy')
+    snapshot.add_argument('--counts', type=int, nargs='+', default=[100, 1000])
+    snapshot.add_argument('--steps', type=int, default=120)
+    snapshot.set_defaults(run=bench_snapshot)
+
+    render = commands.add_parser('render', help='batched vertex building for Scene.render')
+    render.add_argument('--counts', type=int, nargs='+', default=[100, 1000])
+    render.add_argument('--steps', type=int, default=120)
+    render.set_defaults(run=bench_render)
+
+    backends = commands.add_parser('backends', help='python against numpy kernels on one scene')
+    backends.add_argument('--counts', type=int, nargs='+', default=[100, 400])
+    backends.add_argument('--steps', type=int, default=200)
+    backends.set_defaults(run=bench_backends)
+
+    spawn = commands.add_parser('spawn', help='adding boxes with and without the polygon prototype cache')
+    spawn.add_argument('--counts', type=int, nargs='+', default=[1000, 10000])
+    spawn.add_argument('--steps', type=int, default=0)
+    spawn.set_defaults(run=bench_spawn)
+
+    sticks = commands.add_parser('sticks', help='headless stick_physics steps, solves and memory')
+    sticks.add_argument('--counts', type=int, nargs='+', default=[500, 2000, 8000])
+    sticks.add_argument('--steps', type=int, default=100)
+    sticks.set_defaults(run=bench_sticks, rows=True)
+
+    stacked = commands.add_parser('stacked', help='stick_physics boxes stacked in a column stay apart')
+    stacked.add_argument('--counts', type=int, nargs='+', default=[2, 5])
+    stacked.add_argument('--steps', type=int, default=400)
+    stacked.set_defaults(run=bench_stacked)
+
+    cloth = commands.add_parser('cloth', help='headless clothsim steps, solves and memory')
+    cloth.add_argument('--counts', type=int, nargs='+', default=[400, 2500, 10000])
+    cloth.add_argument('--steps', type=int, default=20)
+    cloth.set_defaults(run=bench_cloth, rows=True)
+
+    colliders = commands.add_parser('colliders', help='clothsim cloth against one obstacle and dozens')
+    colliders.add_argument('--counts', type=int, nargs='+', default=[2500, 10000])
+    colliders.add_argument('--steps', type=int, default=50)
+    colliders.set_defaults(run=bench_colliders)
+
+    args = parser.parse_args(argv)
+    # -- only commands that return rows can be saved or checked, fail before
+    # -- running anything instead of passing silently
+    if (args.json or args.baseline) and not getattr(args, 'rows', False):
+        parser.error('--json and --baseline only apply to sticks and cloth, not ' + args.command)
+
+    rows = args.run(args.counts, args.steps)
+    if rows is None:
+        return 0
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(rows, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            failures = compare(rows, json.load(f), args.tolerance)
+        for message in failures:
+            print('REGRESSION', message, file=sys.stderr)
+        if failures:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -52,6 +52,12 @@ def on_mouse(scene: Scene, event):
         b.static_friction = 0.4
         del vertices
 
+    elif event.button == 2:  # == MIDDLE
+        # -- kick whatever is under the cursor upwards
+        for b in scene.query_point(x, y):
+            if b.inv_mass != 0.0:
+                b.apply_impulse(Vector2(0.0, -50.0) * b.mass, Vector2())
+
     elif event.button == 3:  # == RIGHT
         c = Circle(random(1.0, 3.0))
         b = scene.add(c, x, y)
@@ -70,6 +76,9 @@ def main():
     init_gl()
     init_scene(scene)
 
+    # -- simulate in fixed steps whatever the frame rate turns out to be
+    clock = pg.time.Clock()
+
     while True:
         for event in pg.event.get():
             should_exit = (
@@ -88,7 +97,7 @@ def main():
 
         gl.glClear(gl.GL_COLOR_BUFFER_BIT)
         gl.glClearColor(.2, .2, .2, 1.0)
-        scene.step()
+        scene.advance(clock.tick(60) / 1000.0)
         scene.render()
         pg.display.flip()
 
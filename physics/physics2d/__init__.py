@@ -1,4 +1,12 @@
 from .body import Body
 from .scene import Scene
 from .vector import Vector2
-from .shape import Circle, Polygon
\ No newline at end of file
+from .shape import Circle, Polygon
+from .broadphase import BruteForce, SweepAndPrune, SpatialHash
+from .bodyarray import BodyArray
+from .tree import DynamicTree
+from .solver import SequentialSolver, ColoredSolver
+from .replay import Recorder, ReplayError, replay, state_digest
+from .profiler import StepProfiler
+from .snapshot import SnapshotError
+from .backend import BACKENDS, create_scene
@@ -0,0 +1,45 @@
+class AABB:
+
+    __slots__ = 'min_x', 'min_y', 'max_x', 'max_y'
+
+    def __init__(self, min_x: float = 0.0, min_y: float = 0.0,
+                 max_x: float = 0.0, max_y: float = 0.0):
+        self.min_x = min_x
+        self.min_y = min_y
+        self.max_x = max_x
+        self.max_y = max_y
+
+    def __repr__(self):
+        return 'AABB({!r}, {!r}, {!r}, {!r})'.format(
+            self.min_x, self.min_y, self.max_x, self.max_y)
+
+    def overlaps(self, other: "AABB") -> bool:
+        return (
+            self.min_x <= other.max_x and other.min_x <= self.max_x and
+            self.min_y <= other.max_y and other.min_y <= self.max_y
+        )
+
+    def contains(self, other: "AABB") -> bool:
+        return (
+            self.min_x <= other.min_x and other.max_x <= self.max_x and
+            self.min_y <= other.min_y and other.max_y <= self.max_y
+        )
+
+    def contains_point(self, x: float, y: float) -> bool:
+        return self.min_x <= x <= self.max_x and self.min_y <= y <= self.max_y
+
+    def combine(self, other: "AABB") -> "AABB":
+        return AABB(
+            min(self.min_x, other.min_x), min(self.min_y, other.min_y),
+            max(self.max_x, other.max_x), max(self.max_y, other.max_y)
+        )
+
+    def fattened(self, margin: float) -> "AABB":
+        return AABB(
+            self.min_x - margin, self.min_y - margin,
+            self.max_x + margin, self.max_y + margin
+        )
+
+    @property
+    def perimeter(self) -> float:
+        return 2.0 * ((self.max_x - self.min_x) + (self.max_y - self.min_y))
@@ -0,0 +1,34 @@
+from typing import Any, Dict
+
+from .scene import Scene
+from .bodyarray import BodyArray
+from .solver import SequentialSolver, ColoredSolver
+
+
+# -- presets of Scene options per backend: body storage and integration,
+# -- batched narrow phase and contact solver. They are picked together, a
+# -- scene built by hand can mix them freely. Everything else is shared.
+BACKENDS: Dict[str, Dict[str, Any]] = {
+    'python': dict(world=None, batching=False, solver=SequentialSolver),
+    'numpy': dict(world=BodyArray, batching=True, solver=ColoredSolver),
+}
+
+
+def backend_options(backend: str) -> Dict[str, Any]:
+    # -- fresh Scene keyword arguments, storage and solvers are per scene
+    try:
+        kernels = BACKENDS[backend]
+    except KeyError:
+        raise ValueError('unknown backend {!r}, expected one of {}'.format(
+            backend, ', '.join(BACKENDS))) from None
+
+    world = kernels['world']
+    return dict(
+        world=world() if world is not None else None,
+        batching=kernels['batching'],
+        solver=kernels['solver'](),
+    )
+
+
+def create_scene(dt: float, iterations: int, backend: str = 'python', **options) -> Scene:
+    return Scene(dt, iterations, **backend_options(backend), **options)
@@ -0,0 +1,145 @@
+import os
+import queue
+import itertools
+import numpy as np
+
+from multiprocessing import Manager
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Callable, Dict, Iterable, Iterator, NamedTuple, Sequence
+
+from .scene import Scene
+
+
+# -- columns of the metrics array sampled from every scene
+METRICS = ('kinetic_energy', 'contacts', 'awake', 'max_penetration')
+
+
+class Job(NamedTuple):
+    factory: Callable[..., Scene]
+    params: Dict[str, Any]
+
+
+class Result(NamedTuple):
+    index: int
+    job: Job
+    # -- float32, one row per sampled step, one column per METRICS entry
+    metrics: np.ndarray
+    # -- row of the scene's whole metrics the first row here is, and whether
+    # -- this is the scene's last chunk
+    start: int = 0
+    final: bool = True
+
+
+def grid(**axes: Sequence[Any]) -> Iterator[Dict[str, Any]]:
+    names = list(axes)
+    for values in itertools.product(*(axes[name] for name in names)):
+        yield dict(zip(names, values))
+
+
+def jobs(factories: Iterable[Callable[..., Scene]], params: Iterable[Dict[str, Any]]) -> Iterator[Job]:
+    params = list(params)
+    for factory in factories:
+        for p in params:
+            yield Job(factory, p)
+
+
+def scene_metrics(scene: Scene, out: np.ndarray):
+    energy = 0.0
+    awake = 0
+    for b in scene.bodies:
+        if b.inv_mass == 0.0 or not b.awake:
+            continue
+        awake += 1
+        energy += 0.5 * (b.mass * b.velocity.length_sqr + b.moment * b.angular_velocity**2)
+
+    out[0] = energy
+    out[1] = len(scene.contacts)
+    out[2] = awake
+    out[3] = max((c.penetration for c in scene.contacts), default=0.0)
+
+
+def chunks(index: int, job: Job, steps: int, every: int = 1, chunk: int = None) -> Iterator[Result]:
+    """Simulate one job, yielding its metrics every `chunk` steps and once
+    more when it finishes, all of them at the end when chunk is None."""
+    scene = job.factory(**job.params)
+
+    # -- preallocated so a scene costs the same memory however long it runs
+    rows = steps // every
+    size = min(max(chunk // every, 1), rows) if chunk else rows
+    metrics = np.empty((size, len(METRICS)), dtype=np.float32)
+    start = filled = 0
+    for k in range(steps):
+        scene.step()
+        if (k + 1) % every:
+            continue
+
+        scene_metrics(scene, metrics[filled])
+        filled += 1
+        if filled == size and start + filled < rows:
+            yield Result(index, job, metrics.copy(), start, False)
+            start += filled
+            filled = 0
+
+    yield Result(index, job, metrics[:filled], start, True)
+
+
+def simulate(index: int, job: Job, steps: int, every: int = 1,
+             chunk: int = None, out: queue.Queue = None) -> Result:
+    # -- every chunk but the last goes to out as soon as it fills, the last
+    # -- is returned
+    for result in chunks(index, job, steps, every, chunk if out is not None else None):
+        if not result.final:
+            out.put(result)
+    return result
+
+
+def _drain(out: queue.Queue) -> Iterator[Result]:
+    if out is None:
+        return
+    while True:
+        try:
+            yield out.get_nowait()
+        except queue.Empty:
+            return
+
+
+def run(jobs: Iterable[Job], steps: int, processes: int = None,
+        every: int = 1, window: int = None, chunk: int = None) -> Iterator[Result]:
+    """Simulate every job for `steps` steps and yield results as they come.
+
+    Jobs are pulled from the iterable lazily and at most `window` scenes are
+    in flight at once, so sweeps of thousands of scenes only ever hold a few
+    of them and their metrics in memory. With `chunk` set every scene also
+    streams its metrics back every chunk steps, through a queue bounded by
+    the same window, instead of only when it finishes; Result.start and
+    Result.final place each piece. `processes=0` runs inline.
+    Factories and their parameters must be picklable.
+    """
+    jobs = enumerate(jobs)
+    if processes == 0:
+        for index, job in jobs:
+            yield from chunks(index, job, steps, every, chunk)
+        return
+
+    processes = processes or os.cpu_count() or 1
+    window = window or 2 * processes
+    with ProcessPoolExecutor(processes) as pool, Manager() as manager:
+        out = manager.Queue(window) if chunk else None
+        # -- poll for chunks while waiting, block on the scenes otherwise
+        timeout = 0.05 if chunk else None
+
+        pending = set()
+        for index, job in jobs:
+            pending.add(pool.submit(simulate, index, job, steps, every, chunk, out))
+            while len(pending) >= window:
+                done, pending = wait(pending, timeout, FIRST_COMPLETED)
+                # -- a finished scene's chunks are all queued, drain them first
+                yield from _drain(out)
+                for future in done:
+                    yield future.result()
+
+        while pending:
+            done, pending = wait(pending, timeout, FIRST_COMPLETED)
+            yield from _drain(out)
+            for future in done:
+                yield future.result()
@@ -32,12 +32,26 @@ class Body:
 
         self.moment = 0.0
         self.inv_moment = 0.0
+
+        # -- seconds spent below the sleep tolerances
+        self.awake = True
+        self.sleep_time = 0.0
+
         self.shape.initialize()
+        self.shape.set_orient(self.orientation)
+
+        # -- bullets always get continuous collision, against dynamic bodies too
+        self.bullet = False
+        self.core_radius = self.shape.core_radius()
 
     def apply_force(self, f: Vector2):
+        if not self.awake:
+            self.set_awake(True)
         self.force += f
 
     def apply_impulse(self, impulse: Vector2, contactVec: Vector2):
+        if not self.awake:
+            self.set_awake(True)
         self.velocity += self.inv_mass * impulse
         self.angular_velocity += self.inv_moment * contactVec.cross(impulse)
 
@@ -48,6 +62,17 @@ class Body:
         self.moment = 0.0
         self.inv_moment = 0.0
 
+    def set_awake(self, flag: bool):
+        self.awake = flag
+        if flag:
+            self.sleep_time = 0.0
+            return
+
+        self.velocity = Vector2()
+        self.angular_velocity = 0.0
+        self.force = Vector2()
+        self.torque = 0.0
+
     def set_orient(self, radians: float):
         self.orientation = radians
         self.shape.set_orient(radians)
@@ -0,0 +1,172 @@
+import numpy as np
+
+from typing import List, Tuple
+
+from .body import Body
+from .shape import Shape, ShapeType
+from .matrix import Mat2
+from .vector import Vector2
+from .constants import GRAVITY
+
+
+class BodyArray:
+    def __init__(self, capacity: int = 64):
+        self.count = 0
+
+        self.position = np.zeros((capacity, 2))
+        self.velocity = np.zeros((capacity, 2))
+        self.force = np.zeros((capacity, 2))
+
+        self.orientation = np.zeros(capacity)
+        self.angular_velocity = np.zeros(capacity)
+        self.torque = np.zeros(capacity)
+
+        self.inv_mass = np.zeros(capacity)
+        self.inv_moment = np.zeros(capacity)
+
+        self.awake = np.zeros(capacity, dtype=bool)
+
+        # -- (index, shape) of every shape whose orientation matrix must follow the body
+        self.oriented: List[Tuple[int, Shape]] = list()
+        self.oriented_index = np.zeros(0, dtype=int)
+
+    def allocate(self) -> int:
+        index = self.count
+        if index == len(self.inv_mass):
+            self.grow(max(2 * index, 16))
+        self.count += 1
+        return index
+
+    def grow(self, capacity: int):
+        for name in ('position', 'velocity', 'force', 'orientation',
+                     'angular_velocity', 'torque', 'inv_mass', 'inv_moment', 'awake'):
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def integrate_forces(self, dt: float):
+        n = self.count
+        dynamic = (self.inv_mass[:n] != 0.0) & self.awake[:n]
+        inv_mass = self.inv_mass[:n, None]
+
+        accel = self.force[:n] * inv_mass
+        accel += (GRAVITY.x, GRAVITY.y)
+        accel *= (dt / 2.0) * dynamic[:, None]
+        self.velocity[:n] += accel
+
+        self.angular_velocity[:n] += self.torque[:n] * self.inv_moment[:n] * (dt / 2.0) * dynamic
+
+    def integrate_velocity(self, dt: float):
+        n = self.count
+        dynamic = (self.inv_mass[:n] != 0.0) & self.awake[:n]
+
+        self.position[:n] += self.velocity[:n] * (dt * dynamic[:, None])
+        self.orientation[:n] += self.angular_velocity[:n] * (dt * dynamic)
+        self.update_orientations(dynamic)
+        self.integrate_forces(dt)
+
+    def update_orientations(self, mask: np.ndarray):
+        if not self.oriented:
+            return
+
+        index = self.oriented_index
+        if len(index) != len(self.oriented):
+            index = self.oriented_index = np.array([i for i, _ in self.oriented], dtype=int)
+
+        moved = mask[index].tolist()
+        radians = self.orientation[index]
+        cos, sin = np.cos(radians).tolist(), np.sin(radians).tolist()
+        for k, (_, shape) in enumerate(self.oriented):
+            if moved[k]:
+                c, s = cos[k], sin[k]
+                shape.u = Mat2(c, -s, s, c)
+
+    def clear_forces(self):
+        n = self.count
+        self.force[:n] = 0.0
+        self.torque[:n] = 0.0
+
+
+class FieldVector(Vector2):
+    """A Vector2 over one row of a BodyArray field, reads and writes of x and
+    y go to the array so in place changes through a body are kept.
+
+    The field is looked up on every access since BodyArray.grow replaces it.
+    """
+
+    __slots__ = 'world', 'name', 'index'
+
+    def __init__(self, world: BodyArray, name: str, index: int):
+        self.world = world
+        self.name = name
+        self.index = index
+
+    @property
+    def x(self):
+        return float(getattr(self.world, self.name)[self.index, 0])
+
+    @x.setter
+    def x(self, value):
+        getattr(self.world, self.name)[self.index, 0] = value
+
+    @property
+    def y(self):
+        return float(getattr(self.world, self.name)[self.index, 1])
+
+    @y.setter
+    def y(self, value):
+        getattr(self.world, self.name)[self.index, 1] = value
+
+
+def _vector_field(name: str):
+    def getter(self):
+        return FieldVector(self.world, name, self.index)
+
+    def setter(self, value):
+        getattr(self.world, name)[self.index] = value.x, value.y
+
+    return property(getter, setter)
+
+
+def _scalar_field(name: str):
+    def getter(self):
+        return float(getattr(self.world, name)[self.index])
+
+    def setter(self, value):
+        getattr(self.world, name)[self.index] = value
+
+    return property(getter, setter)
+
+
+def _flag_field(name: str):
+    def getter(self):
+        return bool(getattr(self.world, name)[self.index])
+
+    def setter(self, value):
+        getattr(self.world, name)[self.index] = value
+
+    return property(getter, setter)
+
+
+class ArrayBody(Body):
+    def __init__(self, world: BodyArray, shape: Shape, x: int, y: int):
+        self.world = world
+        self.index = world.allocate()
+        Body.__init__(self, shape, x, y)
+
+        if self.shape.get_type() != ShapeType.Circle:
+            world.oriented.append((self.index, self.shape))
+
+    position = _vector_field('position')
+    velocity = _vector_field('velocity')
+    force = _vector_field('force')
+
+    orientation = _scalar_field('orientation')
+    angular_velocity = _scalar_field('angular_velocity')
+    torque = _scalar_field('torque')
+
+    inv_mass = _scalar_field('inv_mass')
+    inv_moment = _scalar_field('inv_moment')
+
+    awake = _flag_field('awake')
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import math
+
+from typing import Dict, Iterator, List, Tuple
+
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from .body import Body
+
+
+# -- a broad phase yields index pairs (i, j), i < j, of bodies that may be
+# -- touching. pairs where both bodies are static are never reported.
+class BroadPhase:
+    def pairs(self, bodies: List[Body]) -> Iterator[Tuple[int, int]]:
+        raise NotImplementedError()
+
+
+class BruteForce(BroadPhase):
+    def pairs(self, bodies):
+        for i in range(len(bodies)):
+            A = bodies[i]
+
+            for j in range(i+1, len(bodies)):
+                B = bodies[j]
+
+                if A.inv_mass == 0.0 and B.inv_mass == 0.0:
+                    continue
+
+                yield i, j
+
+
+class SweepAndPrune(BroadPhase):
+    def __init__(self):
+        self.order: List[int] = list()
+
+    def pairs(self, bodies):
+        boxes = [b.shape.compute_aabb() for b in bodies]
+
+        # -- keep the order between steps, bodies move little from one step
+        # -- to the next so the (adaptive) sort runs in close to linear time
+        order = self.order
+        if len(order) < len(bodies):
+            order.extend(range(len(order), len(bodies)))
+        elif len(order) > len(bodies):
+            order[:] = range(len(bodies))
+        order.sort(key=lambda i: boxes[i].min_x)
+
+        active: List[int] = list()
+        for i in order:
+            box = boxes[i]
+            static = bodies[i].inv_mass == 0.0
+            active = [j for j in active if boxes[j].max_x >= box.min_x]
+
+            for j in active:
+                other = boxes[j]
+                if box.min_y > other.max_y or other.min_y > box.max_y:
+                    continue
+
+                if static and bodies[j].inv_mass == 0.0:
+                    continue
+
+                yield (i, j) if i < j else (j, i)
+
+            active.append(i)
+
+
+class SpatialHash(BroadPhase):
+    def __init__(self, cell_size: float = None):
+        self.cell_size = cell_size
+
+    def pairs(self, bodies):
+        boxes = [b.shape.compute_aabb() for b in bodies]
+
+        # -- without a fixed cell size follow the mean body extent
+        cell_size = self.cell_size
+        if not cell_size:
+            extent = sum(
+                max(b.max_x - b.min_x, b.max_y - b.min_y) for b in boxes
+            )
+            cell_size = max(extent / max(len(boxes), 1), 1.0)
+        inv = 1.0 / cell_size
+
+        grid: Dict[Tuple[int, int], List[int]] = dict()
+        for i, box in enumerate(boxes):
+            x0, x1 = math.floor(box.min_x * inv), math.floor(box.max_x * inv)
+            y0, y1 = math.floor(box.min_y * inv), math.floor(box.max_y * inv)
+            for cx in range(x0, x1 + 1):
+                for cy in range(y0, y1 + 1):
+                    cell = grid.get((cx, cy))
+                    if cell is None:
+                        grid[cx, cy] = [i]
+                    else:
+                        cell.append(i)
+
+        seen = set()
+        for cell in grid.values():
+            for a in range(len(cell)):
+                i = cell[a]
+                box = boxes[i]
+                static = bodies[i].inv_mass == 0.0
+
+                for b in range(a+1, len(cell)):
+                    j = cell[b]
+                    if static and bodies[j].inv_mass == 0.0:
+                        continue
+                    if (i, j) in seen or not box.overlaps(boxes[j]):
+                        continue
+                    seen.add((i, j))
+
+        # -- cells are visited in insertion order, sort to keep stepping
+        # -- deterministic regardless of how bodies are spread over the grid
+        yield from sorted(seen)
@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import math
+
+from typing import List, Optional
+
+from .vector import Vector2
+from .manifold import Manifold
+from .constants import CCD_THRESHOLD, MAX_SUBSTEPS, TOI_ITERATIONS, TOI_SLOP
+
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from .body import Body
+    from .scene import Scene
+
+
+def IsFast(b: Body, dt: float) -> bool:
+    # -- moving further than a fraction of its own thickness this step
+    if b.inv_mass == 0.0 or not b.awake:
+        return False
+    if b.bullet:
+        return True
+
+    limit = CCD_THRESHOLD * b.core_radius
+    return b.velocity.length_sqr * dt * dt > limit * limit
+
+
+def Penetration(m: Manifold) -> float:
+    m.solve()
+    return m.penetration if m.contact_count else 0.0
+
+
+def SetPose(b: Body, start: Vector2, start_angle: float, end: Vector2, end_angle: float, t: float):
+    b.position = start + (end - start) * t
+    b.set_orient(start_angle + (end_angle - start_angle) * t)
+
+
+def TimeOfImpact(b: Body, others: List[Body], start: Vector2, start_angle: float) -> Optional[float]:
+    """Fraction of this step's motion at which b first runs into one of others.
+
+    The motion from (start, start_angle) to the body's current pose is sampled
+    in substeps no longer than the CCD threshold, the first colliding substep
+    is then bisected. A body touching nothing at the start collides once it
+    touches, one already touching once it sinks TOI_SLOP deeper, so resting
+    and sliding contacts are left to the contact solver. Leaves b at its end
+    pose.
+    """
+    # -- a copy, the position of an array body is a view SetPose writes through
+    p = b.position
+    end, end_angle = Vector2(p.x, p.y), b.orientation
+
+    distance = (end - start).length
+    substeps = min(max(math.ceil(distance / (CCD_THRESHOLD * b.core_radius)), 1), MAX_SUBSTEPS)
+
+    SetPose(b, start, start_angle, end, end_angle, 0.0)
+    manifolds = [Manifold(b, o, 0, 1) for o in others]
+    limits = list()
+    for m in manifolds:
+        depth = Penetration(m)
+        limits.append(depth + TOI_SLOP if depth > 0.0 else 0.0)
+
+    def colliding(t: float) -> bool:
+        SetPose(b, start, start_angle, end, end_angle, t)
+        return any(Penetration(m) > limit for m, limit in zip(manifolds, limits))
+
+    toi = None
+    lower = 0.0
+    for k in range(1, substeps + 1):
+        t = k / substeps
+        if not colliding(t):
+            lower = t
+            continue
+
+        # -- bisect towards the first colliding pose, keep the colliding side
+        # -- so the next step's narrow phase finds the contact
+        upper = t
+        for _ in range(TOI_ITERATIONS):
+            mid = (lower + upper) * 0.5
+            if colliding(mid):
+                upper = mid
+            else:
+                lower = mid
+        toi = upper
+        break
+
+    SetPose(b, start, start_angle, end, end_angle, 1.0)
+    return toi
+
+
+def Sweep(scene: Scene, b: Body, start: Vector2, start_angle: float) -> Optional[float]:
+    # -- candidates inside the box swept from start to end, bullets also stop
+    # -- at dynamic bodies, everything else only at static ones
+    end_box = b.shape.compute_aabb()
+    # -- a copy, the position of an array body is a view SetPose writes through
+    p = b.position
+    end, end_angle = Vector2(p.x, p.y), b.orientation
+    SetPose(b, start, start_angle, end, end_angle, 0.0)
+    swept = b.shape.compute_aabb().combine(end_box)
+    SetPose(b, start, start_angle, end, end_angle, 1.0)
+
+    others = [
+        o for o in scene.query_aabb(swept)
+        if o is not b and (o.inv_mass == 0.0 or b.bullet and not o.bullet)
+    ]
+    if not others:
+        return None
+
+    toi = TimeOfImpact(b, others, start, start_angle)
+    if toi is not None:
+        SetPose(b, start, start_angle, end, end_angle, toi)
+    return toi
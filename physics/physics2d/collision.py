@@ -2,13 +2,16 @@ from __future__ import annotations
 
 import sys
 import math
+import numpy as np
 
 from .vector import Vector2
-from .constants import EPSILON
+from .utils import bias_greater_than
+from .constants import EPSILON, MAXPOLY_VERTEXCOUNT, CONTACT_MARGIN
 
-from typing import TYPE_CHECKING
+from typing import List, Tuple, TYPE_CHECKING
 if TYPE_CHECKING:
     from .body import Body
+    from .shape import Polygon
     from .manifold import Manifold
 
 
@@ -27,6 +30,7 @@ def CircletoCircle(m: Manifold, a: Body, b: Body):
 
     distance = math.sqrt(dist_sqr)
     m.contact_count = 1
+    m.ids[0] = 0
 
     if distance == 0.0:
         m.penetration = A.radius
@@ -38,6 +42,30 @@ def CircletoCircle(m: Manifold, a: Body, b: Body):
         m.contacts[0] = m.normal * A.radius + a.position
 
 
+def CircletoCircleBatch(ia: np.ndarray, ib: np.ndarray,
+                        position: np.ndarray, radius: np.ndarray) -> Tuple[np.ndarray, ...]:
+    # -- every candidate pair at once, returns the touching subset as
+    # -- (index into ia/ib, normal, contact, penetration)
+    normal = position[ib] - position[ia]
+    dist_sqr = np.einsum('ij,ij->i', normal, normal)
+    radii = radius[ia] + radius[ib]
+
+    touching = np.flatnonzero(dist_sqr < radii**2)
+    normal = normal[touching]
+    radii = radii[touching]
+    ra = radius[ia[touching]]
+    pa = position[ia[touching]]
+
+    distance = np.sqrt(dist_sqr[touching])
+    coincident = distance == 0.0
+    normal /= np.where(coincident, 1.0, distance)[:, None]
+    normal[coincident] = (1.0, 0.0)
+
+    penetration = np.where(coincident, ra, radii - distance)
+    contact = np.where(coincident[:, None], pa, normal * ra[:, None] + pa)
+    return touching, normal, contact, penetration
+
+
 def CircletoPolygon(m: Manifold, a: Body, b: Body):
     A = a.shape
     B = b.shape
@@ -52,7 +80,7 @@ def CircletoPolygon(m: Manifold, a: Body, b: Body):
     separation = -sys.float_info.max
     face_normal = 0
     for i in range(B.vertex_count):
-        s = B.normals[i].dot(B.vertices[i])
+        s = B.normals[i].dot(center - B.vertices[i])
         if s > A.radius:
             return
 
@@ -68,6 +96,7 @@ def CircletoPolygon(m: Manifold, a: Body, b: Body):
     # -- check if center within polygon
     if separation < EPSILON:
         m.contact_count = 1
+        m.ids[0] = face_normal
         m.normal = -(B.u * B.normals[face_normal])
         m.contacts[0] = m.normal * A.radius + a.position
         m.penetration = A.radius
@@ -83,6 +112,7 @@ def CircletoPolygon(m: Manifold, a: Body, b: Body):
             return
 
         m.contact_count = 1
+        m.ids[0] = MAXPOLY_VERTEXCOUNT + face_normal
         n = v1 - center
         n = B.u * n
         n.normalize()
@@ -96,6 +126,7 @@ def CircletoPolygon(m: Manifold, a: Body, b: Body):
             return
 
         m.contact_count = 1
+        m.ids[0] = MAXPOLY_VERTEXCOUNT + i2
         n = v2 - center
         n = B.u * n
         n.normalize()
@@ -113,6 +144,7 @@ def CircletoPolygon(m: Manifold, a: Body, b: Body):
         m.normal = -n
         m.contacts[0] = m.normal * A.radius + a.position
         m.contact_count = 1
+        m.ids[0] = face_normal
 
 
 def PolygontoCircle(m: Manifold, a: Body, b: Body):
@@ -120,5 +152,174 @@ def PolygontoCircle(m: Manifold, a: Body, b: Body):
     m.normal = -m.normal
 
 
+def FaceSeparation(A: Polygon, B: Polygon, face: int) -> float:
+    # -- face normal of A into B's model space
+    buT = B.u.transpose()
+    n = buT * (A.u * A.normals[face])
+
+    # -- support point of B along -n
+    s = B.get_support(-n)
+
+    # -- vertex on the face of A into B's model space
+    v = A.u * A.vertices[face] + A.body.position
+    v = buT * (v - B.body.position)
+
+    return n.dot(s - v)
+
+
+def FindAxisLeastPenetration(A: Polygon, B: Polygon) -> Tuple[float, int]:
+    best_distance = -sys.float_info.max
+    best_index = 0
+
+    for i in range(A.vertex_count):
+        d = FaceSeparation(A, B, i)
+        if d > best_distance:
+            best_distance = d
+            best_index = i
+
+            # -- found a separating axis, nothing left to learn
+            if d >= 0.0:
+                break
+
+    return best_distance, best_index
+
+
+def FindIncidentFace(ref: Polygon, inc: Polygon, ref_index: int) -> Tuple[List[Vector2], int]:
+    ref_normal = ref.u * ref.normals[ref_index]
+    ref_normal = inc.u.transpose() * ref_normal
+
+    # -- most anti-normal face of the incident polygon
+    incident_face = 0
+    min_dot = sys.float_info.max
+    for i in range(inc.vertex_count):
+        dot = ref_normal.dot(inc.normals[i])
+        if dot < min_dot:
+            min_dot = dot
+            incident_face = i
+
+    i2 = incident_face + 1 if incident_face + 1 < inc.vertex_count else 0
+    return [
+        inc.u * inc.vertices[incident_face] + inc.body.position,
+        inc.u * inc.vertices[i2] + inc.body.position
+    ], incident_face
+
+
+def Clip(n: Vector2, c: float, face: List[Vector2], ids: List[int], clip_id: int) -> int:
+    out = list(face)
+    out_ids = list(ids)
+    sp = 0
+
+    # -- distance of each end point to the line
+    d1 = n.dot(face[0]) - c
+    d2 = n.dot(face[1]) - c
+
+    if d1 <= 0.0:
+        out[sp] = face[0]
+        out_ids[sp] = ids[0]
+        sp += 1
+    if d2 <= 0.0:
+        out[sp] = face[1]
+        out_ids[sp] = ids[1]
+        sp += 1
+
+    # -- points on different sides of the plane
+    if d1 * d2 < 0.0:
+        alpha = d1 / (d1 - d2)
+        out[sp] = face[0] + alpha * (face[1] - face[0])
+        out_ids[sp] = clip_id
+        sp += 1
+
+    face[0], face[1] = out[0], out[1]
+    ids[0], ids[1] = out_ids[0], out_ids[1]
+    return sp
+
+
 def PolygontoPolygon(m: Manifold, a: Body, b: Body):
-    pass
+    A = a.shape
+    B = b.shape
+
+    m.contact_count = 0
+
+    # -- the axis that separated this pair last step usually still does
+    if m.axis is not None:
+        flip, face = m.axis
+        if flip:
+            separation = FaceSeparation(B, A, face)
+        else:
+            separation = FaceSeparation(A, B, face)
+        if separation >= 0.0:
+            return
+        m.axis = None
+
+    # -- check for a separating axis with A's face planes
+    penetrationA, faceA = FindAxisLeastPenetration(A, B)
+    if penetrationA >= 0.0:
+        m.axis = (False, faceA)
+        return
+
+    # -- check for a separating axis with B's face planes
+    penetrationB, faceB = FindAxisLeastPenetration(B, A)
+    if penetrationB >= 0.0:
+        m.axis = (True, faceB)
+        return
+
+    # -- determine which shape contains reference face
+    if bias_greater_than(penetrationA, penetrationB):
+        ref, inc = A, B
+        ref_index = faceA
+        flip = False
+    else:
+        ref, inc = B, A
+        ref_index = faceB
+        flip = True
+
+    incident_face, inc_index = FindIncidentFace(ref, inc, ref_index)
+
+    # -- contact features: incident vertices 0/1, side plane clips 2/3
+    feature = ((flip * MAXPOLY_VERTEXCOUNT + ref_index) * MAXPOLY_VERTEXCOUNT + inc_index) * 4
+    ids = [feature, feature + 1]
+
+    # -- setup reference face vertices in world space
+    v1 = ref.vertices[ref_index]
+    ref_index = ref_index + 1 if ref_index + 1 < ref.vertex_count else 0
+    v2 = ref.vertices[ref_index]
+    v1 = ref.u * v1 + ref.body.position
+    v2 = ref.u * v2 + ref.body.position
+
+    # -- calculate reference face side normal in world space
+    side_plane_normal = (v2 - v1).normalize()
+
+    # -- orthogonalize
+    ref_face_normal = Vector2(side_plane_normal.y, -side_plane_normal.x)
+
+    # -- ax + by = c, c is distance from origin
+    ref_c = ref_face_normal.dot(v1)
+    neg_side = -side_plane_normal.dot(v1)
+    pos_side = side_plane_normal.dot(v2)
+
+    # -- clip incident face to reference face side planes,
+    # -- due to floating point error, possible to not have required points
+    if Clip(-side_plane_normal, neg_side, incident_face, ids, feature + 2) < 2:
+        return
+    if Clip(side_plane_normal, pos_side, incident_face, ids, feature + 3) < 2:
+        return
+
+    # -- flip normal so it always points from A to B
+    m.normal = -ref_face_normal if flip else ref_face_normal
+
+    # -- keep points behind reference face, and those just above it so a
+    # -- resting face does not lose a corner to a slight tilt
+    cp = 0
+    m.penetration = 0.0
+    for point, id_ in zip(incident_face, ids):
+        separation = ref_face_normal.dot(point) - ref_c
+        if separation <= CONTACT_MARGIN:
+            m.contacts[cp] = point
+            m.ids[cp] = id_
+            m.separation[cp] = separation
+            m.penetration += max(-separation, 0.0)
+            cp += 1
+
+    if cp:
+        m.penetration /= float(cp)
+    m.contact_count = cp
@@ -0,0 +1,190 @@
+"""The API of the old single file engine, physics2d.py, on top of this package.
+
+Code written against it keeps working unchanged: Vec2 has the method style
+length(), length_sqr(), rotate(radians) and cross(scalar) it had there,
+Manifold takes just the two bodies and can still be driven by hand with
+argument free initialize() and apply_impulse(), and Circle, Polygon, Body
+and Scene are this package's. Vectors read back from bodies are plain
+Vector2, wrap them with Vec2.of where the old methods are needed.
+"""
+import math
+
+from typing import Any, Union
+
+from .body import Body
+from .scene import Scene, IntegrateForces, IntegrateVelocity
+from .shape import Shape, ShapeType, Circle, Polygon
+from .vector import Vector2
+from .matrix import Mat2 as _Mat2
+from .manifold import Manifold as _Manifold
+from .dispatcher import Dispatch
+from .collision import CircletoCircle, CircletoPolygon, PolygontoCircle, PolygontoPolygon
+from .utils import equal, clamp, random, bias_greater_than, Cross
+from .constants import DT, EPSILON, GRAVITY_SCALE, GRAVITY, MAXPOLY_VERTEXCOUNT
+
+
+__all__ = [
+    'DT', 'EPSILON', 'GRAVITY_SCALE', 'GRAVITY', 'MAXPOLY_VERTEXCOUNT',
+    'equal', 'clamp', 'random', 'bias_greater_than', 'Cross', 'list2d',
+    'Vec2', 'Mat2', 'ShapeType', 'Shape', 'Circle', 'Polygon', 'Body', 'Manifold',
+    'Dispatch', 'CircletoCircle', 'CircletoPolygon', 'PolygontoCircle', 'PolygontoPolygon',
+    'IntegrateForces', 'IntegrateVelocity', 'Scene',
+]
+
+
+class Length(float):
+    # -- a float that can also be called, so v.length and v.length() both work
+    # -- and a Vec2 can go anywhere a Vector2 can
+    __slots__ = ()
+
+    def __call__(self) -> float:
+        return float(self)
+
+
+class Vec2(Vector2):
+
+    __slots__ = ()
+
+    @classmethod
+    def of(cls, v: Vector2) -> "Vec2":
+        return cls(v.x, v.y)
+
+    def __repr__(self):
+        return 'Vec2({!r}, {!r})'.format(self.x, self.y)
+
+    def __neg__(self) -> "Vec2":
+        return Vec2(-self.x, -self.y)
+
+    def __add__(self, other) -> "Vec2":
+        if isinstance(other, Vector2):
+            return Vec2(self.x + other.x, self.y + other.y)
+        return Vec2(self.x + other, self.y + other)
+
+    def __sub__(self, other) -> "Vec2":
+        if isinstance(other, Vector2):
+            return Vec2(self.x - other.x, self.y - other.y)
+        return Vec2(self.x - other, self.y - other)
+
+    def __mul__(self, t) -> "Vec2":
+        if isinstance(t, Vector2):
+            return Vec2(self.x * t.x, self.y * t.y)
+        return Vec2(self.x * t, self.y * t)
+
+    def __rmul__(self, t) -> "Vec2":
+        return Vec2(t * self.x, t * self.y)
+
+    def __truediv__(self, t) -> "Vec2":
+        return Vec2(self.x / t, self.y / t)
+
+    def max(self, other: Vector2) -> "Vec2":
+        return Vec2(max(self.x, other.x), max(self.y, other.y))
+
+    def min(self, other: Vector2) -> "Vec2":
+        return Vec2(min(self.x, other.x), min(self.y, other.y))
+
+    def cross(self, other: Union[Vector2, float]) -> Union["Vec2", float]:
+        if isinstance(other, Vector2):
+            return self.x * other.y - self.y * other.x
+        return Vec2(other * self.y, -other * self.x)
+
+    @property
+    def length(self) -> Length:
+        return Length(math.sqrt(self.x * self.x + self.y * self.y))
+
+    @property
+    def length_sqr(self) -> Length:
+        return Length(self.x * self.x + self.y * self.y)
+
+    def rotate(self, radians: Union[float, Vector2]):
+        # -- in place by an angle as before, by a vector as Vector2 does
+        if isinstance(radians, Vector2):
+            return Vector2.rotate(self, radians)
+
+        c = math.cos(radians)
+        s = math.sin(radians)
+        self.x, self.y = self.x * c - self.y * s, self.x * s + self.y * c
+
+    def normalize(self):
+        # -- leaves near zero vectors alone instead of blowing them up
+        ln = math.sqrt(self.x * self.x + self.y * self.y)
+        if ln > EPSILON:
+            inv_len = 1.0 / ln
+            self.x *= inv_len
+            self.y *= inv_len
+        return self
+
+
+class Mat2(_Mat2):
+
+    __slots__ = ()
+
+    @classmethod
+    def from_angle(cls, radians: float) -> "Mat2":
+        c = math.cos(radians)
+        s = math.sin(radians)
+        return Mat2(c, -s, s, c)
+
+    def __abs__(self) -> "Mat2":
+        return Mat2(abs(self.m00), abs(self.m01), abs(self.m10), abs(self.m11))
+
+    def axis_x(self) -> Vec2:
+        return Vec2(self.m00, self.m10)
+
+    def axis_y(self) -> Vec2:
+        return Vec2(self.m01, self.m11)
+
+    def transpose(self) -> "Mat2":
+        return Mat2(self.m00, self.m10, self.m01, self.m11)
+
+    def __mul__(self, other):
+        result = _Mat2.__mul__(self, other)
+        if isinstance(result, Vector2):
+            return Vec2(result.x, result.y)
+        return Mat2(result.m00, result.m01, result.m10, result.m11)
+
+
+class Manifold(_Manifold):
+    # -- the old manifold only knew its bodies, the offsets into the solver's
+    # -- velocity list only matter inside Scene
+    def __init__(self, a: Body, b: Body, ia: int = 0, ib: int = 1):
+        _Manifold.__init__(self, a, b, ia, ib)
+
+    # -- the old calls worked on the bodies directly, these run the solver's
+    # -- versions on a velocity list of just A and B, at the default offsets
+
+    def _velocities(self) -> list:
+        A, B = self.A, self.B
+        va, vb = A.velocity, B.velocity
+        return [va.x, va.y, A.angular_velocity, vb.x, vb.y, B.angular_velocity]
+
+    def _store(self, v: list):
+        self.A.velocity = Vec2(v[0], v[1])
+        self.A.angular_velocity = v[2]
+        self.B.velocity = Vec2(v[3], v[4])
+        self.B.angular_velocity = v[5]
+
+    def initialize(self, dt: float = DT):
+        # -- no warm start, the old solver started every step from zero
+        v = self._velocities()
+        self.prepare(v, dt)
+        self.warm_start(v, False)
+
+    def apply_impulse(self, v: list = None):
+        if v is not None:
+            return _Manifold.apply_impulse(self, v)
+
+        v = self._velocities()
+        _Manifold.apply_impulse(self, v)
+        self._store(v)
+
+    def infinite_mass_correction(self):
+        self.A.velocity = Vec2(0.0, 0.0)
+        self.B.velocity = Vec2(0.0, 0.0)
+
+
+def list2d(dimx: int, dimy: int, item: Any = None):
+    result = []
+    for _ in range(dimy):
+        inner = [item for _ in range(dimx)]
+        result.append(inner)
+    return result
@@ -4,4 +4,13 @@ DT = 1.0 / 60.0
 EPSILON = 0.0001
 GRAVITY_SCALE = 5.0
 MAXPOLY_VERTEXCOUNT = 64
+CONTACT_MARGIN = 0.05
+AABB_MARGIN = 0.5
+CCD_THRESHOLD = 0.5
+MAX_SUBSTEPS = 32
+TOI_ITERATIONS = 10
+TOI_SLOP = 0.05
+SLEEP_LINEAR_TOLERANCE = 0.1
+SLEEP_ANGULAR_TOLERANCE = 0.05
+TIME_TO_SLEEP = 0.5
 GRAVITY = Vector2(0, 10.0 * GRAVITY_SCALE)
@@ -1,5 +1,6 @@
 from .collision import (
     CircletoCircle,
+    CircletoCircleBatch,
     CircletoPolygon,
     PolygontoCircle,
     PolygontoPolygon
@@ -9,3 +10,10 @@ Dispatch = [
     [CircletoCircle, CircletoPolygon],
     [PolygontoCircle, PolygontoPolygon]
 ]
+
+# -- narrow phases that take index arrays of all candidate pairs of a type
+# -- combination at once, None where only the per pair function exists
+BatchDispatch = [
+    [CircletoCircleBatch, None],
+    [None, None]
+]
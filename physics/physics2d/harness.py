@@ -0,0 +1,69 @@
+import time
+import numpy as np
+
+from typing import Callable, Iterable, List, NamedTuple
+
+from .scene import Scene
+from .backend import BACKENDS
+from .replay import state_digest
+
+
+class Report(NamedTuple):
+    backend: str
+    # -- two runs from the same seed end in the same state
+    deterministic: bool
+    digest: int
+    # -- furthest any body got from where the reference backend put it
+    max_divergence: float
+    max_penetration: float
+    ms_per_step: float
+
+
+def positions(scene: Scene) -> np.ndarray:
+    if scene.world is not None:
+        return scene.world.position[:scene.world.count].copy()
+    return np.array([(b.position.x, b.position.y) for b in scene.bodies]).reshape(-1, 2)
+
+
+def run(factory: Callable[[str], Scene], backend: str, steps: int):
+    # -- (positions per step, deepest contact, final digest, seconds stepping)
+    scene = factory(backend)
+    path = np.empty((steps, len(scene.bodies), 2))
+    penetration = 0.0
+    elapsed = 0.0
+    for k in range(steps):
+        start = time.perf_counter()
+        scene.step()
+        elapsed += time.perf_counter() - start
+
+        path[k] = positions(scene)
+        for m in scene.contacts:
+            penetration = max(penetration, m.penetration)
+    return path, penetration, state_digest(scene), elapsed
+
+
+def check(factory: Callable[[str], Scene], steps: int,
+          backends: Iterable[str] = None, reference: str = 'python') -> List[Report]:
+    """Step the scene factory(backend) builds on every backend and compare.
+
+    The factory must seed its random numbers so each call builds the same
+    scene. Backends solve contacts in different orders, so they are compared
+    by how far they drift from the reference, not bit for bit; each backend
+    on its own must repeat itself exactly.
+    """
+    backends = list(backends or BACKENDS)
+    if reference not in backends:
+        backends.insert(0, reference)
+
+    expected, *_ = run(factory, reference, steps)
+
+    reports = list()
+    for backend in backends:
+        path, penetration, digest, elapsed = run(factory, backend, steps)
+        _, _, again, _ = run(factory, backend, steps)
+
+        divergence = float(np.sqrt(((path - expected) ** 2).sum(axis=2)).max()) if steps else 0.0
+        reports.append(Report(
+            backend, digest == again, digest, divergence, penetration,
+            elapsed / max(steps, 1) * 1000.0))
+    return reports
@@ -1,108 +1,227 @@
 import math
+
+from typing import List
+
 from . import dispatcher
 from .body import Body
 from .vector import Vector2
-from .utils import equal, Cross
 from .constants import DT, EPSILON, GRAVITY
 
 
+# -- squared relative speed below which a contact is treated as resting
+RESTING = (DT * GRAVITY).length_sqr + EPSILON
+
+
 class Manifold:
-    def __init__(self, a: Body, b: Body):
+    def __init__(self, a: Body, b: Body, ia: int, ib: int):
         self.A = a
         self.B = b
 
+        # -- offsets of A and B into the solver's flat velocity list
+        self.va = 3 * ia
+        self.vb = 3 * ib
+
         self.penetration = 0.0
         self.normal = Vector2()
         self.contacts = [Vector2(), Vector2()]
         self.contact_count = 0
 
+        # -- feature id per contact, matches contacts between steps
+        self.ids = [0, 0]
+
+        # -- signed distance per contact, positive for points not touching yet
+        self.separation = [0.0, 0.0]
+
+        # -- accumulated impulses per contact, carried over between steps
+        self.normal_impulse = [0.0, 0.0]
+        self.tangent_impulse = [0.0, 0.0]
+
+        # -- (flip, face) of the last separating axis found between polygons
+        self.axis = None
+
         # -- restitution, dynamic and statuc friction
         self.e = 0.0
         self.df = 0.0
         self.sf = 0.0
 
+        # -- per contact solver data, filled by initialize
+        self.tangent = Vector2()
+        self.ra = [Vector2(), Vector2()]
+        self.rb = [Vector2(), Vector2()]
+        self.normal_mass = [0.0, 0.0]
+        self.tangent_mass = [0.0, 0.0]
+        self.bias = [0.0, 0.0]
+        self.inv_mass_a = self.inv_moment_a = 0.0
+        self.inv_mass_b = self.inv_moment_b = 0.0
+
     def solve(self):
+        self.separation[0] = self.separation[1] = 0.0
         type_A = self.A.shape.get_type().value
         type_B = self.B.shape.get_type().value
         dispatcher.Dispatch[type_A][type_B](self, self.A, self.B)
 
-    def initialize(self):
-        self.e = min(self.A.restitution, self.B.restitution)
-        self.sf = math.sqrt(self.A.static_friction * self.B.static_friction)
-        self.df = math.sqrt(self.A.dynamic_friction * self.B.dynamic_friction)
+    def update(self):
+        old = {
+            self.ids[i]: (self.normal_impulse[i], self.tangent_impulse[i])
+            for i in range(self.contact_count)
+        }
 
+        self.solve()
+
+        # -- carry impulses over to contacts with the same feature
+        for i in range(self.contact_count):
+            self.normal_impulse[i], self.tangent_impulse[i] = old.get(self.ids[i], (0.0, 0.0))
+
+    def set_contact(self, normal: Vector2, contact: Vector2, penetration: float, id_: int = 0):
+        # -- single contact found by a batched narrow phase, same carry over as update
+        if not (self.contact_count == 1 and self.ids[0] == id_):
+            self.normal_impulse[0] = self.tangent_impulse[0] = 0.0
+
+        self.contact_count = 1
+        self.ids[0] = id_
+        self.separation[0] = 0.0
+        self.normal = normal
+        self.contacts[0] = contact
+        self.penetration = penetration
+
+    def prepare(self, v: List[float], dt: float = DT):
+        A, B = self.A, self.B
+        self.e = min(A.restitution, B.restitution)
+        self.sf = math.sqrt(A.static_friction * B.static_friction)
+        self.df = math.sqrt(A.dynamic_friction * B.dynamic_friction)
+
+        # -- impulses wake both bodies, the solver below only touches v
+        if not A.awake:
+            A.set_awake(True)
+        if not B.awake:
+            B.set_awake(True)
+
+        # -- read once, body attributes can be views into a BodyArray
+        ma = self.inv_mass_a = A.inv_mass
+        ia = self.inv_moment_a = A.inv_moment
+        mb = self.inv_mass_b = B.inv_mass
+        ib = self.inv_moment_b = B.inv_moment
+        pa, pb = A.position, B.position
+        a, b = self.va, self.vb
+
+        # -- fixed tangent so friction impulses stay meaningful across steps
+        nx, ny = self.normal.x, self.normal.y
+        tx, ty = self.tangent.x, self.tangent.y = ny, -nx
+
+        # -- only bounce when approaching faster than gravity alone would cause,
+        # -- measured before any manifold warm starts, see warm_start
         for i in range(self.contact_count):
-            ra = self.contacts[i] - self.A.position
-            rb = self.contacts[i] - self.B.position
-
-            rv = (
-                self.B.velocity + Cross(self.B.angular_velocity, rb) -
-                self.A.velocity - Cross(self.A.angular_velocity, ra)
-            )
-            if rv.length_sqr < (DT * GRAVITY).length_sqr + EPSILON:
-                self.e = 0.0
-
-    def apply_impulse(self):
-        if equal(self.A.inv_mass + self.B.inv_mass, 0.0):
-            self.infinite_mass_correction()
+            c, ra, rb = self.contacts[i], self.ra[i], self.rb[i]
+            rax, ray = ra.x, ra.y = c.x - pa.x, c.y - pa.y
+            rbx, rby = rb.x, rb.y = c.x - pb.x, c.y - pb.y
+
+            raCrossN = rax * ny - ray * nx
+            rbCrossN = rbx * ny - rby * nx
+            inv_mass_sum = ma + mb + raCrossN**2 * ia + rbCrossN**2 * ib
+            self.normal_mass[i] = 1.0 / inv_mass_sum if inv_mass_sum else 0.0
+
+            raCrossT = rax * ty - ray * tx
+            rbCrossT = rbx * ty - rby * tx
+            inv_mass_sum = ma + mb + raCrossT**2 * ia + rbCrossT**2 * ib
+            self.tangent_mass[i] = 1.0 / inv_mass_sum if inv_mass_sum else 0.0
+
+            rvx = v[b] - v[b+2] * rby - v[a] + v[a+2] * ray
+            rvy = v[b+1] + v[b+2] * rbx - v[a+1] - v[a+2] * rax
+            contactVel = rvx * nx + rvy * ny
+            if self.separation[i] > 0.0:
+                # -- allow closing the gap within this step, no further
+                self.bias[i] = -self.separation[i] / dt
+            elif rvx * rvx + rvy * rvy < RESTING:
+                self.bias[i] = 0.0
+            else:
+                self.bias[i] = -self.e * contactVel if contactVel < 0.0 else 0.0
+
+    def warm_start(self, v: List[float], enabled: bool = True):
+        # -- apply last step's impulses, only once every manifold has been
+        # -- prepared so no bias sees another manifold's warm start
+        if not enabled:
+            self.normal_impulse[0] = self.normal_impulse[1] = 0.0
+            self.tangent_impulse[0] = self.tangent_impulse[1] = 0.0
             return
 
+        ma, ia = self.inv_mass_a, self.inv_moment_a
+        mb, ib = self.inv_mass_b, self.inv_moment_b
+        a, b = self.va, self.vb
+        nx, ny = self.normal.x, self.normal.y
+        tx, ty = self.tangent.x, self.tangent.y
         for i in range(self.contact_count):
-            ra = self.contacts[i] - self.A.position
-            rb = self.contacts[i] - self.B.position
-
-            rv = (
-                self.B.velocity + Cross(self.B.angular_velocity, rb) -
-                self.A.velocity - Cross(self.A.angular_velocity, ra)
-            )
-
-            contactVel = rv.dot(self.normal)
-            if contactVel > 0.0:
-                return
-
-            raCrossN = ra.cross(self.normal)
-            rbCrossN = rb.cross(self.normal)
-            inv_mass_sum = (
-                self.A.inv_mass + self.B.inv_mass +
-                raCrossN**2 * self.A.inv_moment +
-                rbCrossN**2 * self.B.inv_moment
-            )
-
-            # -- calc impulse scalar
-            j = -(1.0 + self.e) * contactVel
-            j /= inv_mass_sum
-            j /= float(self.contact_count)
+            jn, jt = self.normal_impulse[i], self.tangent_impulse[i]
+            px, py = nx * jn + tx * jt, ny * jn + ty * jt
+            ra, rb = self.ra[i], self.rb[i]
+            v[a] -= ma * px
+            v[a+1] -= ma * py
+            v[a+2] -= ia * (ra.x * py - ra.y * px)
+            v[b] += mb * px
+            v[b+1] += mb * py
+            v[b+2] += ib * (rb.x * py - rb.y * px)
+
+    def apply_impulse(self, v: List[float]):
+        # -- works on the solver's flat [vx, vy, w] list in place, all math on
+        # -- unpacked floats so the hot loop allocates no Vector2
+        ma, ia = self.inv_mass_a, self.inv_moment_a
+        mb, ib = self.inv_mass_b, self.inv_moment_b
+        a, b = self.va, self.vb
+        if ma + mb <= EPSILON:
+            v[a] = v[a+1] = v[b] = v[b+1] = 0.0
+            return
 
-            # -- apply impulse
-            impulse = self.normal * j
-            self.A.apply_impulse(-impulse, ra)
-            self.B.apply_impulse(impulse, rb)
+        nx, ny = self.normal.x, self.normal.y
+        tx, ty = self.tangent.x, self.tangent.y
+        for i in range(self.contact_count):
+            ra, rb = self.ra[i], self.rb[i]
+            rax, ray, rbx, rby = ra.x, ra.y, rb.x, rb.y
 
-            # -- friction impuls
-            rv = (
-                self.B.velocity + Cross(self.B.angular_velocity, rb) -
-                self.A.velocity - Cross(self.A.angular_velocity, ra)
-            )
+            rvx = v[b] - v[b+2] * rby - v[a] + v[a+2] * ray
+            rvy = v[b+1] + v[b+2] * rbx - v[a+1] - v[a+2] * rax
 
-            t = rv - (self.normal * rv.dot(self.normal))
-            t.normalize()
+            # -- calc impulse scalar, clamp the accumulated impulse not the delta
+            contactVel = rvx * nx + rvy * ny
+            j = (self.bias[i] - contactVel) * self.normal_mass[i]
+            old = self.normal_impulse[i]
+            jn = self.normal_impulse[i] = max(old + j, 0.0)
+            j = jn - old
+
+            # -- apply impulse
+            px, py = nx * j, ny * j
+            v[a] -= ma * px
+            v[a+1] -= ma * py
+            v[a+2] -= ia * (rax * py - ray * px)
+            v[b] += mb * px
+            v[b+1] += mb * py
+            v[b+2] += ib * (rbx * py - rby * px)
+
+            # -- friction impulse
+            rvx = v[b] - v[b+2] * rby - v[a] + v[a+2] * ray
+            rvy = v[b+1] + v[b+2] * rbx - v[a+1] - v[a+2] * rax
 
             # -- tangent magnitude
-            jt = -rv.dot(t)
-            jt /= inv_mass_sum
-            jt /= float(self.contact_count)
+            jt = -(rvx * tx + rvy * ty) * self.tangent_mass[i]
 
-            # -- dont apply tiny friction impulses
-            if equal(jt, 0.0):
-                return
+            # -- coulomb's law, static friction holds or dynamic friction slides
+            old = self.tangent_impulse[i]
+            total = old + jt
+            if abs(total) > jn * self.sf:
+                total = jn * self.df if total > 0.0 else -jn * self.df
+            self.tangent_impulse[i] = total
+            jt = total - old
 
-            tangent_impulse = t * -j * self.df
-            if abs(jt) < j * self.sf:
-                tangent_impulse = t * jt
+            # -- dont apply tiny friction impulses
+            if -EPSILON <= jt <= EPSILON:
+                continue
 
             # -- apply friction impulse
-            self.A.apply_impulse(-tangent_impulse, ra)
-            self.B.apply_impulse(tangent_impulse, rb)
+            px, py = tx * jt, ty * jt
+            v[a] -= ma * px
+            v[a+1] -= ma * py
+            v[a+2] -= ia * (rax * py - ray * px)
+            v[b] += mb * px
+            v[b+1] += mb * py
+            v[b+2] += ib * (rbx * py - rby * px)
 
     def positional_correction(self):
         slop = 0.05
@@ -110,7 +229,3 @@ class Manifold:
         correction = max(self.penetration - slop, 0.0) / (self.A.inv_mass + self.B.inv_mass) * self.normal * percent
         self.A.position -= correction * self.A.inv_mass
         self.B.position += correction * self.B.inv_mass
-
-    def infinite_mass_correction(self):
-        self.A.velocity = Vector2()
-        self.B.velocity = Vector2()
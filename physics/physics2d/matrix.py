@@ -5,6 +5,9 @@ from .vector import Vector2
 
 
 class Mat2:
+
+    __slots__ = 'm00', 'm01', 'm10', 'm11'
+
     def __init__(self, a: float = 0.0, b: float = 0.0, c: float = 0.0, d: float = 0.0):
         self.m00, self.m01, self.m10, self.m11 = (
             a, b, c, d
@@ -0,0 +1,95 @@
+import csv
+import json
+import time
+import numpy as np
+
+from typing import Any, Dict, List, TextIO
+
+
+# -- phases of Scene.step in the order they run, each timed up to the next mark
+PHASES = (
+    'broadphase',
+    'narrowphase',
+    'integrate_forces',
+    'initialize',
+    'solve',
+    'islands',
+    'integrate_velocity',
+    'correction',
+)
+BROADPHASE, NARROWPHASE, INTEGRATE_FORCES, INITIALIZE, SOLVE, ISLANDS, \
+    INTEGRATE_VELOCITY, CORRECTION = range(len(PHASES))
+
+COUNTERS = ('pairs', 'contacts', 'iterations')
+
+FIELDS = ('step',) + tuple(p + '_ms' for p in PHASES) + COUNTERS + ('total_ms',)
+
+_PAIRS = 1 + len(PHASES)
+_TOTAL = len(FIELDS) - 1
+
+
+class StepProfiler:
+    """Records per phase wall time and counts of the last `capacity` steps.
+
+    Assign one to Scene.profiler to start recording, set it back to None to
+    stop. A scene without a profiler pays one attribute check per phase.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self.capacity = capacity
+        self.buffer = np.zeros((capacity, len(FIELDS)))
+        self.steps = 0
+        self.start = self.last = 0.0
+
+    def __len__(self):
+        return min(self.steps, self.capacity)
+
+    def begin(self):
+        row = self.buffer[self.steps % self.capacity]
+        row[:] = 0.0
+        row[0] = self.steps
+        self.start = self.last = time.perf_counter()
+
+    def mark(self, phase: int):
+        now = time.perf_counter()
+        self.buffer[self.steps % self.capacity, 1 + phase] = (now - self.last) * 1000.0
+        self.last = now
+
+    def end(self, pairs: int, contacts: int, iterations: int):
+        row = self.buffer[self.steps % self.capacity]
+        row[_PAIRS:_TOTAL] = pairs, contacts, iterations
+        row[_TOTAL] = (time.perf_counter() - self.start) * 1000.0
+        self.steps += 1
+
+    def rows(self) -> np.ndarray:
+        # -- oldest first
+        if self.steps <= self.capacity:
+            return self.buffer[:self.steps].copy()
+        head = self.steps % self.capacity
+        return np.concatenate((self.buffer[head:], self.buffer[:head]))
+
+    def records(self) -> List[Dict[str, Any]]:
+        records = list()
+        for row in self.rows().tolist():
+            record = dict(zip(FIELDS, row))
+            for name in ('step',) + COUNTERS:
+                record[name] = int(record[name])
+            records.append(record)
+        return records
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        rows = self.rows()
+        if not len(rows):
+            return dict()
+        return {
+            name: {'mean': float(rows[:, k].mean()), 'max': float(rows[:, k].max())}
+            for k, name in enumerate(FIELDS) if k
+        }
+
+    def to_json(self, stream: TextIO):
+        json.dump({'fields': FIELDS, 'records': self.records()}, stream)
+
+    def to_csv(self, stream: TextIO):
+        writer = csv.DictWriter(stream, FIELDS)
+        writer.writeheader()
+        writer.writerows(self.records())
@@ -0,0 +1,184 @@
+# -- all GL calls live here so the engine itself runs without OpenGL installed
+from __future__ import annotations
+
+import math
+import ctypes
+import numpy as np
+import OpenGL.GL as gl
+
+from typing import Tuple
+
+from .vector import Vector2
+from .shape import ShapeType
+
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from .scene import Scene
+    from .shape import Circle, Polygon
+
+
+def draw_circle(shape: Circle):
+    segments = 20
+
+    # -- draw circle with lines
+    gl.glColor3f(shape.body.r, shape.body.g, shape.body.b)
+    gl.glBegin(gl.GL_LINE_LOOP)
+
+    theta = shape.body.orientation
+    inc = math.pi * 2.0 / segments
+    for i in range(segments):
+        theta += inc
+        p = Vector2(math.cos(theta), math.sin(theta))
+        p *= shape.radius
+        p += shape.body.position
+        gl.glVertex2f(p.x, p.y)
+
+    gl.glEnd()
+
+    # -- draw line within circle so orientation is visible
+    gl.glBegin(gl.GL_LINE_STRIP)
+
+    c = math.cos(shape.body.orientation)
+    s = math.sin(shape.body.orientation)
+    r = Vector2(0.0, 1.0)
+    r.x = r.x * c - r.y * s
+    r.y = r.x * s + r.y * c
+    r *= shape.radius
+    r = r + shape.body.position
+    gl.glVertex2f(shape.body.position.x, shape.body.position.y)
+    gl.glVertex2f(r.x, r.y)
+    gl.glEnd()
+
+
+def draw_polygon(shape: Polygon):
+    gl.glColor3f(shape.body.r, shape.body.g, shape.body.b)
+    gl.glBegin(gl.GL_LINE_LOOP)
+    for i in range(shape.vertex_count):
+        v = shape.body.position + (shape.u * shape.vertices[i])
+        gl.glVertex2f(v.x, v.y)
+    gl.glEnd()
+
+
+# -- x, y, r, g, b per vertex
+STRIDE = 5 * 4
+
+CIRCLE_SEGMENTS = 20
+NORMAL_LENGTH = 0.75
+
+
+class BatchRenderer:
+    """Draws a scene as two vertex buffers, one for every body outline and one
+    for contact points and normals, each uploaded once and drawn in one call
+    per primitive type.
+
+    Outlines are kept in body space and only rebuilt when bodies are added or
+    removed, every frame transforms them with NumPy from the body poses.
+    """
+
+    def __init__(self):
+        self.shapes = list()
+
+        # -- per outline vertex, body space position, owning body and color
+        self.local = np.zeros((0, 2))
+        self.owner = np.zeros(0, dtype=int)
+        self.color = np.zeros((0, 3), dtype=np.float32)
+
+        self.buffers = None
+
+    def outlines(self, bodies):
+        # -- line segment pairs, a closed loop per shape plus a radius on circles
+        local, owner, color = list(), list(), list()
+        for k, b in enumerate(bodies):
+            shape = b.shape
+            if shape.get_type() == ShapeType.Circle:
+                theta = np.arange(1, CIRCLE_SEGMENTS + 1) * (2.0 * math.pi / CIRCLE_SEGMENTS)
+                loop = np.column_stack((np.cos(theta), np.sin(theta))) * shape.radius
+                spoke = [(0.0, 0.0), (0.0, shape.radius)]
+            else:
+                loop = np.array([(v.x, v.y) for v in shape.vertices[:shape.vertex_count]])
+                spoke = np.zeros((0, 2))
+
+            segments = np.empty((2 * len(loop), 2))
+            segments[0::2] = loop
+            segments[1::2] = np.roll(loop, -1, axis=0)
+            segments = np.concatenate((segments, spoke))
+
+            local.append(segments)
+            owner.append(np.full(len(segments), k))
+            color.append(np.tile((b.r, b.g, b.b), (len(segments), 1)))
+
+        self.shapes = [b.shape for b in bodies]
+        self.local = np.concatenate(local) if local else np.zeros((0, 2))
+        self.owner = np.concatenate(owner) if owner else np.zeros(0, dtype=int)
+        self.color = np.concatenate(color).astype(np.float32) if color else np.zeros((0, 3))
+
+    def build(self, scene: Scene) -> Tuple[np.ndarray, np.ndarray]:
+        """Interleaved body and contact vertices for this frame. Contact points
+        come first in their buffer, followed by the pairs of normal lines."""
+        bodies = scene.bodies
+        shapes = self.shapes
+        if len(bodies) != len(shapes) or any(b.shape is not s for b, s in zip(bodies, shapes)):
+            self.outlines(bodies)
+
+        n = len(bodies)
+        if scene.world is not None:
+            position = scene.world.position[:n]
+            orientation = scene.world.orientation[:n]
+        else:
+            pose = np.array([(b.position.x, b.position.y, b.orientation) for b in bodies])
+            pose = pose.reshape(-1, 3)
+            position, orientation = pose[:, :2], pose[:, 2]
+
+        # -- one gather of every body's transform to its outline vertices
+        transform = np.column_stack((np.cos(orientation), np.sin(orientation), position))
+        c, s, px, py = transform[self.owner].T
+        x, y = self.local.T
+
+        shapes = np.empty((len(self.owner), 5), dtype=np.float32)
+        shapes[:, 0] = c * x - s * y + px
+        shapes[:, 1] = s * x + c * y + py
+        shapes[:, 2:] = self.color
+
+        points, lines = list(), list()
+        for m in scene.contacts:
+            nx, ny = m.normal.x * NORMAL_LENGTH, m.normal.y * NORMAL_LENGTH
+            for i in range(m.contact_count):
+                cp = m.contacts[i]
+                points.append((cp.x, cp.y, 1.0, 0.0, 0.0))
+                lines.append((cp.x, cp.y, 0.0, 1.0, 0.0))
+                lines.append((cp.x + nx, cp.y + ny, 0.0, 1.0, 0.0))
+        contacts = np.array(points + lines, dtype=np.float32).reshape(-1, 5)
+
+        return shapes, contacts
+
+    def draw(self, scene: Scene):
+        shapes, contacts = self.build(scene)
+        if self.buffers is None:
+            self.buffers = gl.glGenBuffers(2)
+
+        gl.glEnableClientState(gl.GL_VERTEX_ARRAY)
+        gl.glEnableClientState(gl.GL_COLOR_ARRAY)
+
+        self.upload(self.buffers[0], shapes)
+        gl.glDrawArrays(gl.GL_LINES, 0, len(shapes))
+
+        count = len(contacts) // 3
+        if count:
+            self.upload(self.buffers[1], contacts)
+            gl.glPointSize(4.0)
+            gl.glDrawArrays(gl.GL_POINTS, 0, count)
+            gl.glPointSize(1.0)
+            gl.glDrawArrays(gl.GL_LINES, count, 2 * count)
+
+        gl.glBindBuffer(gl.GL_ARRAY_BUFFER, 0)
+        gl.glDisableClientState(gl.GL_COLOR_ARRAY)
+        gl.glDisableClientState(gl.GL_VERTEX_ARRAY)
+
+    @staticmethod
+    def upload(buffer: int, data: np.ndarray):
+        # -- respecify the whole store each frame so the driver never waits on
+        # -- the previous frame's draw
+        gl.glBindBuffer(gl.GL_ARRAY_BUFFER, buffer)
+        gl.glBufferData(gl.GL_ARRAY_BUFFER, data.nbytes, data, gl.GL_STREAM_DRAW)
+        gl.glVertexPointer(2, gl.GL_FLOAT, STRIDE, ctypes.c_void_p(0))
+        gl.glColorPointer(3, gl.GL_FLOAT, STRIDE, ctypes.c_void_p(8))
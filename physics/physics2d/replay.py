@@ -0,0 +1,261 @@
+import struct
+import zlib
+
+from typing import BinaryIO, Dict
+
+from .body import Body
+from .scene import Scene
+from .vector import Vector2
+from .bodyarray import BodyArray
+from .shape import Shape, ShapeType, Circle, Polygon
+from .broadphase import BroadPhase, BruteForce, SweepAndPrune, SpatialHash
+from .tree import DynamicTree
+from .solver import SequentialSolver, ColoredSolver
+
+
+MAGIC = b'P2DR'
+VERSION = 5
+
+# -- magic, version, dt, iterations, warm starting, sleeping, batching, body array,
+# -- broad phase, cell size, contact solver, continuous collision
+HEADER = struct.Struct('<4sHdI????BdB?')
+
+OP = struct.Struct('<B')
+OP_CIRCLE = 1
+OP_POLYGON = 2
+OP_STATIC = 3
+OP_ORIENT = 4
+OP_MATERIAL = 5
+OP_FORCE = 6
+OP_IMPULSE = 7
+OP_STEP = 8
+OP_ADVANCE = 9
+OP_BULLET = 10
+OP_VELOCITY = 11
+
+CIRCLE = struct.Struct('<dddd')        # radius, x, y, orientation
+POLYGON = struct.Struct('<B')          # vertex count, followed by VERTEX per vertex
+VERTEX = struct.Struct('<dddd')        # vertex x, y, normal x, y
+PLACEMENT = struct.Struct('<ddd')      # x, y, orientation
+STATIC = struct.Struct('<I')
+ORIENT = struct.Struct('<Id')
+MATERIAL = struct.Struct('<Iddd')
+FORCE = struct.Struct('<Idd')
+IMPULSE = struct.Struct('<Idddd')
+STEP = struct.Struct('<I')             # state digest after the step
+ADVANCE = struct.Struct('<dII')        # real dt, max steps, state digest after advancing
+BULLET = struct.Struct('<I?')
+VELOCITY = struct.Struct('<Iddd')      # vx, vy, angular velocity
+
+BODY_STATE = struct.Struct('<6d')
+
+# -- the tree margin is not stored, pairs are filtered on tight boxes so it
+# -- does not change the simulation
+BROADPHASES = [BruteForce, SweepAndPrune, SpatialHash, DynamicTree]
+
+SOLVERS = [SequentialSolver, ColoredSolver]
+
+
+class ReplayError(Exception):
+    pass
+
+
+def state_digest(scene: Scene) -> int:
+    crc = 0
+    for b in scene.bodies:
+        p, v = b.position, b.velocity
+        crc = zlib.crc32(BODY_STATE.pack(
+            p.x, p.y, v.x, v.y, b.orientation, b.angular_velocity), crc)
+    return crc
+
+
+def _write_header(stream: BinaryIO, scene: Scene):
+    kind = BROADPHASES.index(type(scene.broadphase))
+    cell_size = getattr(scene.broadphase, 'cell_size', None) or 0.0
+    stream.write(HEADER.pack(
+        MAGIC, VERSION, scene.dt, scene.iterations, scene.warm_starting,
+        scene.sleeping, scene.batching, scene.world is not None, kind, cell_size,
+        SOLVERS.index(type(scene.solver)), scene.ccd))
+
+
+def _read(stream: BinaryIO, fmt: struct.Struct) -> tuple:
+    data = stream.read(fmt.size)
+    if len(data) != fmt.size:
+        raise ReplayError('truncated recording')
+    return fmt.unpack(data)
+
+
+class Recorder:
+    """Drives a scene and writes every input that changes it to a binary stream.
+
+    A scene is only reproducible if all of its bodies and the forces acting on
+    them went through the recorder, starting from an empty scene.
+    """
+
+    def __init__(self, scene: Scene, stream: BinaryIO):
+        assert not scene.bodies, 'recording must start from an empty scene'
+        self.scene = scene
+        self.stream = stream
+        self.index: Dict[Body, int] = dict()
+        _write_header(stream, scene)
+
+    def add(self, shape: Shape, x: float, y: float) -> Body:
+        b = self.scene.add(shape, x, y)
+        self.index[b] = len(self.scene.bodies) - 1
+
+        # -- the shape as given, before the body shifted it onto its centroid
+        if shape.get_type() == ShapeType.Circle:
+            self.stream.write(OP.pack(OP_CIRCLE))
+            self.stream.write(CIRCLE.pack(shape.radius, x, y, b.orientation))
+        else:
+            self.stream.write(OP.pack(OP_POLYGON))
+            self.stream.write(POLYGON.pack(shape.vertex_count))
+            for i in range(shape.vertex_count):
+                v, n = shape.vertices[i], shape.normals[i]
+                self.stream.write(VERTEX.pack(v.x, v.y, n.x, n.y))
+            self.stream.write(PLACEMENT.pack(x, y, b.orientation))
+        return b
+
+    def set_static(self, b: Body):
+        b.set_static()
+        self.stream.write(OP.pack(OP_STATIC))
+        self.stream.write(STATIC.pack(self.index[b]))
+
+    def set_orient(self, b: Body, radians: float):
+        b.set_orient(radians)
+        self.stream.write(OP.pack(OP_ORIENT))
+        self.stream.write(ORIENT.pack(self.index[b], radians))
+
+    def set_material(self, b: Body, restitution: float,
+                     static_friction: float, dynamic_friction: float):
+        b.restitution = restitution
+        b.static_friction = static_friction
+        b.dynamic_friction = dynamic_friction
+        self.stream.write(OP.pack(OP_MATERIAL))
+        self.stream.write(MATERIAL.pack(
+            self.index[b], restitution, static_friction, dynamic_friction))
+
+    def set_bullet(self, b: Body, bullet: bool = True):
+        b.bullet = bullet
+        self.stream.write(OP.pack(OP_BULLET))
+        self.stream.write(BULLET.pack(self.index[b], bullet))
+
+    def set_velocity(self, b: Body, velocity: Vector2, angular_velocity: float = None):
+        b.velocity = Vector2(velocity.x, velocity.y)
+        if angular_velocity is not None:
+            b.angular_velocity = angular_velocity
+        self.stream.write(OP.pack(OP_VELOCITY))
+        self.stream.write(VELOCITY.pack(self.index[b], velocity.x, velocity.y, b.angular_velocity))
+
+    def apply_force(self, b: Body, f: Vector2):
+        b.apply_force(f)
+        self.stream.write(OP.pack(OP_FORCE))
+        self.stream.write(FORCE.pack(self.index[b], f.x, f.y))
+
+    def apply_impulse(self, b: Body, impulse: Vector2, contactVec: Vector2):
+        b.apply_impulse(impulse, contactVec)
+        self.stream.write(OP.pack(OP_IMPULSE))
+        self.stream.write(IMPULSE.pack(
+            self.index[b], impulse.x, impulse.y, contactVec.x, contactVec.y))
+
+    def step(self):
+        self.scene.step()
+        self.stream.write(OP.pack(OP_STEP))
+        self.stream.write(STEP.pack(state_digest(self.scene)))
+
+    def advance(self, real_dt: float, max_steps: int = 8) -> int:
+        # -- the frame time is an input too, record it rather than the steps it became
+        steps = self.scene.advance(real_dt, max_steps)
+        self.stream.write(OP.pack(OP_ADVANCE))
+        self.stream.write(ADVANCE.pack(real_dt, max_steps, state_digest(self.scene)))
+        return steps
+
+
+def replay(stream: BinaryIO, verify: bool = True) -> Scene:
+    """Rebuild a scene from a recording, raising ReplayError on the first
+    step whose state does not match the recorded digest."""
+    (magic, version, dt, iterations, warm_starting, sleeping, batching, array, kind,
+     cell_size, solver, ccd) = _read(stream, HEADER)
+    if magic != MAGIC:
+        raise ReplayError('not a physics2d recording')
+    if version != VERSION:
+        raise ReplayError('unsupported recording version {}'.format(version))
+
+    if BROADPHASES[kind] is SpatialHash:
+        broadphase: BroadPhase = SpatialHash(cell_size or None)
+    else:
+        broadphase = BROADPHASES[kind]()
+    world = BodyArray() if array else None
+    scene = Scene(dt, iterations, broadphase, world,
+                  warm_starting=warm_starting, sleeping=sleeping, batching=batching,
+                  solver=SOLVERS[solver](), ccd=ccd)
+
+    frame = 0
+    while True:
+        op = stream.read(OP.size)
+        if not op:
+            return scene
+
+        op, = OP.unpack(op)
+        if op == OP_CIRCLE:
+            radius, x, y, orientation = _read(stream, CIRCLE)
+            scene.add(Circle(radius), x, y).set_orient(orientation)
+
+        elif op == OP_POLYGON:
+            count, = _read(stream, POLYGON)
+            poly = Polygon()
+            poly.vertex_count = count
+            for _ in range(count):
+                vx, vy, nx, ny = _read(stream, VERTEX)
+                poly.vertices.append(Vector2(vx, vy))
+                poly.normals.append(Vector2(nx, ny))
+            x, y, orientation = _read(stream, PLACEMENT)
+            scene.add(poly, x, y).set_orient(orientation)
+
+        elif op == OP_STATIC:
+            index, = _read(stream, STATIC)
+            scene.bodies[index].set_static()
+
+        elif op == OP_ORIENT:
+            index, radians = _read(stream, ORIENT)
+            scene.bodies[index].set_orient(radians)
+
+        elif op == OP_MATERIAL:
+            index, restitution, static_friction, dynamic_friction = _read(stream, MATERIAL)
+            b = scene.bodies[index]
+            b.restitution = restitution
+            b.static_friction = static_friction
+            b.dynamic_friction = dynamic_friction
+
+        elif op == OP_BULLET:
+            index, bullet = _read(stream, BULLET)
+            scene.bodies[index].bullet = bullet
+
+        elif op == OP_VELOCITY:
+            index, vx, vy, w = _read(stream, VELOCITY)
+            b = scene.bodies[index]
+            b.velocity = Vector2(vx, vy)
+            b.angular_velocity = w
+
+        elif op == OP_FORCE:
+            index, x, y = _read(stream, FORCE)
+            scene.bodies[index].apply_force(Vector2(x, y))
+
+        elif op == OP_IMPULSE:
+            index, x, y, cx, cy = _read(stream, IMPULSE)
+            scene.bodies[index].apply_impulse(Vector2(x, y), Vector2(cx, cy))
+
+        elif op in (OP_STEP, OP_ADVANCE):
+            if op == OP_STEP:
+                digest, = _read(stream, STEP)
+                scene.step()
+            else:
+                real_dt, max_steps, digest = _read(stream, ADVANCE)
+                scene.advance(real_dt, max_steps)
+
+            frame += 1
+            if verify and state_digest(scene) != digest:
+                raise ReplayError('replay diverged at frame {}'.format(frame))
+
+        else:
+            raise ReplayError('unknown op code {}'.format(op))
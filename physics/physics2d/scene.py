@@ -1,15 +1,35 @@
-import OpenGL.GL as gl
-from typing import List
+import numpy as np
+
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
 
 from .body import Body
+from .aabb import AABB
 from .shape import Shape
 from .vector import Vector2
+from . import profiler
+from . import snapshot
 from .manifold import Manifold
-from .constants import GRAVITY
+from .profiler import StepProfiler
+from .dispatcher import BatchDispatch
+from .solver import ContactSolver, SequentialSolver
+from .broadphase import BroadPhase, SweepAndPrune
+from .tree import DynamicTree
+from .ccd import IsFast, Sweep
+from .bodyarray import BodyArray, ArrayBody
+from .constants import (
+    GRAVITY,
+    SLEEP_LINEAR_TOLERANCE,
+    SLEEP_ANGULAR_TOLERANCE,
+    TIME_TO_SLEEP
+)
+
+
+def IsActive(b: Body) -> bool:
+    return b.inv_mass != 0.0 and b.awake
 
 
 def IntegrateForces(b: Body, dt: float):
-    if b.inv_mass == 0.0:
+    if b.inv_mass == 0.0 or not b.awake:
         return
 
     b.velocity += (b.force * b.inv_mass + GRAVITY) * (dt / 2.0)
@@ -17,7 +37,7 @@ def IntegrateForces(b: Body, dt: float):
 
 
 def IntegrateVelocity(b: Body, dt: float):
-    if b.inv_mass == 0.0:
+    if b.inv_mass == 0.0 or not b.awake:
         return
 
     b.position += b.velocity * dt
@@ -26,84 +46,359 @@ def IntegrateVelocity(b: Body, dt: float):
     IntegrateForces(b, dt)
 
 
+class RayHit(NamedTuple):
+    body: Body
+    point: Vector2
+    normal: Vector2
+    distance: float
+
+
 class Scene:
-    def __init__(self, dt: float, iterations: int):
+    def __init__(self, dt: float, iterations: int,
+                 broadphase: BroadPhase = None, world: BodyArray = None,
+                 warm_starting: bool = True, sleeping: bool = True,
+                 batching: bool = True, solver: ContactSolver = None,
+                 ccd: bool = True):
         self.dt = dt
         self.iterations = iterations
+        self.warm_starting = warm_starting
+        self.sleeping = sleeping
+        self.batching = batching
+        self.ccd = ccd
+
+        # -- real time not yet simulated by advance
+        self.accumulator = 0.0
+
+        self.broadphase = broadphase or SweepAndPrune()
+        self.solver = solver or SequentialSolver()
+        # -- optional structure-of-arrays storage, bodies become views into it
+        self.world = world
         self.bodies: List[Body] = list()
         self.contacts: List[Manifold] = list()
 
-    def step(self):
-        # -- generate collision info
-        self.contacts.clear()
-        for i in range(len(self.bodies)):
-            A = self.bodies[i]
+        # -- manifolds persist per body pair while the pair stays in the broad phase,
+        # -- carrying separating axes and accumulated impulses to the next step
+        self.manifolds: Dict[Tuple[int, int], Manifold] = dict()
+
+        # -- spatial queries, the broad phase itself if it is a tree, otherwise
+        # -- built on the first query and kept up to date by step from then on
+        self.tree: DynamicTree = broadphase if isinstance(broadphase, DynamicTree) else None
+
+        # -- per phase timings of every step when set, see profiler.StepProfiler
+        self.profiler: StepProfiler = None
 
-            for j in range(i+1, len(self.bodies)):
-                B = self.bodies[j]
+        # -- render.BatchRenderer, built by the first call to render
+        self.renderer = None
 
-                if A.inv_mass == 0.0 and B.inv_mass == 0.0:
-                    continue
+    def step(self):
+        # -- nothing moves until something is woken or added
+        if self.sleeping and not any(IsActive(b) for b in self.bodies):
+            return
+
+        prof = self.profiler
+        if prof is not None:
+            prof.begin()
 
-                m = Manifold(A, B)
-                m.solve()
-                if m.contact_count:
-                    self.contacts.append(m)
+        # -- generate collision info
+        pairs = self.collide()
+        if prof is not None:
+            prof.mark(profiler.NARROWPHASE)
 
         # -- integrate forces
-        for b in self.bodies:
-            IntegrateForces(b, self.dt)
+        if self.world is not None:
+            self.world.integrate_forces(self.dt)
+        else:
+            for b in self.bodies:
+                IntegrateForces(b, self.dt)
+        if prof is not None:
+            prof.mark(profiler.INTEGRATE_FORCES)
 
         # -- initialize collision
-        for c in self.contacts:
-            c.initialize()
+        if self.contacts:
+            v = self.gather_velocities()
+            self.solver.initialize(self.contacts, v, self.dt, self.warm_starting)
+            if prof is not None:
+                prof.mark(profiler.INITIALIZE)
+
+            # -- solve collision
+            self.solver.solve(self.contacts, v, self.iterations)
+            self.scatter_velocities(v)
+            if prof is not None:
+                prof.mark(profiler.SOLVE)
 
-        # -- solve collision
-        for _ in range(self.iterations):
-            for c in self.contacts:
-                c.apply_impulse()
+        # -- put resting islands to sleep, wake islands touched by awake bodies
+        if self.sleeping:
+            self.update_islands()
+            if prof is not None:
+                prof.mark(profiler.ISLANDS)
+
+        # -- poses of bodies that may tunnel, before they move
+        movers = list()
+        if self.ccd:
+            for b in self.bodies:
+                if IsFast(b, self.dt):
+                    p = b.position
+                    movers.append((b, Vector2(p.x, p.y), b.orientation))
 
         # -- integrate velocities
-        for b in self.bodies:
-            IntegrateVelocity(b, self.dt)
+        if self.world is not None:
+            self.world.integrate_velocity(self.dt)
+        else:
+            for b in self.bodies:
+                IntegrateVelocity(b, self.dt)
+
+        # -- pull fast bodies back to their time of impact
+        for b, start, start_angle in movers:
+            Sweep(self, b, start, start_angle)
+        if prof is not None:
+            prof.mark(profiler.INTEGRATE_VELOCITY)
 
         # -- correct positions
         for c in self.contacts:
             c.positional_correction()
 
         # -- clear all forces
-        for b in self.bodies:
-            b.velocity = Vector2()
-            b.torque = 0
+        if self.world is not None:
+            self.world.clear_forces()
+        else:
+            for b in self.bodies:
+                b.force = Vector2()
+                b.torque = 0.0
 
-    def render(self):
+        # -- refit proxies of bodies that left their fat boxes
+        if self.tree is not None:
+            self.tree.update(self.bodies)
+
+        if prof is not None:
+            prof.mark(profiler.CORRECTION)
+            prof.end(pairs, len(self.contacts), self.iterations)
+
+    def collide(self) -> int:
+        self.contacts.clear()
+        bodies = self.bodies
+        manifolds = dict()
+
+        pairs = list(self.broadphase.pairs(bodies))
+        if self.profiler is not None:
+            self.profiler.mark(profiler.BROADPHASE)
+
+        # -- candidate pairs per shape type combination with a batched narrow phase
+        batches: Dict[Tuple[int, int], List[Tuple[int, int]]] = dict()
+
+        for key in pairs:
+            m = self.manifolds.get(key)
+            A, B = bodies[key[0]], bodies[key[1]]
+
+            # -- pairs without an awake body keep their contacts as they were
+            if not (IsActive(A) or IsActive(B)):
+                manifolds[key] = m or Manifold(A, B, *key)
+                continue
+
+            types = A.shape.get_type().value, B.shape.get_type().value
+            if self.batching and BatchDispatch[types[0]][types[1]] is not None:
+                batches.setdefault(types, list()).append(key)
+                continue
+
+            # -- pairs that left the broad phase are dropped with their impulses
+            if m is None:
+                m = Manifold(A, B, *key)
+            manifolds[key] = m
+            m.update()
+            if m.contact_count:
+                self.contacts.append(m)
+
+        if batches:
+            if self.world is not None:
+                position = self.world.position[:self.world.count]
+            else:
+                position = np.array([(b.position.x, b.position.y) for b in bodies])
+            radius = np.array([b.shape.radius for b in bodies])
+
+        for types, keys in batches.items():
+            index = np.array(keys, dtype=int)
+            touching, normal, contact, penetration = BatchDispatch[types[0]][types[1]](
+                index[:, 0], index[:, 1], position, radius)
+
+            # -- manifolds only for pairs that touch, the rest carry nothing over
+            for k, n, c, p in zip(touching.tolist(), normal.tolist(),
+                                  contact.tolist(), penetration.tolist()):
+                key = keys[k]
+                m = self.manifolds.get(key)
+                if m is None:
+                    m = Manifold(bodies[key[0]], bodies[key[1]], *key)
+                manifolds[key] = m
+                m.set_contact(Vector2(*n), Vector2(*c), p)
+                self.contacts.append(m)
+
+        self.manifolds = manifolds
+        return len(pairs)
+
+    def gather_velocities(self) -> List[float]:
+        # -- flat [vx, vy, w] per body, the solver works on this list in place
+        if self.world is not None:
+            n = self.world.count
+            return np.column_stack(
+                (self.world.velocity[:n], self.world.angular_velocity[:n])).ravel().tolist()
+
+        v = list()
         for b in self.bodies:
-            b.shape.draw()
+            velocity = b.velocity
+            v += velocity.x, velocity.y, b.angular_velocity
+        return v
 
-        gl.glPointSize(4.0)
-        gl.glBegin(gl.GL_POINTS)
-        gl.glColor3f(1.0, 0.0, 0.0)
-        for c in self.contacts:
-            for i in range(c.contact_count):
-                cp = c.contacts[i]
-                gl.glVertex2f(cp.x, cp.y)
+    def scatter_velocities(self, v: List[float]):
+        if self.world is not None:
+            n = self.world.count
+            v = np.array(v).reshape(n, 3)
+            self.world.velocity[:n] = v[:, :2]
+            self.world.angular_velocity[:n] = v[:, 2]
+            return
 
-        gl.glEnd()
-        gl.glPointSize(1.0)
+        for k, b in enumerate(self.bodies):
+            velocity = b.velocity
+            velocity.x, velocity.y = v[3*k], v[3*k+1]
+            b.angular_velocity = v[3*k+2]
 
-        gl.glBegin(gl.GL_LINES)
-        gl.glColor3f(0.0, 1.0, 0.0)
-        for c in self.contacts:
-            n = c.normal
-            for i in range(c.contact_count):
-                cp = c.contacts[i]
-                gl.glVertex2f(cp.x, cp.y)
-                n *= .75
-                cp += n
-                gl.glVertex2f(cp.x, cp.y)
-        gl.glEnd()
+    def advance(self, real_dt: float, max_steps: int = 8) -> int:
+        self.accumulator += real_dt
+
+        steps = 0
+        while self.accumulator >= self.dt and steps < max_steps:
+            self.step()
+            self.accumulator -= self.dt
+            steps += 1
+
+        # -- drop time we could not catch up on instead of spiralling further behind
+        if steps == max_steps:
+            self.accumulator = min(self.accumulator, self.dt)
+        return steps
+
+    @property
+    def alpha(self) -> float:
+        # -- fraction of a step left in the accumulator, for render interpolation
+        return self.accumulator / self.dt
+
+    def snapshot(self) -> bytes:
+        return snapshot.capture(self)
+
+    def restore(self, data: bytes):
+        snapshot.restore(self, data)
+
+    def resimulate(self, data: bytes, frames: int,
+                   inputs: Callable[['Scene', int], None] = None,
+                   capture: bool = False) -> List[bytes]:
+        """Roll back to `data` and step `frames` times, calling inputs(scene, frame)
+        before each step to replay forces and impulses. With capture set the
+        snapshot after every frame is returned, ready for the next rollback."""
+        snapshot.restore(self, data)
+
+        frames_out = list()
+        for frame in range(frames):
+            if inputs is not None:
+                inputs(self, frame)
+            self.step()
+            if capture:
+                frames_out.append(snapshot.capture(self))
+        return frames_out
+
+    def update_islands(self):
+        bodies = self.bodies
+        parent = list(range(len(bodies)))
+
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        # -- islands are bodies connected by touching contacts, static bodies
+        # -- do not join islands or a single floor would chain everything together
+        for (i, j), m in self.manifolds.items():
+            if m.contact_count and m.A.inv_mass != 0.0 and m.B.inv_mass != 0.0:
+                parent[find(i)] = find(j)
+
+        linear = SLEEP_LINEAR_TOLERANCE**2
+        islands: Dict[int, List[float]] = dict()
+        for i, b in enumerate(bodies):
+            if b.inv_mass == 0.0:
+                continue
+
+            if b.awake:
+                if (b.velocity.length_sqr > linear or
+                        abs(b.angular_velocity) > SLEEP_ANGULAR_TOLERANCE):
+                    b.sleep_time = 0.0
+                else:
+                    b.sleep_time += self.dt
+
+            # -- [shortest sleep time, any body awake]
+            island = islands.setdefault(find(i), [TIME_TO_SLEEP, False])
+            island[0] = min(island[0], b.sleep_time)
+            island[1] = island[1] or b.awake
+
+        for i, b in enumerate(bodies):
+            if b.inv_mass == 0.0:
+                continue
+
+            sleep_time, awake = islands[find(i)]
+            if not awake:
+                continue
+            if sleep_time >= TIME_TO_SLEEP:
+                b.set_awake(False)
+            elif not b.awake:
+                b.set_awake(True)
+
+    def spatial_index(self) -> DynamicTree:
+        if self.tree is None:
+            self.tree = DynamicTree()
+            self.tree.update(self.bodies)
+        return self.tree
+
+    def query_point(self, x: float, y: float) -> Iterator[Body]:
+        p = Vector2(x, y)
+        for i in self.spatial_index().query_point(x, y):
+            b = self.bodies[i]
+            if b.shape.test_point(p):
+                yield b
+
+    def query_aabb(self, aabb: AABB) -> Iterator[Body]:
+        for i in self.spatial_index().query_aabb(aabb):
+            b = self.bodies[i]
+            if b.shape.compute_aabb().overlaps(aabb):
+                yield b
+
+    def raycast(self, origin: Vector2, direction: Vector2,
+                max_distance: float) -> Optional[RayHit]:
+        p1 = Vector2(origin.x, origin.y)
+        p2 = p1 + Vector2(direction.x, direction.y).normalize() * max_distance
+        closest = list()
+
+        def clip(i: int, max_fraction: float) -> float:
+            hit = self.bodies[i].shape.raycast(p1, p2, max_fraction)
+            if hit is None:
+                return -1.0
+            closest[:] = i, hit[0], hit[1]
+            return hit[0]
+
+        self.spatial_index().raycast(p1, p2, clip)
+        if not closest:
+            return None
+
+        i, fraction, normal = closest
+        return RayHit(self.bodies[i], p1 + (p2 - p1) * fraction, normal, fraction * max_distance)
+
+    def render(self):
+        # -- created on first use, GL buffers need a current context
+        if self.renderer is None:
+            from .render import BatchRenderer
+            self.renderer = BatchRenderer()
+        self.renderer.draw(self)
 
     def add(self, shape: Shape, x: int, y: int):
-        b = Body(shape, x, y)
+        if self.world is not None:
+            b = ArrayBody(self.world, shape, x, y)
+        else:
+            b = Body(shape, x, y)
         self.bodies.append(b)
+        if self.tree is not None:
+            self.tree.add_bodies(self.bodies)
         return b
@@ -1,9 +1,10 @@
 import sys
 import math
-import OpenGL.GL as gl
 
+from collections import OrderedDict
 from enum import Enum
-from typing import List
+from typing import Dict, List, Optional, Tuple
+from .aabb import AABB
 from .matrix import Mat2
 from .vector import Vector2
 from .constants import EPSILON
@@ -33,6 +34,22 @@ class Shape:
     def set_orient(self, radians: float):
         raise NotImplementedError()
 
+    def compute_aabb(self) -> AABB:
+        raise NotImplementedError()
+
+    def core_radius(self) -> float:
+        # -- radius of the largest circle around the centroid inside the shape
+        raise NotImplementedError()
+
+    def test_point(self, p: Vector2) -> bool:
+        raise NotImplementedError()
+
+    def raycast(self, p1: Vector2, p2: Vector2,
+                max_fraction: float = 1.0) -> Optional[Tuple[float, Vector2]]:
+        # -- (fraction along p1 -> p2, world normal) of the first hit, None for
+        # -- a miss or a segment starting inside the shape
+        raise NotImplementedError()
+
     def draw(self):
         raise NotImplementedError()
 
@@ -61,37 +78,38 @@ class Circle(Shape):
     def set_orient(self, radians: float):
         pass
 
+    def compute_aabb(self) -> AABB:
+        p = self.body.position
+        r = self.radius
+        return AABB(p.x - r, p.y - r, p.x + r, p.y + r)
+
+    def core_radius(self) -> float:
+        return self.radius
+
+    def test_point(self, p: Vector2) -> bool:
+        return self.body.position.distance_sqr(p) <= self.radius**2
+
+    def raycast(self, p1, p2, max_fraction=1.0):
+        s = p1 - self.body.position
+        b = s.length_sqr - self.radius**2
+
+        # -- solve |s + t * d| = r for the smaller t
+        d = p2 - p1
+        c = s.dot(d)
+        rr = d.length_sqr
+        sigma = c * c - rr * b
+        if sigma < 0.0 or rr < EPSILON:
+            return None
+
+        a = -(c + math.sqrt(sigma))
+        if 0.0 <= a <= max_fraction * rr:
+            a /= rr
+            return a, (s + a * d).normalize()
+        return None
+
     def draw(self):
-        segments = 20
-
-        # -- draw circle with lines
-        gl.glColor3f(self.body.r, self.body.g, self.body.b)
-        gl.glBegin(gl.GL_LINE_LOOP)
-
-        theta = self.body.orientation
-        inc = math.pi * 2.0 / segments
-        for i in range(segments):
-            theta += inc
-            p = Vector2(math.cos(theta), math.sin(theta))
-            p *= self.radius
-            p += self.body.position
-            gl.glVertex2f(p.x, p.y)
-
-        gl.glEnd()
-
-        # -- draw line within circle so orientation is visible
-        gl.glBegin(gl.GL_LINE_STRIP)
-
-        c = math.cos(self.body.orientation)
-        s = math.sin(self.body.orientation)
-        r = Vector2(0.0, 1.0)
-        r.x = r.x * c - r.y * s
-        r.y = r.x * s + r.y * c
-        r *= self.radius
-        r = r + self.body.position
-        gl.glVertex2f(self.body.position.x, self.body.position.y)
-        gl.glVertex2f(r.x, r.y)
-        gl.glEnd()
+        from .render import draw_circle
+        draw_circle(self)
 
     def get_type(self) -> ShapeType:
         return ShapeType.Circle
@@ -104,9 +122,11 @@ class Polygon(Shape):
     def __init__(self):
         Shape.__init__(self)
 
+        # -- vertex and normal lists are never changed in place, set and
+        # -- compute_mass replace them, so clones share them freely
         self.vertex_count = 0
-        self.vertices = [Vector2() for _ in range(MAXPOLY_VERTEXCOUNT)]
-        self.normals = [Vector2() for _ in range(MAXPOLY_VERTEXCOUNT)]
+        self.vertices: List[Vector2] = list()
+        self.normals: List[Vector2] = list()
 
     def initialize(self):
         self.compute_mass(1.0)
@@ -114,67 +134,107 @@ class Polygon(Shape):
     def clone(self):
         poly = Polygon()
         poly.u = self.u
-        for i in range(self.vertex_count):
-            poly.vertices[i] = self.vertices[i]
-            poly.normals[i] = self.normals[i]
+        poly.vertices = self.vertices
+        poly.normals = self.normals
         poly.vertex_count = self.vertex_count
         return poly
 
     def compute_mass(self, density: float):
-        c = Vector2()
-        area = 0.0
-        I = 0.0
-        k_inv3 = 1.0 / 3.0
-
-        for i in range(self.vertex_count):
-            p1 = self.vertices[i]
-            i2 = i + i if i + 1 < self.vertex_count else 0
-            p2 = self.vertices[i2]
-
-            D = p1.cross(p2)
-            triangle_area = 0.5 * D
-            area += triangle_area
-
-            c += triangle_area * k_inv3 * (p1 + p2)
-            intx2 = p1.x * p1.x + p2.x * p1.x + p2.x * p2.x
-            inty2 = p1.y * p1.y + p2.y * p1.y + p2.y * p2.y
-            I += (0.25 * k_inv3 * D) * (intx2 + inty2)
-
-        c *= 1.0 / area
+        proto = PolygonPrototype.get(self.vertices[:self.vertex_count], self.normals, density)
 
-        for j in range(self.vertex_count):
-            self.vertices[j] -= c
-
-        self.body.mass = density * area
-        self.body.inv_mass = 1.0 / self.body.mass if self.body.mass else 0.0
-        self.body.moment = I * density
-        self.body.inv_moment = 1.0 / self.body.moment if self.body.moment else 0.0
+        self.vertices = proto.vertices
+        self.normals = proto.normals
+        self.body.mass = proto.mass
+        self.body.inv_mass = proto.inv_mass
+        self.body.moment = proto.moment
+        self.body.inv_moment = proto.inv_moment
 
     def set_orient(self, radians: float):
         self.u = Mat2.from_angle(radians)
 
-    def draw(self):
-        gl.glColor3f(self.body.r, self.body.g, self.body.b)
-        gl.glBegin(gl.GL_LINE_LOOP)
+    def compute_aabb(self) -> AABB:
+        u = self.u
+        m00, m01, m10, m11 = u.m00, u.m01, u.m10, u.m11
+        px, py = self.body.position.x, self.body.position.y
+
+        min_x = min_y = sys.float_info.max
+        max_x = max_y = -sys.float_info.max
+        for i in range(self.vertex_count):
+            v = self.vertices[i]
+            x = m00 * v.x + m01 * v.y
+            y = m10 * v.x + m11 * v.y
+            if x < min_x:
+                min_x = x
+            if x > max_x:
+                max_x = x
+            if y < min_y:
+                min_y = y
+            if y > max_y:
+                max_y = y
+
+        return AABB(min_x + px, min_y + py, max_x + px, max_y + py)
+
+    def core_radius(self) -> float:
+        return min(self.normals[i].dot(self.vertices[i]) for i in range(self.vertex_count))
+
+    def test_point(self, p: Vector2) -> bool:
+        local = self.u.transpose() * (p - self.body.position)
         for i in range(self.vertex_count):
-            v = self.body.position + (self.u * self.vertices[i])
-            gl.glVertex2f(v.x, v.y)
-        gl.glEnd()
+            if self.normals[i].dot(local - self.vertices[i]) > 0.0:
+                return False
+        return True
+
+    def raycast(self, p1, p2, max_fraction=1.0):
+        uT = self.u.transpose()
+        p1 = uT * (p1 - self.body.position)
+        d = uT * (p2 - self.body.position) - p1
+
+        # -- clip the segment against every face plane
+        lower, upper = 0.0, max_fraction
+        index = -1
+        for i in range(self.vertex_count):
+            n = self.normals[i]
+            numerator = n.dot(self.vertices[i] - p1)
+            denominator = n.dot(d)
+
+            if denominator == 0.0:
+                if numerator < 0.0:
+                    return None
+            elif denominator < 0.0 and numerator < lower * denominator:
+                # -- entering this face's half plane
+                lower = numerator / denominator
+                index = i
+            elif denominator > 0.0 and numerator < upper * denominator:
+                upper = numerator / denominator
+
+            if upper < lower:
+                return None
+
+        if index < 0:
+            return None
+        return lower, self.u * self.normals[index]
+
+    def draw(self):
+        from .render import draw_polygon
+        draw_polygon(self)
 
     def get_type(self) -> ShapeType:
         return ShapeType.Poly
 
     def set_box(self, hw: float, hh: float):
         self.vertex_count = 4
-        self.vertices[0] = Vector2(-hw, -hh)
-        self.vertices[1] = Vector2(+hw, -hh)
-        self.vertices[2] = Vector2(+hw, +hh)
-        self.vertices[3] = Vector2(-hw, +hh)
-
-        self.normals[0] = Vector2(+0.0, -1.0)
-        self.normals[1] = Vector2(+1.0,  0.0)
-        self.normals[2] = Vector2(+0.0,  1.0)
-        self.normals[3] = Vector2(-1.0,  0.0)
+        self.vertices = [
+            Vector2(-hw, -hh),
+            Vector2(+hw, -hh),
+            Vector2(+hw, +hh),
+            Vector2(-hw, +hh),
+        ]
+        self.normals = [
+            Vector2(+0.0, -1.0),
+            Vector2(+1.0,  0.0),
+            Vector2(+0.0,  1.0),
+            Vector2(-1.0,  0.0),
+        ]
 
     def set(self, vertices: List[Vector2], count: int):
         assert count > 2 and count < MAXPOLY_VERTEXCOUNT
@@ -201,7 +261,7 @@ class Polygon(Shape):
             nexthull_index = 0
             for j in range(count):
                 if nexthull_index == indexhull:
-                    nexthull_index = i
+                    nexthull_index = j
                     continue
 
                 e1 = vertices[nexthull_index] - vertices[hull[outcount]]
@@ -211,7 +271,7 @@ class Polygon(Shape):
                     nexthull_index = j
 
                 if c == 0.0 and e2.length_sqr > e1.length_sqr:
-                    nexthull_index - j
+                    nexthull_index = j
 
             outcount += 1
             indexhull = nexthull_index
@@ -220,8 +280,8 @@ class Polygon(Shape):
                 self.vertex_count = outcount
                 break
 
-        for i in range(self.vertex_count):
-            self.vertices[i] = vertices[hull[i]]
+        self.vertices = [vertices[hull[i]] for i in range(self.vertex_count)]
+        self.normals = list()
 
         for k in range(self.vertex_count):
             i2 = k + 1 if k + 1 < self.vertex_count else 0
@@ -229,8 +289,7 @@ class Polygon(Shape):
 
             assert(face.length_sqr > EPSILON**2)
 
-            self.normals[k] = Vector2(face.y, -face.x)
-            self.normals[k].normalize()
+            self.normals.append(Vector2(face.y, -face.x).normalize())
 
     def get_support(self, dir_: Vector2) -> Vector2:
         best_projection = -sys.float_info.max
@@ -245,3 +304,67 @@ class Polygon(Shape):
                 best_projection = projection
 
         return best_vertex
+
+
+class PolygonPrototype:
+    """Centered vertices, normals and mass properties of one polygon at one
+    density, shared by every body built from the same vertices.
+
+    Bodies spawned from one shape all recompute the same centroid, area and
+    moment, the cache does it once per distinct vertex set and density.
+    It keeps the CACHE_SIZE most recently used prototypes, so procedural
+    shapes that never repeat do not grow it forever.
+    """
+
+    CACHE_SIZE = 256
+
+    cache: Dict[Tuple[Tuple[float, ...], float], "PolygonPrototype"] = OrderedDict()
+
+    __slots__ = 'vertices', 'normals', 'mass', 'inv_mass', 'moment', 'inv_moment'
+
+    def __init__(self, vertices: List[Vector2], normals: List[Vector2], density: float):
+        c = Vector2()
+        area = 0.0
+        I = 0.0
+        k_inv3 = 1.0 / 3.0
+
+        count = len(vertices)
+        for i in range(count):
+            p1 = vertices[i]
+            i2 = i + 1 if i + 1 < count else 0
+            p2 = vertices[i2]
+
+            D = p1.cross(p2)
+            triangle_area = 0.5 * D
+            area += triangle_area
+
+            c += triangle_area * k_inv3 * (p1 + p2)
+            intx2 = p1.x * p1.x + p2.x * p1.x + p2.x * p2.x
+            inty2 = p1.y * p1.y + p2.y * p1.y + p2.y * p2.y
+            I += (0.25 * k_inv3 * D) * (intx2 + inty2)
+
+        c *= 1.0 / area
+
+        self.vertices = [v - c for v in vertices]
+        self.normals = normals[:count]
+        self.mass = density * area
+        self.inv_mass = 1.0 / self.mass if self.mass else 0.0
+        self.moment = I * density
+        self.inv_moment = 1.0 / self.moment if self.moment else 0.0
+
+    @classmethod
+    def get(cls, vertices: List[Vector2], normals: List[Vector2], density: float) -> "PolygonPrototype":
+        key = (tuple(c for v in vertices for c in (v.x, v.y)), density)
+        proto = cls.cache.get(key)
+        if proto is not None:
+            cls.cache.move_to_end(key)
+            return proto
+
+        proto = cls.cache[key] = cls(vertices, normals, density)
+        if len(cls.cache) > cls.CACHE_SIZE:
+            cls.cache.popitem(last=False)
+        return proto
+
+    @classmethod
+    def clear_cache(cls):
+        cls.cache.clear()
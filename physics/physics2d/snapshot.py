@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import struct
+import numpy as np
+
+from .vector import Vector2
+from .manifold import Manifold
+from .broadphase import SweepAndPrune
+
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from .scene import Scene
+
+
+MAGIC = b'P2DS'
+VERSION = 1
+
+# -- magic, version, bodies, manifolds, sweep and prune order length, accumulator
+HEADER = struct.Struct('<4sHIIId')
+
+# -- per body, in this column order
+BODY_FIELDS = (
+    'px', 'py', 'vx', 'vy', 'fx', 'fy',
+    'orientation', 'angular_velocity', 'torque', 'inv_mass', 'inv_moment', 'awake',
+    'sleep_time', 'mass', 'moment', 'restitution', 'static_friction', 'dynamic_friction',
+    'bullet',
+)
+
+# -- i, j, contact count, axis flip (-1 without axis), axis face, feature ids,
+# -- normal impulses, tangent impulses, normal, contacts, penetration, separations
+MANIFOLD = struct.Struct('<IIBbBII2d2d2d4dd2d')
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def _attributes(b) -> tuple:
+    return (
+        b.sleep_time, b.mass, b.moment, b.restitution,
+        b.static_friction, b.dynamic_friction, b.bullet
+    )
+
+
+def capture(scene: Scene) -> bytes:
+    """State of every body and persistent manifold as one bytes object.
+
+    Shapes are not stored, a snapshot restores into the scene it was taken
+    from or one built with the same sequence of Scene.add calls.
+    """
+    bodies = scene.bodies
+    n = len(bodies)
+
+    world = scene.world
+    if world is not None:
+        rows = np.empty((n, len(BODY_FIELDS)))
+        rows[:, 0:2] = world.position[:n]
+        rows[:, 2:4] = world.velocity[:n]
+        rows[:, 4:6] = world.force[:n]
+        rows[:, 6] = world.orientation[:n]
+        rows[:, 7] = world.angular_velocity[:n]
+        rows[:, 8] = world.torque[:n]
+        rows[:, 9] = world.inv_mass[:n]
+        rows[:, 10] = world.inv_moment[:n]
+        rows[:, 11] = world.awake[:n]
+        rows[:, 12:] = [_attributes(b) for b in bodies] or np.empty((0, 7))
+        body_data = rows.tobytes()
+    else:
+        values = list()
+        for b in bodies:
+            p, v, f = b.position, b.velocity, b.force
+            values += (
+                p.x, p.y, v.x, v.y, f.x, f.y,
+                b.orientation, b.angular_velocity, b.torque, b.inv_mass, b.inv_moment, b.awake
+            )
+            values += _attributes(b)
+        body_data = struct.pack('<%dd' % len(values), *values)
+
+    order = scene.broadphase.order if isinstance(scene.broadphase, SweepAndPrune) else []
+
+    chunks = [
+        HEADER.pack(MAGIC, VERSION, n, len(scene.manifolds), len(order), scene.accumulator),
+        body_data,
+        struct.pack('<%dI' % len(order), *order),
+    ]
+    for (i, j), m in scene.manifolds.items():
+        flip, face = m.axis if m.axis is not None else (-1, 0)
+        chunks.append(MANIFOLD.pack(
+            i, j, m.contact_count, flip, face, m.ids[0], m.ids[1],
+            m.normal_impulse[0], m.normal_impulse[1],
+            m.tangent_impulse[0], m.tangent_impulse[1],
+            m.normal.x, m.normal.y,
+            m.contacts[0].x, m.contacts[0].y, m.contacts[1].x, m.contacts[1].y,
+            m.penetration, m.separation[0], m.separation[1]
+        ))
+    return b''.join(chunks)
+
+
+def restore(scene: Scene, data: bytes):
+    """Put the scene back to a captured state. Bodies added after the capture
+    are dropped, so the scene must not have fewer bodies than the snapshot."""
+    magic, version, n, manifold_count, order_count, accumulator = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise SnapshotError('not a physics2d snapshot')
+    if version != VERSION:
+        raise SnapshotError('unsupported snapshot version {}'.format(version))
+    if n > len(scene.bodies):
+        raise SnapshotError('snapshot has {} bodies, scene only {}'.format(n, len(scene.bodies)))
+
+    offset = HEADER.size
+    rows = np.frombuffer(data, dtype='<f8', count=n * len(BODY_FIELDS), offset=offset)
+    rows = rows.reshape(n, len(BODY_FIELDS))
+    offset += rows.nbytes
+
+    # -- roll back bodies added since the capture
+    del scene.bodies[n:]
+    bodies = scene.bodies
+
+    world = scene.world
+    if world is not None:
+        world.count = n
+        world.oriented = [(i, shape) for i, shape in world.oriented if i < n]
+        world.position[:n] = rows[:, 0:2]
+        world.velocity[:n] = rows[:, 2:4]
+        world.force[:n] = rows[:, 4:6]
+        world.orientation[:n] = rows[:, 6]
+        world.angular_velocity[:n] = rows[:, 7]
+        world.torque[:n] = rows[:, 8]
+        world.inv_mass[:n] = rows[:, 9]
+        world.inv_moment[:n] = rows[:, 10]
+        world.awake[:n] = rows[:, 11] != 0.0
+        world.update_orientations(np.ones(n, dtype=bool))
+
+        for b, row in zip(bodies, rows[:, 12:].tolist()):
+            (b.sleep_time, b.mass, b.moment, b.restitution,
+             b.static_friction, b.dynamic_friction, bullet) = row
+            b.bullet = bool(bullet)
+    else:
+        for b, row in zip(bodies, rows.tolist()):
+            (px, py, vx, vy, fx, fy, orientation, b.angular_velocity, b.torque,
+             b.inv_mass, b.inv_moment, awake, b.sleep_time, b.mass, b.moment,
+             b.restitution, b.static_friction, b.dynamic_friction, bullet) = row
+            b.position = Vector2(px, py)
+            b.velocity = Vector2(vx, vy)
+            b.force = Vector2(fx, fy)
+            b.set_orient(orientation)
+            b.awake = bool(awake)
+            b.bullet = bool(bullet)
+
+    order = list(struct.unpack_from('<%dI' % order_count, data, offset))
+    offset += 4 * order_count
+    if isinstance(scene.broadphase, SweepAndPrune):
+        scene.broadphase.order = order
+
+    # -- manifolds of pairs still alive are reused, only their state is replaced
+    old = scene.manifolds
+    manifolds = dict()
+    records = MANIFOLD.iter_unpack(data[offset:offset + manifold_count * MANIFOLD.size])
+    for (i, j, count, flip, face, id0, id1, jn0, jn1, jt0, jt1, nx, ny,
+         c0x, c0y, c1x, c1y, penetration, s0, s1) in records:
+        m = old.get((i, j))
+        if m is None or m.A is not bodies[i] or m.B is not bodies[j]:
+            m = Manifold(bodies[i], bodies[j], i, j)
+        m.contact_count = count
+        m.axis = (bool(flip), face) if flip >= 0 else None
+        m.ids = [id0, id1]
+        m.normal_impulse = [jn0, jn1]
+        m.tangent_impulse = [jt0, jt1]
+        m.normal = Vector2(nx, ny)
+        m.contacts = [Vector2(c0x, c0y), Vector2(c1x, c1y)]
+        m.penetration = penetration
+        m.separation = [s0, s1]
+        manifolds[i, j] = m
+
+    scene.manifolds = manifolds
+    scene.contacts = [m for m in manifolds.values() if m.contact_count]
+    scene.accumulator = accumulator
+
+    # -- refit the query tree to the restored poses
+    tree = scene.tree
+    if tree is not None:
+        if len(tree.proxies) > n:
+            tree.clear()
+        tree.add_bodies(bodies)
+        for i, b in enumerate(bodies):
+            tree.move_proxy(tree.proxies[i], b.shape.compute_aabb())
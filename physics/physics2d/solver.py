@@ -0,0 +1,171 @@
+import numpy as np
+
+from typing import List
+
+from .manifold import Manifold
+from .constants import EPSILON
+
+
+class ContactSolver:
+    def initialize(self, contacts: List[Manifold], v: List[float], dt: float, warm_starting: bool):
+        raise NotImplementedError()
+
+    def solve(self, contacts: List[Manifold], v: List[float], iterations: int):
+        raise NotImplementedError()
+
+
+class SequentialSolver(ContactSolver):
+    # -- one manifold at a time, each sees the velocities the previous one left
+    def initialize(self, contacts, v, dt, warm_starting):
+        for c in contacts:
+            c.prepare(v, dt)
+        for c in contacts:
+            c.warm_start(v, warm_starting)
+
+    def solve(self, contacts, v, iterations):
+        for _ in range(iterations):
+            for c in contacts:
+                c.apply_impulse(v)
+
+
+class ColoredSolver(ContactSolver):
+    """Colors the contact graph so no two manifolds of a color share a dynamic
+    body, then solves every color as one set of NumPy operations.
+
+    Colors still run one after the other, so this stays a Gauss-Seidel solver
+    over colors instead of over single manifolds. Both points of a manifold
+    share its bodies and go in separate batches of the same color.
+    """
+
+    def __init__(self):
+        self.colors = 0
+        self.batches: List[slice] = list()
+        self.infinite: List[int] = list()
+
+        # -- (manifold, contact) per row and their accumulated impulses,
+        # -- empty until the first initialize
+        self.rows: List[tuple] = list()
+        self.jn = np.zeros(0)
+        self.jt = np.zeros(0)
+
+    def initialize(self, contacts, v, dt, warm_starting):
+        for c in contacts:
+            c.prepare(v, dt)
+        for c in contacts:
+            c.warm_start(v, warm_starting)
+
+        # -- greedy coloring, a bit mask of the colors already used per body
+        used = dict()
+        rows = list()
+        self.infinite = list()
+        for k, c in enumerate(contacts):
+            if c.inv_mass_a + c.inv_mass_b <= EPSILON:
+                self.infinite += c.va, c.vb
+                continue
+
+            a = c.va if c.inv_mass_a else -1
+            b = c.vb if c.inv_mass_b else -1
+            mask = used.get(a, 0) | used.get(b, 0)
+            color = (~mask & (mask + 1)).bit_length() - 1
+            if a >= 0:
+                used[a] = used.get(a, 0) | 1 << color
+            if b >= 0:
+                used[b] = used.get(b, 0) | 1 << color
+
+            for i in range(c.contact_count):
+                rows.append((color * 2 + i, k, i))
+
+        rows.sort()
+        self.rows = [(k, i) for _, k, i in rows]
+
+        # -- contiguous slices of rows, one per (color, contact slot)
+        self.batches = list()
+        start = 0
+        for r in range(1, len(rows) + 1):
+            if r == len(rows) or rows[r][0] != rows[start][0]:
+                self.batches.append(slice(start, r))
+                start = r
+        self.colors = rows[-1][0] // 2 + 1 if rows else 0
+
+        data = np.array([
+            (
+                c.va // 3, c.vb // 3,
+                c.inv_mass_a, c.inv_moment_a, c.inv_mass_b, c.inv_moment_b,
+                c.normal.x, c.normal.y, c.tangent.x, c.tangent.y,
+                c.ra[i].x, c.ra[i].y, c.rb[i].x, c.rb[i].y,
+                c.bias[i], c.normal_mass[i], c.tangent_mass[i], c.sf, c.df,
+                c.normal_impulse[i], c.tangent_impulse[i]
+            )
+            for c, i in ((contacts[k], i) for k, i in self.rows)
+        ]).reshape(-1, 21)
+
+        self.a = data[:, 0].astype(int)
+        self.b = data[:, 1].astype(int)
+        (self.ma, self.ia, self.mb, self.ib, self.nx, self.ny, self.tx, self.ty,
+         self.rax, self.ray, self.rbx, self.rby, self.bias, self.normal_mass,
+         self.tangent_mass, self.sf, self.df) = data[:, 2:19].T
+        self.jn = data[:, 19].copy()
+        self.jt = data[:, 20].copy()
+
+    def solve(self, contacts, v, iterations):
+        V = np.array(v).reshape(-1, 3)
+        infinite = np.array(self.infinite, dtype=int) // 3
+
+        for _ in range(iterations):
+            V[infinite, :2] = 0.0
+            for s in self.batches:
+                self.solve_batch(V, s)
+
+        v[:] = V.ravel().tolist()
+
+        # -- accumulated impulses back to the manifolds for warm starting
+        for (k, i), jn, jt in zip(self.rows, self.jn.tolist(), self.jt.tolist()):
+            contacts[k].normal_impulse[i] = jn
+            contacts[k].tangent_impulse[i] = jt
+
+    def solve_batch(self, V: np.ndarray, s: slice):
+        a, b = self.a[s], self.b[s]
+        ma, ia, mb, ib = self.ma[s], self.ia[s], self.mb[s], self.ib[s]
+        nx, ny, tx, ty = self.nx[s], self.ny[s], self.tx[s], self.ty[s]
+        rax, ray, rbx, rby = self.rax[s], self.ray[s], self.rbx[s], self.rby[s]
+        va, vb = V[a], V[b]
+
+        # -- normal impulse, clamp the accumulated impulse not the delta
+        rvx = vb[:, 0] - vb[:, 2] * rby - va[:, 0] + va[:, 2] * ray
+        rvy = vb[:, 1] + vb[:, 2] * rbx - va[:, 1] - va[:, 2] * rax
+        j = (self.bias[s] - (rvx * nx + rvy * ny)) * self.normal_mass[s]
+        old = self.jn[s].copy()
+        jn = np.maximum(old + j, 0.0)
+        self.jn[s] = jn
+        j = jn - old
+        self.apply(va, vb, nx * j, ny * j, ma, ia, mb, ib, rax, ray, rbx, rby)
+
+        # -- friction, coulomb's law against the new normal impulse, static
+        # -- friction holds or dynamic friction slides
+        rvx = vb[:, 0] - vb[:, 2] * rby - va[:, 0] + va[:, 2] * ray
+        rvy = vb[:, 1] + vb[:, 2] * rbx - va[:, 1] - va[:, 2] * rax
+        jt = -(rvx * tx + rvy * ty) * self.tangent_mass[s]
+        old = self.jt[s].copy()
+        total = old + jt
+        sliding = np.abs(total) > jn * self.sf[s]
+        total[sliding] = np.copysign(jn * self.df[s], total)[sliding]
+        self.jt[s] = total
+        jt = total - old
+
+        # -- dont apply tiny friction impulses
+        jt[np.abs(jt) <= EPSILON] = 0.0
+        self.apply(va, vb, tx * jt, ty * jt, ma, ia, mb, ib, rax, ray, rbx, rby)
+
+        # -- no dynamic body appears twice in a batch, static bodies are written
+        # -- back unchanged
+        V[a] = va
+        V[b] = vb
+
+    @staticmethod
+    def apply(va, vb, px, py, ma, ia, mb, ib, rax, ray, rbx, rby):
+        va[:, 0] -= ma * px
+        va[:, 1] -= ma * py
+        va[:, 2] -= ia * (rax * py - ray * px)
+        vb[:, 0] += mb * px
+        vb[:, 1] += mb * py
+        vb[:, 2] += ib * (rbx * py - rby * px)
@@ -0,0 +1,396 @@
+from __future__ import annotations
+
+from typing import Callable, Iterator, List
+
+from .aabb import AABB
+from .vector import Vector2
+from .broadphase import BroadPhase
+from .constants import AABB_MARGIN
+
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from .body import Body
+
+
+NULL = -1
+
+
+class TreeNode:
+
+    __slots__ = 'aabb', 'parent', 'child1', 'child2', 'height', 'data'
+
+    def __init__(self):
+        self.aabb = AABB()
+        self.parent = NULL
+        self.child1 = NULL
+        self.child2 = NULL
+        # -- leaves have height 0, free nodes -1
+        self.height = -1
+        self.data = NULL
+
+    @property
+    def is_leaf(self) -> bool:
+        return self.child1 == NULL
+
+
+class DynamicTree(BroadPhase):
+    """Bounding volume hierarchy over fattened AABBs, after Box2D's b2DynamicTree.
+
+    Leaves hold boxes grown by `margin` so a body only touches the tree once it
+    leaves its fat box, and every insert and removal rebalances the path back
+    to the root, keeping moves O(log n). As a broad phase the proxy of body i
+    carries i as its data.
+    """
+
+    def __init__(self, margin: float = AABB_MARGIN):
+        self.margin = margin
+        self.root = NULL
+        self.nodes: List[TreeNode] = list()
+        self.free: List[int] = list()
+
+        # -- leaf node per body index when used as a broad phase
+        self.proxies: List[int] = list()
+
+    # -- proxies
+
+    def create_proxy(self, aabb: AABB, data: int) -> int:
+        leaf = self.allocate_node()
+        node = self.nodes[leaf]
+        node.aabb = aabb.fattened(self.margin)
+        node.data = data
+        node.height = 0
+        self.insert_leaf(leaf)
+        return leaf
+
+    def destroy_proxy(self, proxy: int):
+        self.remove_leaf(proxy)
+        self.free_node(proxy)
+
+    def move_proxy(self, proxy: int, aabb: AABB) -> bool:
+        node = self.nodes[proxy]
+        if node.aabb.contains(aabb):
+            return False
+
+        self.remove_leaf(proxy)
+        node.aabb = aabb.fattened(self.margin)
+        self.insert_leaf(proxy)
+        return True
+
+    def fat_aabb(self, proxy: int) -> AABB:
+        return self.nodes[proxy].aabb
+
+    @property
+    def height(self) -> int:
+        return self.nodes[self.root].height if self.root != NULL else 0
+
+    # -- queries
+
+    def query_aabb(self, aabb: AABB) -> Iterator[int]:
+        if self.root == NULL:
+            return
+
+        nodes = self.nodes
+        stack = [self.root]
+        while stack:
+            node = nodes[stack.pop()]
+            if not node.aabb.overlaps(aabb):
+                continue
+
+            if node.child1 == NULL:
+                yield node.data
+            else:
+                stack.append(node.child1)
+                stack.append(node.child2)
+
+    def query_point(self, x: float, y: float) -> Iterator[int]:
+        if self.root == NULL:
+            return
+
+        nodes = self.nodes
+        stack = [self.root]
+        while stack:
+            node = nodes[stack.pop()]
+            if not node.aabb.contains_point(x, y):
+                continue
+
+            if node.child1 == NULL:
+                yield node.data
+            else:
+                stack.append(node.child1)
+                stack.append(node.child2)
+
+    def raycast(self, p1: Vector2, p2: Vector2,
+                callback: Callable[[int, float], float], max_fraction: float = 1.0):
+        """Walk the leaves whose boxes the segment p1 + t * (p2 - p1), t in
+        [0, max_fraction], passes through. callback(data, max_fraction) returns
+        0 to stop, a fraction to clip the segment to, or -1 to ignore the leaf.
+        """
+        if self.root == NULL:
+            return
+
+        dx, dy = p2.x - p1.x, p2.y - p1.y
+        length = (dx * dx + dy * dy) ** 0.5
+        if length == 0.0:
+            return
+
+        # -- separating axis perpendicular to the segment
+        vx, vy = -dy / length, dx / length
+        abs_vx, abs_vy = abs(vx), abs(vy)
+
+        tx, ty = p1.x + max_fraction * dx, p1.y + max_fraction * dy
+        segment = AABB(min(p1.x, tx), min(p1.y, ty), max(p1.x, tx), max(p1.y, ty))
+
+        nodes = self.nodes
+        stack = [self.root]
+        while stack:
+            node = nodes[stack.pop()]
+            box = node.aabb
+            if not box.overlaps(segment):
+                continue
+
+            cx, cy = (box.min_x + box.max_x) * 0.5, (box.min_y + box.max_y) * 0.5
+            hx, hy = (box.max_x - box.min_x) * 0.5, (box.max_y - box.min_y) * 0.5
+            separation = abs(vx * (p1.x - cx) + vy * (p1.y - cy)) - (abs_vx * hx + abs_vy * hy)
+            if separation > 0.0:
+                continue
+
+            if node.child1 != NULL:
+                stack.append(node.child1)
+                stack.append(node.child2)
+                continue
+
+            value = callback(node.data, max_fraction)
+            if value == 0.0:
+                return
+            if value > 0.0:
+                # -- shorten the segment to the closest hit so far
+                max_fraction = value
+                tx, ty = p1.x + max_fraction * dx, p1.y + max_fraction * dy
+                segment = AABB(min(p1.x, tx), min(p1.y, ty), max(p1.x, tx), max(p1.y, ty))
+
+    # -- broad phase
+
+    def add_bodies(self, bodies: List[Body]):
+        # -- proxies for bodies appended since the last call
+        for i in range(len(self.proxies), len(bodies)):
+            self.proxies.append(self.create_proxy(bodies[i].shape.compute_aabb(), i))
+
+    def update(self, bodies: List[Body]):
+        if len(bodies) < len(self.proxies):
+            self.clear()
+        self.add_bodies(bodies)
+
+        # -- static bodies too, they may be placed or turned after being added,
+        # -- sleeping bodies keep the box they fell asleep in
+        for i, b in enumerate(bodies):
+            if b.inv_mass == 0.0 or b.awake:
+                self.move_proxy(self.proxies[i], b.shape.compute_aabb())
+
+    def clear(self):
+        self.root = NULL
+        self.nodes.clear()
+        self.free.clear()
+        self.proxies.clear()
+
+    def pairs(self, bodies):
+        self.update(bodies)
+        boxes = [b.shape.compute_aabb() for b in bodies]
+
+        found = set()
+        for i, b in enumerate(bodies):
+            if b.inv_mass == 0.0:
+                continue
+
+            box = boxes[i]
+            for j in self.query_aabb(box):
+                if j == i or not box.overlaps(boxes[j]):
+                    continue
+                found.add((i, j) if i < j else (j, i))
+
+        # -- same order every step whatever the shape of the tree
+        yield from sorted(found)
+
+    # -- node management
+
+    def allocate_node(self) -> int:
+        if self.free:
+            index = self.free.pop()
+            self.nodes[index] = TreeNode()
+            return index
+
+        self.nodes.append(TreeNode())
+        return len(self.nodes) - 1
+
+    def free_node(self, index: int):
+        self.nodes[index].height = -1
+        self.free.append(index)
+
+    def insert_leaf(self, leaf: int):
+        nodes = self.nodes
+        if self.root == NULL:
+            self.root = leaf
+            nodes[leaf].parent = NULL
+            return
+
+        # -- find the best sibling by the surface area heuristic
+        leaf_aabb = nodes[leaf].aabb
+        index = self.root
+        while not nodes[index].is_leaf:
+            node = nodes[index]
+            area = node.aabb.perimeter
+            combined_area = node.aabb.combine(leaf_aabb).perimeter
+
+            # -- cost of a new parent for this node and the leaf
+            cost = 2.0 * combined_area
+
+            # -- minimum cost of pushing the leaf further down the tree
+            inheritance = 2.0 * (combined_area - area)
+
+            costs = list()
+            for child in (node.child1, node.child2):
+                child_aabb = nodes[child].aabb
+                grown = child_aabb.combine(leaf_aabb).perimeter
+                if nodes[child].is_leaf:
+                    costs.append(grown + inheritance)
+                else:
+                    costs.append(grown - child_aabb.perimeter + inheritance)
+
+            if cost < costs[0] and cost < costs[1]:
+                break
+            index = node.child1 if costs[0] < costs[1] else node.child2
+
+        # -- new parent joins the sibling and the leaf
+        sibling = index
+        old_parent = nodes[sibling].parent
+        new_parent = self.allocate_node()
+        parent = nodes[new_parent]
+        parent.parent = old_parent
+        parent.aabb = leaf_aabb.combine(nodes[sibling].aabb)
+        parent.height = nodes[sibling].height + 1
+        parent.child1 = sibling
+        parent.child2 = leaf
+        nodes[sibling].parent = new_parent
+        nodes[leaf].parent = new_parent
+
+        if old_parent == NULL:
+            self.root = new_parent
+        elif nodes[old_parent].child1 == sibling:
+            nodes[old_parent].child1 = new_parent
+        else:
+            nodes[old_parent].child2 = new_parent
+
+        self.refit(nodes[leaf].parent)
+
+    def remove_leaf(self, leaf: int):
+        nodes = self.nodes
+        if leaf == self.root:
+            self.root = NULL
+            return
+
+        parent = nodes[leaf].parent
+        grand_parent = nodes[parent].parent
+        sibling = nodes[parent].child2 if nodes[parent].child1 == leaf else nodes[parent].child1
+
+        if grand_parent == NULL:
+            self.root = sibling
+            nodes[sibling].parent = NULL
+            self.free_node(parent)
+            return
+
+        # -- the sibling takes the parent's place
+        if nodes[grand_parent].child1 == parent:
+            nodes[grand_parent].child1 = sibling
+        else:
+            nodes[grand_parent].child2 = sibling
+        nodes[sibling].parent = grand_parent
+        self.free_node(parent)
+
+        self.refit(grand_parent)
+
+    def refit(self, index: int):
+        nodes = self.nodes
+        while index != NULL:
+            index = self.balance(index)
+            node = nodes[index]
+            child1, child2 = nodes[node.child1], nodes[node.child2]
+            node.height = 1 + max(child1.height, child2.height)
+            node.aabb = child1.aabb.combine(child2.aabb)
+            index = node.parent
+
+    def balance(self, iA: int) -> int:
+        # -- rotate the taller grandchild up when the children differ by more
+        # -- than one level, returns the node now in A's place
+        nodes = self.nodes
+        A = nodes[iA]
+        if A.is_leaf or A.height < 2:
+            return iA
+
+        iB, iC = A.child1, A.child2
+        B, C = nodes[iB], nodes[iC]
+        balance = C.height - B.height
+
+        if balance > 1:
+            iF, iG = C.child1, C.child2
+            F, G = nodes[iF], nodes[iG]
+
+            # -- swap A and C
+            C.child1 = iA
+            C.parent = A.parent
+            A.parent = iC
+            self.replace_child(C.parent, iA, iC)
+
+            if F.height > G.height:
+                C.child2 = iF
+                A.child2 = iG
+                G.parent = iA
+                A.aabb = B.aabb.combine(G.aabb)
+                C.aabb = A.aabb.combine(F.aabb)
+                A.height = 1 + max(B.height, G.height)
+                C.height = 1 + max(A.height, F.height)
+            else:
+                C.child2 = iG
+                A.child2 = iF
+                F.parent = iA
+                A.aabb = B.aabb.combine(F.aabb)
+                C.aabb = A.aabb.combine(G.aabb)
+                A.height = 1 + max(B.height, F.height)
+                C.height = 1 + max(A.height, G.height)
+            return iC
+
+        if balance < -1:
+            iD, iE = B.child1, B.child2
+            D, E = nodes[iD], nodes[iE]
+
+            # -- swap A and B
+            B.child1 = iA
+            B.parent = A.parent
+            A.parent = iB
+            self.replace_child(B.parent, iA, iB)
+
+            if D.height > E.height:
+                B.child2 = iD
+                A.child1 = iE
+                E.parent = iA
+                A.aabb = C.aabb.combine(E.aabb)
+                B.aabb = A.aabb.combine(D.aabb)
+                A.height = 1 + max(C.height, E.height)
+                B.height = 1 + max(A.height, D.height)
+            else:
+                B.child2 = iE
+                A.child1 = iD
+                D.parent = iA
+                A.aabb = C.aabb.combine(D.aabb)
+                B.aabb = A.aabb.combine(E.aabb)
+                A.height = 1 + max(C.height, D.height)
+                B.height = 1 + max(A.height, E.height)
+            return iB
+
+        return iA
+
+    def replace_child(self, parent: int, old: int, new: int):
+        if parent == NULL:
+            self.root = new
+        elif self.nodes[parent].child1 == old:
+            self.nodes[parent].child1 = new
+        else:
+            self.nodes[parent].child2 = new
@@ -390,7 +390,8 @@ class Vector2:
     def normalize(self):
         x, y = self.x, self.y
         temp = math.hypot(x, y)
-        self.x, self.y = x / temp, y / temp
+        if temp:
+            self.x, self.y = x / temp, y / temp
         return self
 
     # Vector Multiplication Operations
@@ -1,12 +1,13 @@
 import math
 import operator
-import pyglet as pg
-import itertools as it
-from pyglet.gl import *
+import numpy as np
 
 DAMPING = 0.01
 TIME_STEP = 0.5 * 0.5
 CONSTRAINT_ITERATIONS = 5
+# -- over relaxation of the averaged contact pushes, 1 is plain averaging
+CONTACT_RELAXATION = 2.0
+GRAVITY = (0, -.9, 0)
 
 
 class Vec3:
@@ -79,100 +80,324 @@ class Vec3:
             self.x*other.y - self.y*other.x
         )
 
-def clamp(x, _min, _max):
-    return max(_min, min(_max, x))
+class World:
+    """Verlet particles and the distance constraints between them.
+
+    Particle state lives in (N, 3) arrays and constraints in index and rest
+    length arrays. Constraints are colored so no particle appears twice in a
+    color, each color is then relaxed as one set of array operations, in
+    order, which keeps the relaxation Gauss-Seidel like the per constraint
+    loop it replaces.
+    """
+
+    def __init__(self, lower=3, upper=497, capacity=64, restitution=0.0, cell_size=None):
+        # -- particles are kept inside [lower, upper] on x and y
+        self.lower = lower
+        self.upper = upper
+
+        # -- particles with a radius collide with each other, binned into
+        # -- cells of cell_size, twice the largest radius when None
+        self.restitution = restitution
+        self.cell_size = cell_size
+
+        self.count = 0
+        self.position = np.zeros((capacity, 3))
+        self.old_position = np.zeros((capacity, 3))
+        self.acceleration = np.zeros((capacity, 3))
+        self.inv_mass = np.zeros(capacity)
+        self.radius = np.zeros(capacity)
+
+        self.i = np.zeros(0, dtype=int)
+        self.j = np.zeros(0, dtype=int)
+        self.rest = np.zeros(0)
+
+        # -- constraint order per color and sorted keys of the joined pairs,
+        # -- rebuilt when constraints are added
+        self.colors = None
+        self.links = None
+
+    def add_particles(self, positions, mass=1, radius=0):
+        positions = np.asarray(positions, dtype=float).reshape(-1, 3)
+        start, n = self.count, len(positions)
+        if start + n > len(self.inv_mass):
+            self.grow(max(2 * len(self.inv_mass), start + n))
+
+        index = np.arange(start, start + n)
+        self.position[index] = positions
+        self.old_position[index] = positions
+        self.acceleration[index] = 0.0
+        self.inv_mass[index] = 1.0 / mass if mass else 0.0
+        self.radius[index] = radius
+        self.count += n
+        return index
+
+    def grow(self, capacity):
+        for name in ('position', 'old_position', 'acceleration', 'inv_mass', 'radius'):
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:])
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def add_constraints(self, i, j):
+        # -- rest lengths are the distances at the time they are added
+        i, j = np.asarray(i, dtype=int), np.asarray(j, dtype=int)
+        rest = np.linalg.norm(self.position[j] - self.position[i], axis=1)
+
+        self.i = np.concatenate((self.i, i))
+        self.j = np.concatenate((self.j, j))
+        self.rest = np.concatenate((self.rest, rest))
+        self.colors = None
+        self.links = None
+
+    def add_force(self, force, index=None):
+        index = slice(0, self.count) if index is None else index
+        self.acceleration[index] += np.asarray(tuple(force)) * self.inv_mass[index, None]
+
+    def color(self):
+        # -- greedy coloring, a bit mask of the colors already used per particle
+        used = [0] * self.count
+        colors = np.empty(len(self.i), dtype=int)
+        for k, (a, b) in enumerate(zip(self.i.tolist(), self.j.tolist())):
+            mask = used[a] | used[b]
+            c = (~mask & (mask + 1)).bit_length() - 1
+            used[a] |= 1 << c
+            used[b] |= 1 << c
+            colors[k] = c
+
+        order = np.argsort(colors, kind='stable')
+        bounds = np.searchsorted(colors[order], np.arange(colors.max() + 2 if len(colors) else 1))
+        self.colors = [order[bounds[c]:bounds[c + 1]] for c in range(len(bounds) - 1)]
+
+    @staticmethod
+    def _link_key(a, b):
+        # -- one int64 per unordered particle pair
+        a, b = np.asarray(a, dtype=np.int64), np.asarray(b, dtype=np.int64)
+        return np.minimum(a, b) << 32 | np.maximum(a, b)
+
+    def linked(self, a, b):
+        """Whether each pair (a, b) is joined by a constraint."""
+        if self.links is None:
+            self.links = np.unique(self._link_key(self.i, self.j))
+        if not len(self.links):
+            return np.zeros(len(a), dtype=bool)
+
+        key = self._link_key(a, b)
+        at = np.minimum(np.searchsorted(self.links, key), len(self.links) - 1)
+        return self.links[at] == key
+
+    def integrate(self):
+        n = self.count
+        position = self.position[:n]
+        current = position.copy()
+        position += (position - self.old_position[:n]) * (1 - DAMPING)
+        position += self.acceleration[:n] * TIME_STEP
+        self.old_position[:n] = current
+        self.acceleration[:n] = 0.0
+        self.clamp()
+
+    def clamp(self):
+        # -- world clamping
+        n = self.count
+        radius = self.radius[:n, None]
+        xy = self.position[:n, :2]
+        np.clip(xy, self.lower + radius, self.upper - radius, out=xy)
+
+    def satisfy(self, iterations=CONSTRAINT_ITERATIONS):
+        if self.colors is None:
+            self.color()
+
+        # -- share of the correction each end takes, by inverse mass so pinned
+        # -- particles stay put
+        position, inv_mass = self.position, self.inv_mass
+        batches = list()
+        for k in self.colors:
+            i, j = self.i[k], self.j[k]
+            wi, wj = inv_mass[i], inv_mass[j]
+            w = wi + wj
+            w[w == 0.0] = 1.0
+            # -- both ends in one index array, no particle repeats within a
+            # -- color so one gather and one scatter move them all
+            ends = np.concatenate((i, j))
+            batches.append((ends, len(k), self.rest[k], (wi / w)[:, None], (wj / w)[:, None]))
+
+        for _ in range(iterations):
+            for ends, n, rest, wi, wj in batches:
+                p = position[ends]
+                delta = p[n:] - p[:n]
+                distance = np.sqrt(np.einsum('ij,ij->i', delta, delta))
+                distance[distance == 0.0] = 1.0
+
+                # -- delta * (1 - rest / distance), in place
+                np.divide(rest, distance, out=distance)
+                np.subtract(1.0, distance, out=distance)
+                delta *= distance[:, None]
+
+                p[:n] += delta * wi
+                p[n:] -= delta * wj
+                position[ends] = p
+
+    def pairs(self):
+        """Index pairs of colliding particles whose cells touch, each pair once.
+
+        Particles are binned on x and y and sorted by cell, every particle then
+        looks up its own cell and the four neighbours after it, so the cost
+        grows with the number of particles, not their square. Particles joined
+        by a constraint are left to it, a body does not collide with itself
+        across its own sticks.
+        """
+        n = self.count
+        index = np.flatnonzero(self.radius[:n] > 0.0)
+        if len(index) < 2:
+            return np.zeros(0, dtype=int), np.zeros(0, dtype=int)
+
+        size = self.cell_size or 2.0 * self.radius[index].max()
+        cell = np.floor(self.position[index, :2] / size).astype(np.int64)
+        cell -= cell.min(axis=0)
+
+        # -- room above the highest row so y - 1 and y + 1 never wrap into a real cell
+        width = int(cell[:, 1].max()) + 3
+        key = cell[:, 0] * width + cell[:, 1]
+        order = np.argsort(key, kind='stable')
+        key = key[order]
+        rank = np.arange(len(key))
+
+        first, second = list(), list()
+        for dx, dy in ((0, 0), (0, 1), (1, -1), (1, 0), (1, 1)):
+            target = key + (dx * width + dy)
+            end = np.searchsorted(key, target, 'right')
+            if dx == dy == 0:
+                # -- same cell, only the particles sorted after this one
+                start = rank + 1
+            else:
+                start = np.searchsorted(key, target, 'left')
+
+            count = np.maximum(end - start, 0)
+            total = int(count.sum())
+            if not total:
+                continue
+
+            # -- every particle against the run [start, end) of the target cell
+            run = np.repeat(np.cumsum(count) - count, count)
+            first.append(np.repeat(rank, count))
+            second.append(np.repeat(start, count) + np.arange(total) - run)
+
+        if not first:
+            return np.zeros(0, dtype=int), np.zeros(0, dtype=int)
+
+        sorted_index = index[order]
+        a, b = sorted_index[np.concatenate(first)], sorted_index[np.concatenate(second)]
+        apart = ~self.linked(a, b)
+        return a[apart], b[apart]
+
+    def collide(self, a, b, restitution=None):
+        """Push apart the candidate pairs (a, b) that overlap, returns how many.
+
+        Pairs are solved together and each particle's pushes averaged over its
+        contacts, so a single call only partly untangles a crowd, step calls it
+        once per relaxation pass. As with the constraints only positions move,
+        the push shows up as velocity on the next integrate.
+        """
+        position, old = self.position, self.old_position
+        delta = position[b] - position[a]
+        distance_sqr = np.einsum('ij,ij->i', delta, delta)
+        reach = self.radius[a] + self.radius[b]
+
+        wa, wb = self.inv_mass[a], self.inv_mass[b]
+        touching = (distance_sqr < reach * reach) & (wa + wb > 0.0)
+        if not touching.any():
+            return 0
+
+        a, b, delta, wa, wb = a[touching], b[touching], delta[touching], wa[touching], wb[touching]
+        distance = np.sqrt(distance_sqr[touching])
+        depth = reach[touching] - distance
+
+        # -- particles right on top of each other get pushed apart along x
+        apart = distance > 0.0
+        normal = np.zeros_like(delta)
+        normal[:, 0] = 1.0
+        normal[apart] = delta[apart] / distance[apart, None]
+        w = wa + wb
+
+        correction = normal * (depth / w)[:, None]
+
+        # -- bounce the approaching normal velocity back by the restitution
+        if restitution is None:
+            restitution = self.restitution
+        bounce = None
+        if restitution > 0.0:
+            velocity = position[b] - old[b] - position[a] + old[a]
+            closing = np.einsum('ij,ij->i', velocity, normal)
+            # -- the push itself already leaves them separating at depth + closing
+            impulse = np.where(closing < 0.0, np.maximum(-(1.0 + restitution) * closing - depth, 0.0) / w, 0.0)
+            bounce = normal * impulse[:, None]
+
+        # -- average over each particle's contacts, over relaxed, summing them
+        # -- overshoots and blows a crowd apart
+        n = self.count
+        contacts = np.maximum(np.bincount(np.concatenate((a, b)), minlength=n), 1)
+        share = np.minimum(CONTACT_RELAXATION / contacts, 1.0)
+        for k in range(3):
+            position[:n, k] += (np.bincount(b, correction[:, k] * wb, n) -
+                                np.bincount(a, correction[:, k] * wa, n)) * share
+            if bounce is not None:
+                old[:n, k] -= (np.bincount(b, bounce[:, k] * wb, n) -
+                               np.bincount(a, bounce[:, k] * wa, n)) * share
+        return len(a)
+
+    def step(self, iterations=CONSTRAINT_ITERATIONS):
+        self.integrate()
+
+        # -- candidates once per step, contacts relaxed along with constraints
+        a, b = self.pairs()
+        if not len(a):
+            self.satisfy(iterations)
+            return
+
+        # -- bounce on the first pass only, later passes just separate
+        for k in range(iterations):
+            self.collide(a, b, None if k == 0 else 0.0)
+            self.clamp()
+            self.satisfy(1)
 
 
-class Particle:
-
-    def __init__(self, position):
-        self.position = position
-        self.old_pos = position
-
-        self.mass = 1
-        self.acceleration = Vec3.zero()
-
-    def add_force(self, force):
-        self.acceleration += force / self.mass
-
-    def step(self):
-        current = self.position
-        self.position = (
-                self.position
-                + (self.position - self.old_pos) * (1-DAMPING)
-                + self.acceleration * TIME_STEP
-            )
-
-        self.old_pos = current
-        self.acceleration = Vec3.zero()
-
-class Constraint:
-
-    def __init__(self, p1, p2):
-        self.p1 = p1
-        self.p2 = p2
-        self.rest_distance = (p1.position - p2.position).length()
-
-    def satisfy(self):
-        p1_to_p2 = self.p2.position - self.p1.position
-        current_distance = p1_to_p2.length()
-
-        correction_vector = p1_to_p2*(1 - self.rest_distance/current_distance)
-        self.p1.position +=  correction_vector*0.5
-        self.p2.position += -correction_vector*0.5
-
 class Box:
 
-    def __init__(self, top, w, h):
+    def __init__(self, world, top, w, h, radius=0):
+        self.world = world
         self.top = top
         self.w = w
         self.h = h
+        # -- corner particles with a radius collide with other bodies
+        self.radius = radius
 
-        self.particles, self.constraints = self._make()
-
-        self.resolution = Vec3.zero()
+        self.index = self._make()
 
     def _make(self):
         top, w, h = self.top, self.w, self.h
 
-        p1, p2, p3, p4 = (
-            Particle(top),                    # Top right
-            Particle(top + Vec3(w, 0, 0)),    # Top Left
-            Particle(top + Vec3(w, h, 0)),    # Bottom Left
-            Particle(top + Vec3(0, h, 0))     # Bottom right
+        index = self.world.add_particles([
+            tuple(top),                       # Top right
+            tuple(top + Vec3(w, 0, 0)),       # Top Left
+            tuple(top + Vec3(w, h, 0)),       # Bottom Left
+            tuple(top + Vec3(0, h, 0))        # Bottom right
+        ], radius=self.radius)
+        p1, p2, p3, p4 = index
+
+        self.world.add_constraints(
+            (p1, p2, p3, p4, p1),
+            (p2, p3, p4, p1, p3)
         )
-
-        constraints = (
-            Constraint(p1, p2),
-            Constraint(p2, p3),
-            Constraint(p3, p4),
-            Constraint(p4, p1),
-            Constraint(p1, p3)
-        )
-
-        return [p1, p2, p3, p4], constraints
-
-    def update(self):
-        for p in self.particles:
-            p.step()
-
-            # -- world clamping
-            p.position.x = clamp(p.position.x, 3, 497)
-            p.position.y = clamp(p.position.y, 3, 497)
-
-        for s in self.constraints:
-            s.satisfy()
-
-        self.top = self.particles[0].position
+        return index
 
     def add_force(self, f):
-        for p in self.particles:
-            p.add_force(f)
+        self.world.add_force(f, self.index)
 
     def draw(self):
-        verts = list(it.chain.from_iterable(p.position.tuple() for p in self.particles))
-        glLineWidth(2)
-        pg.graphics.draw(4, GL_LINE_LOOP,
+        import pyglet as pg
+
+        verts = self.world.position[self.index].ravel().tolist()
+        pg.gl.glLineWidth(2)
+        pg.graphics.draw(4, pg.gl.GL_LINE_LOOP,
             ('v3f', verts),
             ('c4B', (255, 255, 255, 255)*4)
             )
@@ -180,22 +405,23 @@ class Box:
 
 class Circle:
 
-    def __init__(self, pos, radius):
-        self.position = pos
+    def __init__(self, world, pos, radius):
+        self.world = world
         self.radius = radius
 
-        self.particle = Particle(pos)
+        self.index = world.add_particles([tuple(pos)], radius=radius)
 
-    def update(self):
-        self.particle.step()
-        if self.particle.position.y < self.radius+3:
-            self.particle.position.y = self.radius+3
+    @property
+    def position(self):
+        return Vec3(*self.world.position[self.index[0]].tolist())
 
     def add_force(self, f):
-        self.particle.add_force(f)
+        self.world.add_force(f, self.index)
 
     def draw(self):
-        x,y,z = self.particle.position
+        import pyglet as pg
+
+        x,y,z = self.position
         resolution = 64
         arc = (2*math.pi) / resolution
 
@@ -205,39 +431,120 @@ class Circle:
             verts.extend([x + math.cos(r*arc)*self.radius, y + math.sin(r*arc)*self.radius])
 
         count = len(verts)//2
-        pg.graphics.draw(count, GL_LINE_LOOP,
+        pg.graphics.draw(count, pg.gl.GL_LINE_LOOP,
             ('v2f', verts),
             ('c4B', (255, 255, 255, 255)*count))
 
 
-window = pg.window.Window(500, 500, "Stick Physics")
+class Rope:
+
+    def __init__(self, world, start, end, segments, pinned=True, radius=0):
+        self.world = world
+
+        t = np.linspace(0.0, 1.0, segments + 1)[:, None]
+        start, end = np.array(tuple(start), dtype=float), np.array(tuple(end), dtype=float)
+        self.index = world.add_particles(start + (end - start) * t, radius=radius)
+        if pinned:
+            world.inv_mass[self.index[0]] = 0.0
+
+        world.add_constraints(self.index[:-1], self.index[1:])
+
+    def add_force(self, f):
+        self.world.add_force(f, self.index)
+
+    def draw(self):
+        import pyglet as pg
+
+        verts = self.world.position[self.index].ravel().tolist()
+        count = len(self.index)
+        pg.graphics.draw(count, pg.gl.GL_LINE_STRIP,
+            ('v3f', verts),
+            ('c4B', (255, 255, 255, 255)*count))
+
+
+class Ragdoll:
+
+    # -- joints relative to the pelvis, one unit is a fifth of the height
+    JOINTS = (
+        (0, 0), (0, 2), (0, 3),         # pelvis, neck, head
+        (-1, 1.5), (-1.5, 0.5),         # left elbow, hand
+        (1, 1.5), (1.5, 0.5),           # right elbow, hand
+        (-0.5, -1.2), (-0.6, -2.4),     # left knee, foot
+        (0.5, -1.2), (0.6, -2.4),       # right knee, foot
+    )
+    BONES = (
+        (0, 1), (1, 2), (1, 3), (3, 4), (1, 5), (5, 6),
+        (0, 7), (7, 8), (0, 9), (9, 10),
+        # -- braces that keep the torso and hips from folding flat
+        (2, 3), (2, 5), (3, 5), (7, 9), (1, 7), (1, 9),
+    )
+
+    def __init__(self, world, pelvis, height, radius=0):
+        self.world = world
+
+        unit = height / 5.0
+        x, y = pelvis[0], pelvis[1]
+        self.index = world.add_particles(
+            [(x + dx*unit, y + dy*unit, 0) for dx, dy in self.JOINTS], radius=radius)
+
+        bones = np.array(self.BONES)
+        world.add_constraints(self.index[bones[:, 0]], self.index[bones[:, 1]])
+
+    def add_force(self, f):
+        self.world.add_force(f, self.index)
+
+    def draw(self):
+        import pyglet as pg
+
+        position = self.world.position[self.index]
+        bones = np.array(self.BONES[:10])
+        verts = position[bones.ravel()].ravel().tolist()
+        count = len(bones) * 2
+        pg.graphics.draw(count, pg.gl.GL_LINES,
+            ('v3f', verts),
+            ('c4B', (255, 255, 255, 255)*count))
+
 
-objects = []
-positions = [
-    (100, 100),
-    (140, 200),
-    (300, 300)
-]
-boxes = [Box(Vec3(*p, 0), 50, 50) for p in positions]
-circles = [Circle(Vec3(x+70,y+100, 0), 25) for x,y in positions]
-objects.extend(boxes + circles)
+def make_scene(world):
+    # -- the boxes and circles the window shows
+    positions = [
+        (100, 100),
+        (140, 200),
+        (300, 300)
+    ]
+    boxes = [Box(world, Vec3(*p, 0), 50, 50, radius=5) for p in positions]
+    circles = [Circle(world, Vec3(x+70,y+100, 0), 25) for x,y in positions]
+    return boxes + circles
 
-@window.event
-def on_draw():
-    window.clear()
-    glClearColor(.2, .3, .3, 1)
 
-    for obj in objects:
-        obj.draw()
+def simulate(world, steps, force=GRAVITY):
+    """Step the world steps times under force, no window needed."""
+    for _ in range(steps):
+        world.add_force(force)
+        world.step()
 
-def on_update(dt):
-    for obj in objects:
-        obj.add_force(Vec3(0, -.9, 0))
-        obj.update()
 
 def main():
+    import pyglet as pg
+
+    window = pg.window.Window(500, 500, "Stick Physics")
+
+    world = World()
+    objects = make_scene(world)
+
+    @window.event
+    def on_draw():
+        window.clear()
+        pg.gl.glClearColor(.2, .3, .3, 1)
+
+        for obj in objects:
+            obj.draw()
+
+    def on_update(dt):
+        simulate(world, 1)
+
     pg.clock.schedule_interval(on_update, 1/60)
     pg.app.run()
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()